@@ -5,61 +5,447 @@ import threading
 import subprocess
 import os
 import signal
+import time
+import atexit
+import tempfile
+import urllib.request
+import logging
 
+logger = logging.getLogger("app")
 
- # --- PORT KILLER ---
-def kill_process_on_port(port):
-    """Kill process running on the given port (cross-platform)."""
+GRADIO_PORT = int(os.environ.get("GRADIO_PORT", "7860"))
+STREAMLIT_PORT = int(os.environ.get("STREAMLIT_PORT", "8501"))
+MCP_PORT = int(os.environ.get("MCP_PORT", "5000"))
+
+
+ # --- PORT RECLAMATION ---
+# Each running instance records its PID per port; on startup we only stop the
+# previous instance of *this* app, never whatever else happens to hold the port.
+APP_RUN_DIR = os.environ.get(
+    "APP_RUN_DIR", os.path.join(tempfile.gettempdir(), "ai-mini-agent")
+)
+RECLAIM_TIMEOUT = float(os.environ.get("RECLAIM_TIMEOUT", "10"))
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def pidfile_path(port):
+    return os.path.join(APP_RUN_DIR, f"port-{port}.pid")
+
+
+def read_pidfile(port):
     try:
-        # macOS/Linux: use lsof
-        output = (
-            subprocess.check_output(f"lsof -ti tcp:{port}", shell=True).decode().strip()
-        )
-        if output:
-            for pid in output.splitlines():
-                try:
-                    os.kill(int(pid), signal.SIGKILL)
-                except Exception:
-                    pass
-    except Exception:
+        with open(pidfile_path(port)) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def remove_pidfile(port, pid=None):
+    """Remove the pidfile, only if it still belongs to pid (when given)."""
+    if pid is not None and read_pidfile(port) != pid:
+        return
+    try:
+        os.remove(pidfile_path(port))
+    except OSError:
         pass
+
+
+def claim_port(port, pid=None):
+    """Record pid (default: this process) as the owner of port."""
+    pid = pid or os.getpid()
+    os.makedirs(APP_RUN_DIR, exist_ok=True)
+    with open(pidfile_path(port), "w") as f:
+        f.write(str(pid))
+    if pid == os.getpid():
+        atexit.register(remove_pidfile, port, pid)
+
+
+def listening_socket_inodes(port):
+    """Inodes of TCP sockets listening on port, from /proc/net/tcp{,6} (Linux)."""
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    # fields: sl local_address rem_address st ... inode; 0A = LISTEN
+                    if fields[3] == "0A" and int(fields[1].rsplit(":", 1)[1], 16) == port:
+                        inodes.add(fields[9])
+        except OSError:
+            continue
+    return inodes
+
+
+def process_tree(pid):
+    """pid and its descendants (e.g. gunicorn workers, which hold the listening socket)."""
+    if psutil is not None:
+        try:
+            return [pid] + [c.pid for c in psutil.Process(pid).children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return []
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # comm may contain spaces: ppid is the 2nd field after the closing ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def lsof_listening_pids(port):
+    """PIDs listening on TCP port according to lsof (macOS/BSD), or None without lsof."""
     try:
-        # Windows: use netstat and taskkill
-        output = (
-            subprocess.check_output(f"netstat -ano | findstr :{port}", shell=True)
-            .decode()
-            .strip()
+        result = subprocess.run(
+            ["lsof", "-nP", f"-iTCP:{port}", "-sTCP:LISTEN", "-t"],
+            capture_output=True, text=True, timeout=10,
         )
-        for line in output.splitlines():
-            parts = line.split()
-            if len(parts) >= 5:
-                pid = parts[-1]
-                try:
-                    subprocess.call(f"taskkill /PID {pid} /F", shell=True)
-                except Exception:
-                    pass
-    except Exception:
-        pass
+    except (OSError, subprocess.SubprocessError):
+        return None
+    # lsof exits 1 when nothing matches
+    if result.returncode not in (0, 1):
+        return None
+    return {int(line) for line in result.stdout.split() if line.isdigit()}
+
+
+def parent_pid(pid):
+    """Parent PID via ps, or None."""
+    try:
+        output = subprocess.run(
+            ["ps", "-o", "ppid=", "-p", str(pid)], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+        return int(output) if output else None
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+def pid_listens_on_lsof(pid, port):
+    """pid_listens_on without psutil or /proc: lsof listeners and their ancestors via ps."""
+    listeners = lsof_listening_pids(port)
+    if listeners is None:
+        return None
+    for listener in listeners:
+        current = listener
+        # Walk up a few levels: gunicorn workers hold the socket, the master is recorded
+        for _ in range(8):
+            if current == pid:
+                return True
+            current = parent_pid(current)
+            if current is None or current <= 1:
+                break
+    return False
+
+
+def pid_listens_on(pid, port):
+    """
+    True if process pid (or one of its children) holds a listening socket on port.
+    Uses psutil when installed, else /proc, else lsof; returns None (unknown) if none
+    is available or a process in the tree may not be inspected.
+    """
+    if psutil is None and not os.path.isdir("/proc/net"):
+        return pid_listens_on_lsof(pid, port)
+    inodes = set() if psutil is not None else listening_socket_inodes(port)
+    if psutil is None and not inodes:
+        return False
+    # A member we may not inspect could be the listener: never report that as "not listening"
+    denied = False
+    for member in process_tree(pid):
+        if psutil is not None:
+            try:
+                proc = psutil.Process(member)
+                connections = getattr(proc, "net_connections", proc.connections)
+                if any(
+                    c.status == psutil.CONN_LISTEN and c.laddr and c.laddr.port == port
+                    for c in connections(kind="tcp")
+                ):
+                    return True
+            except psutil.AccessDenied:
+                denied = True
+            except psutil.NoSuchProcess:
+                pass
+            continue
+        fd_dir = f"/proc/{member}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except PermissionError:
+            denied = True
+            continue
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                link = os.readlink(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            if link.startswith("socket:[") and link[8:-1] in inodes:
+                return True
+    return None if denied else False
+
+
+def pid_alive(pid):
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def reclaim_port(port, claim=True, timeout=RECLAIM_TIMEOUT):
+    """
+    Stop the previous instance of this app recorded for port (SIGTERM, then SIGKILL
+    after timeout) and, if claim, record this process as the new owner. The PID is only
+    signalled when it verifiably still listens on the port.
+    """
+    pid = read_pidfile(port)
+    if pid and pid != os.getpid() and pid_alive(pid):
+        owns_port = pid_listens_on(pid, port)
+        if owns_port is False:
+            # Stale pidfile: the PID was reused or the port released
+            logger.info("Port %s: recorded PID %s no longer owns it, leaving it alone.", port, pid)
+        elif owns_port is None:
+            # Never signal a PID we cannot tie to the port: it may belong to another program
+            logger.warning(
+                "Port %s: cannot verify that PID %s still owns it (install psutil or run as its user); "
+                "not stopping it. Stop the previous instance manually if it is still running.",
+                port, pid,
+            )
+        else:
+            logger.info("Port %s: stopping previous instance (PID %s).", port, pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+                deadline = time.monotonic() + timeout
+                while pid_alive(pid) and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                if pid_alive(pid):
+                    os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            except OSError:
+                pass
+    if claim:
+        claim_port(port)
+    else:
+        remove_pidfile(port, pid)
 
 
  # --- GRADIO RUNNER ---
 def run_gradio():
     from gradio_chatbot import demo
 
-    demo.launch(server_name="0.0.0.0", server_port=7860, share=False, inbrowser=False)
+    demo.launch(
+        server_name="0.0.0.0", server_port=GRADIO_PORT, share=False, inbrowser=False
+    )
 
 
  # --- MCP SERVER RUNNER ---
-def run_mcp_server():
-    from mcp_server import run_server
+def run_mcp_server(argv=None, on_ready=None):
+    # Production server by default; `server --dev` for Flask's dev server
+    from mcp_server import main
+
+    main(argv or [], on_ready=on_ready)
+
+
+ # --- PROCESS SUPERVISOR ---
+SUPERVISOR_CHECK_INTERVAL = float(os.environ.get("SUPERVISOR_CHECK_INTERVAL", "5"))
+SUPERVISOR_STARTUP_TIMEOUT = float(os.environ.get("SUPERVISOR_STARTUP_TIMEOUT", "90"))
+SUPERVISOR_HEALTH_FAILURES = int(os.environ.get("SUPERVISOR_HEALTH_FAILURES", "3"))
+SUPERVISOR_MAX_BACKOFF = float(os.environ.get("SUPERVISOR_MAX_BACKOFF", "60"))
+SUPERVISOR_STABLE_SECONDS = float(os.environ.get("SUPERVISOR_STABLE_SECONDS", "60"))
+SUPERVISOR_STOP_TIMEOUT = float(os.environ.get("SUPERVISOR_STOP_TIMEOUT", "35"))
+
+
+def is_healthy(url, timeout=2.0):
+    """Return True if url answers with a 2xx status."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return 200 <= resp.status < 300
+    except Exception:
+        return False
 
-    run_server()
+
+def build_children(server_args, with_gradio=True, with_streamlit=False):
+    """Describe the supervised processes, in startup order (server first)."""
+    app_path = os.path.abspath(__file__)
+    here = os.path.dirname(app_path)
+    children = [
+        {
+            "name": "mcp-server",
+            "cmd": [sys.executable, app_path, "server"] + list(server_args),
+            "health_url": f"http://127.0.0.1:{MCP_PORT}/health",
+        }
+    ]
+    if with_gradio:
+        children.append(
+            {
+                "name": "gradio",
+                "cmd": [sys.executable, app_path, "chatbot"],
+                "health_url": f"http://127.0.0.1:{GRADIO_PORT}/",
+            }
+        )
+    if with_streamlit:
+        children.append(
+            {
+                "name": "streamlit",
+                "cmd": [
+                    sys.executable, "-m", "streamlit", "run",
+                    os.path.join(here, "streamlit_chatbot.py"),
+                    "--server.port", str(STREAMLIT_PORT),
+                    "--server.headless", "true",
+                ],
+                "health_url": f"http://127.0.0.1:{STREAMLIT_PORT}/_stcore/health",
+                "port": STREAMLIT_PORT,
+            }
+        )
+    for child in children:
+        child.update(
+            proc=None, started_at=0.0, restarts=0, failures=0, next_start=0.0,
+            ready=False, ready_by=0.0,
+        )
+    return children
+
+
+def start_child(child):
+    env = dict(os.environ)
+    # Separate processes: the UIs must reach the server over HTTP
+    env["MCP_TRANSPORT"] = "http"
+    env.setdefault("MCP_SERVER_URL", f"http://127.0.0.1:{MCP_PORT}")
+    child["proc"] = subprocess.Popen(child["cmd"], env=env, start_new_session=True)
+    if child.get("port"):
+        # Children that are not app.py processes cannot record themselves
+        claim_port(child["port"], child["proc"].pid)
+    child["started_at"] = time.monotonic()
+    child["failures"] = 0
+    child["ready"] = False
+    child["ready_by"] = child["started_at"] + SUPERVISOR_STARTUP_TIMEOUT
+    logger.info("Started %s (pid %s)", child["name"], child["proc"].pid)
+
+
+def stop_child(child, timeout=SUPERVISOR_STOP_TIMEOUT):
+    """SIGTERM the child, SIGKILL it if it does not exit within timeout."""
+    proc = child["proc"]
+    child["proc"] = None
+    child["ready"] = False
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    logger.info("Stopped %s", child["name"])
+
+
+def wait_until_ready(child, stop_event, timeout=SUPERVISOR_STARTUP_TIMEOUT):
+    """Poll the child's health URL until it answers, it exits, or timeout passes."""
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while not stop_event.is_set() and time.monotonic() < deadline:
+        if child["proc"].poll() is not None:
+            return False
+        if is_healthy(child["health_url"]):
+            mark_ready(child)
+            return True
+        stop_event.wait(delay)
+        delay = min(delay * 2, 1.0)
+    return False
+
+
+def mark_ready(child):
+    child["ready"] = True
+    child["failures"] = 0
+    logger.info("%s ready on %s", child["name"], child["health_url"])
+
+
+def schedule_restart(child, reason):
+    """Stop a failed child and back off exponentially before starting it again."""
+    stop_child(child, timeout=5)
+    if time.monotonic() - child["started_at"] >= SUPERVISOR_STABLE_SECONDS:
+        child["restarts"] = 0
+    backoff = min(SUPERVISOR_MAX_BACKOFF, 2 ** child["restarts"])
+    child["restarts"] += 1
+    child["next_start"] = time.monotonic() + backoff
+    logger.warning("%s %s; restarting in %.0fs", child["name"], reason, backoff)
+
+
+def supervise(server_args=(), with_gradio=True, with_streamlit=False):
+    """
+    Run the MCP server and the chat UIs as separate processes.
+    Starts the server first and waits for /health before launching the UIs,
+    health-checks every child and restarts failed ones with backoff.
+    """
+    stop_event = threading.Event()
+    children = build_children(server_args, with_gradio, with_streamlit)
+
+    def handle_signal(signum, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    try:
+        # Ordered startup: each child must be ready before the next one starts
+        for child in children:
+            if stop_event.is_set():
+                break
+            start_child(child)
+            if not wait_until_ready(child, stop_event):
+                schedule_restart(child, "did not become ready")
+                if child is children[0]:
+                    # The monitor loop starts the UIs once the server is ready
+                    break
+
+        while not stop_event.wait(SUPERVISOR_CHECK_INTERVAL):
+            server = children[0]
+            for child in children:
+                proc = child["proc"]
+                if proc is None:
+                    # UIs wait for the server to be up again before restarting
+                    server_up = child is server or server["ready"]
+                    if server_up and time.monotonic() >= child["next_start"]:
+                        # Readiness is checked on later passes: never block the other children
+                        start_child(child)
+                    continue
+                if proc.poll() is not None:
+                    schedule_restart(child, f"exited with code {proc.returncode}")
+                elif is_healthy(child["health_url"]):
+                    if child["ready"]:
+                        child["failures"] = 0
+                    else:
+                        mark_ready(child)
+                elif not child["ready"]:
+                    if time.monotonic() >= child["ready_by"]:
+                        schedule_restart(child, "did not become ready")
+                else:
+                    child["failures"] += 1
+                    if child["failures"] >= SUPERVISOR_HEALTH_FAILURES:
+                        schedule_restart(child, "failed health checks")
+    finally:
+        # Stop UIs before the server they depend on
+        for child in reversed(children):
+            stop_child(child)
 
 
 if __name__ == "__main__":
-    # Kill processes on ports 5000 (Flask) and 7860 (Gradio) before starting
-    kill_process_on_port(5000)
-    kill_process_on_port(7860)
+    from logging_setup import setup_logging
+
+    setup_logging()
     # Default to "all" if run from VS Code (no args or run/debug)
     run_mode = None
     if len(sys.argv) > 1:
@@ -67,16 +453,41 @@ if __name__ == "__main__":
     else:
         # VS Code "Run" or "Debug" typically runs with no extra args
         run_mode = "all"
+    # Each mode reclaims only the ports it serves, from our own previous instance
     if run_mode == "chatbot":
+        reclaim_port(GRADIO_PORT)
         run_gradio()
     elif run_mode == "server":
-        run_mcp_server()
+        # With SO_REUSEPORT the old server is stopped only once the new one is listening
+        run_mcp_server(sys.argv[2:], on_ready=lambda: reclaim_port(MCP_PORT))
     elif run_mode == "all":
+        reclaim_port(MCP_PORT)
+        reclaim_port(GRADIO_PORT)
+        # Server and chatbot share this process: let the UI call the services directly
+        from mcp_client import set_transport
+
+        set_transport("local")
         t1 = threading.Thread(target=run_mcp_server, daemon=True)
         t1.start()
         run_gradio()
+    elif run_mode == "supervise":
+        # Separate processes for the server and UIs: `supervise [--streamlit] [--no-gradio] [server args]`
+        extra = sys.argv[2:]
+        with_streamlit = "--streamlit" in extra
+        with_gradio = "--no-gradio" not in extra
+        # The children record their own PIDs once started
+        reclaim_port(MCP_PORT, claim=False)
+        if with_gradio:
+            reclaim_port(GRADIO_PORT, claim=False)
+        if with_streamlit:
+            reclaim_port(STREAMLIT_PORT, claim=False)
+        server_args = [a for a in extra if a not in ("--streamlit", "--no-gradio")]
+        supervise(server_args, with_gradio=with_gradio, with_streamlit=with_streamlit)
     else:
         print("Usage: python app.py [chatbot|server|all]")
         print("  chatbot: Run the Gradio chatbot UI")
         print("  server : Run the MCP HTTP API server")
+        print("           [--workers N] [--threads M] [--dev]")
         print("  all    : Run both MCP server and Gradio chatbot together")
+        print("  supervise: Run server and UIs as separate, health-checked processes")
+        print("           [--streamlit] [--no-gradio] [--workers N] [--threads M]")
@@ -0,0 +1,297 @@
+"""
+Bench Commit - microbenchmarks for the pure functions on the commit/chat hot paths
+
+Times extract_commit_info, extract_commit_comment, format_jira_duration,
+parse_start_time_str, normalize_hours (gradio_chatbot.py, skipped if its dependencies are
+missing) and build_ticket_hierarchy over synthetic commit corpora and synthetic JIRA issue
+trees of increasing size. Each case is timed like timeit (auto-ranged loops, best of
+--repeat), and sized cases print a scaling curve: the growth exponent between sizes is
+~1.0 for linear code and ~2.0 for quadratic code.
+
+Baselines are JSON files of per-item times. --save writes one (default BENCH_BASELINE),
+--compare checks against it and exits with status 1 when a case is slower by more than
+--max-regression (fraction, default BENCH_MAX_REGRESSION).
+
+Usage:
+    python bench_commit.py                       # all benchmarks
+    python bench_commit.py hierarchy --quick     # names matching 'hierarchy', fewer sizes
+    python bench_commit.py --save                # store the baseline
+    python bench_commit.py --compare --max-regression 0.2
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+# extract_commit_info writes START_TIME_FILE for -st/-a messages: keep that out of the repo
+os.environ.setdefault(
+    "START_TIME_FILE", os.path.join(tempfile.gettempdir(), "bench-commit-start-time")
+)
+
+import commit  # noqa: E402
+
+try:
+    from gradio_chatbot import normalize_hours
+except ImportError:
+    normalize_hours = None
+
+BENCH_BASELINE = os.environ.get("BENCH_BASELINE", os.path.join(".benchmarks", "bench_commit.json"))
+BENCH_MAX_REGRESSION = float(os.environ.get("BENCH_MAX_REGRESSION", "0.25"))
+
+BENCHMARKS = []
+
+
+def benchmark(name, sizes, quick_sizes=None):
+    """Register setup(size, rng) -> (func, items); func() processes `items` inputs once."""
+
+    def decorator(setup):
+        BENCHMARKS.append(
+            {"name": name, "sizes": sizes, "quick_sizes": quick_sizes or sizes[:2], "setup": setup}
+        )
+        return setup
+
+    return decorator
+
+
+# --- SYNTHETIC DATA ---
+COMMIT_TEMPLATES = [
+    "({key}) Fix login redirect -h {h}h",
+    "({key}) ⏫ Updates: refactor worklog parser -h {h}h {m}m -c",
+    "{key} {h}h {m}m quick fix for dashboard",
+    "({key}) Add pagination to ticket search -st {hh}:{mm}pm",
+    "({key}) Release prep {m}m -c",
+    "Merge branch 'feature/{key}' into main -h {h}h",
+    "({key}) Long message describing the change in detail, touching several modules "
+    "and explaining the reasoning behind it -h {h}h {m}m",
+    "({key}) no hours given, only a description",
+]
+
+DURATION_PHRASES = [
+    "2 hours", "1 hour 30 min", "45 minutes", "3hr", "2 h 15 m", "1h30m", "90 mins", "4 hrs 5 min",
+]
+
+
+def commit_corpus(size, rng):
+    messages = []
+    for _ in range(size):
+        template = rng.choice(COMMIT_TEMPLATES)
+        messages.append(
+            template.format(
+                key=f"{rng.choice(['AHPM', 'CORE', 'WEB'])}-{rng.randint(1, 9999)}",
+                h=rng.randint(0, 8),
+                m=rng.choice([15, 30, 45]),
+                hh=rng.randint(1, 11),
+                mm=rng.choice(["00", "15", "30", "45"]),
+            )
+        )
+    return messages
+
+
+def issue_tree(size, rng):
+    """
+    `size` JIRA search issues shaped like get_open_tickets() results: epics, stories/tasks
+    linked by epic link or parent, sub-tasks under stories, some orphans.
+    """
+    issues = []
+    epics, stories = [], []
+    projects = [{"id": str(10000 + i), "name": f"Project {i}"} for i in range(max(1, size // 500))]
+
+    def add(issuetype, project, parent=None, epic_link=None):
+        key = f"P{project['id']}-{len(issues) + 1}"
+        fields = {
+            "summary": f"{issuetype} {key}",
+            "project": project,
+            "issuetype": {"name": issuetype},
+            "customfield_10008": epic_link,
+        }
+        if parent:
+            fields["parent"] = {
+                "key": parent["key"],
+                "fields": {
+                    "summary": parent["fields"]["summary"],
+                    "issuetype": dict(parent["fields"]["issuetype"]),
+                },
+            }
+        issue = {"key": key, "fields": fields}
+        issues.append(issue)
+        return issue
+
+    while len(issues) < size:
+        project = rng.choice(projects)
+        roll = rng.random()
+        if roll < 0.1 or not epics:
+            epics.append(add("Epic", project))
+        elif roll < 0.45:
+            epic = rng.choice(epics)
+            if rng.random() < 0.5:
+                stories.append(add("Story", epic["fields"]["project"], epic_link=epic["key"]))
+            else:
+                stories.append(add("Story", epic["fields"]["project"], parent=epic))
+        elif roll < 0.9 and stories:
+            story = rng.choice(stories)
+            add("Sub-task", story["fields"]["project"], parent=story)
+        else:
+            add("Task", project)
+    # Hierarchy input order puts the user's tickets before their parents
+    rng.shuffle(issues)
+    return issues
+
+
+# --- BENCHMARKS ---
+@benchmark("extract_commit_info", [100, 1000, 10000])
+def bench_extract_commit_info(size, rng):
+    messages = [m for m in commit_corpus(size * 2, rng) if "-st" not in m][:size]
+    return (lambda: [commit.extract_commit_info(m) for m in messages]), len(messages)
+
+
+@benchmark("extract_commit_info[-st]", [100, 1000])
+def bench_extract_commit_info_start(size, rng):
+    messages = [f"(AHPM-{i}) Started work -st {rng.randint(1, 11)}:30am" for i in range(size)]
+    return (lambda: [commit.extract_commit_info(m) for m in messages]), size
+
+
+@benchmark("extract_commit_comment", [100, 1000, 10000])
+def bench_extract_commit_comment(size, rng):
+    messages = commit_corpus(size, rng)
+    return (lambda: [commit.extract_commit_comment(m) for m in messages]), size
+
+
+@benchmark("format_jira_duration", [1000, 10000])
+def bench_format_jira_duration(size, rng):
+    values = [rng.uniform(0, 12) for _ in range(size)]
+    return (lambda: [commit.format_jira_duration(v) for v in values]), size
+
+
+@benchmark("parse_start_time_str", [1000, 10000])
+def bench_parse_start_time_str(size, rng):
+    values = [f"{rng.randint(1, 12)}:{rng.randint(0, 59):02d}{rng.choice(['am', 'pm'])}" for _ in range(size)]
+    return (lambda: [commit.parse_start_time_str(v) for v in values]), size
+
+
+@benchmark("normalize_hours", [1000, 10000])
+def bench_normalize_hours(size, rng):
+    if normalize_hours is None:
+        return None
+    values = [rng.choice(DURATION_PHRASES) for _ in range(size)]
+    return (lambda: [normalize_hours(v) for v in values]), size
+
+
+@benchmark("build_ticket_hierarchy", [100, 1000, 5000, 20000], quick_sizes=[100, 1000, 5000])
+def bench_build_ticket_hierarchy(size, rng):
+    issues = issue_tree(size, rng)
+    return (lambda: commit.build_ticket_hierarchy(issues)), size
+
+
+# --- RUNNER ---
+def time_case(func, min_time, repeat):
+    """Best and median seconds per func() call, timeit-style auto-ranged loops."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    runs = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        runs.append((time.perf_counter() - start) / loops)
+    runs.sort()
+    return runs[0], runs[len(runs) // 2]
+
+
+def run_benchmarks(patterns=(), quick=False, repeat=5, min_time=0.2, seed=1234):
+    """Run the selected benchmarks; returns {"<name>[<size>]": result dict}."""
+    results = {}
+    print(f"{'Benchmark':<28} {'Size':>7} {'Best ms':>10} {'Median ms':>10} {'us/item':>9} {'Growth':>7}")
+    print("-" * 76)
+    for bench in BENCHMARKS:
+        if patterns and not any(p in bench["name"] for p in patterns):
+            continue
+        previous = None
+        for size in bench["quick_sizes"] if quick else bench["sizes"]:
+            case = bench["setup"](size, random.Random(seed))
+            if case is None:
+                print(f"{bench['name']:<28} skipped (dependency not installed)")
+                break
+            func, items = case
+            best, median = time_case(func, min_time, repeat)
+            growth = ""
+            if previous:
+                # log-log slope: ~1 linear, ~2 quadratic
+                growth = f"{math.log(best / previous[1]) / math.log(size / previous[0]):.2f}"
+            previous = (size, best)
+            per_item_us = best / items * 1e6
+            results[f"{bench['name']}[{size}]"] = {
+                "name": bench["name"],
+                "size": size,
+                "best_s": best,
+                "median_s": median,
+                "per_item_us": per_item_us,
+            }
+            print(
+                f"{bench['name']:<28} {size:>7} {best * 1000:>10.3f} {median * 1000:>10.3f} "
+                f"{per_item_us:>9.2f} {growth:>7}"
+            )
+    return results
+
+
+def compare(baseline, results, max_regression):
+    """Print per-case changes vs baseline; return the cases slower than max_regression."""
+    regressions = []
+    print(f"\nCompared with baseline (max regression {max_regression:.0%})")
+    for case, result in results.items():
+        old = baseline.get("results", {}).get(case)
+        if not old:
+            continue
+        change = result["best_s"] / old["best_s"] - 1
+        flag = "  REGRESSION" if change > max_regression else ""
+        if flag:
+            regressions.append(case)
+        print(
+            f"{case:<36} {old['best_s'] * 1000:>10.3f} -> {result['best_s'] * 1000:>10.3f} ms "
+            f"({change:+.1%}){flag}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for commit.py hot paths")
+    parser.add_argument("patterns", nargs="*", help="only benchmarks whose name contains one of these")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, shorter runs")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (best is kept)")
+    parser.add_argument("--save", nargs="?", const=BENCH_BASELINE, help="write results as baseline")
+    parser.add_argument("--compare", nargs="?", const=BENCH_BASELINE, help="baseline to compare with")
+    parser.add_argument("--max-regression", type=float, default=BENCH_MAX_REGRESSION)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.patterns, quick=args.quick, repeat=3 if args.quick else args.repeat,
+        min_time=0.05 if args.quick else 0.2,
+    )
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            status = 1
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
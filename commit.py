@@ -93,52 +93,176 @@ How to Run:
 
 import requests
 import getpass
+import logging
 import re
 import subprocess
 import sys
 import os
 import time
+import contextvars
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from configs import Configs
 from datetime import datetime, timedelta
+from metrics import Histogram, register_cache
+from utils import TTLCache, prefetch
+import idempotency
+import jobs
+import tenants
+import tracing
+
+logger = logging.getLogger(__name__)
 
 
 # --- CONFIGURATION SECTION ---
 
 
+# --- UPSTREAM HTTP SECTION ---
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_seconds",
+    "JIRA/Tempo API call latency",
+    ["method", "endpoint", "status"],
+)
+
+
+def jira_request(method, url, endpoint, **kwargs):
+    """
+    Send a JIRA/Tempo API request (requests.request kwargs) and record its latency
+    (metrics histogram and a trace span) under the given endpoint name.
+    Uses the current tenant's JIRA basic auth (see tenants.py) unless auth or an
+    Authorization header is passed, over that tenant's keep-alive session.
+    """
+    headers = kwargs.get("headers") or {}
+    tenant = tenants.current_tenant()
+    if "auth" not in kwargs and "Authorization" not in headers:
+        kwargs["auth"] = tenant.jira_auth if tenant else (JIRA_USER, JIRA_API_TOKEN)
+    start = time.perf_counter()
+    status = "error"
+    with tracing.span(f"upstream {method} {endpoint}", endpoint=endpoint) as span:
+        try:
+            response = tenants.session().request(method, url, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            span.set("status", status)
+            UPSTREAM_LATENCY.observe(
+                time.perf_counter() - start, method, endpoint, status
+            )
+
+
 # --- TEMPO API SECTION ---
 def get_tempo_user_key():
     """Get the Tempo user key/accountId (or 'current' for the current user)."""
-    return Configs.TEMPO_USER_KEY or "current"
+    tenant = tenants.current_tenant()
+    user_key = tenant.tempo_user_key if tenant else Configs.TEMPO_USER_KEY
+    return user_key or "current"
 
 
 def get_tempo_headers():
     """Return headers for Tempo API requests."""
+    tenant = tenants.current_tenant()
+    token = tenant.tempo_api_token if tenant else Configs.TEMPO_API_TOKEN
     return {
-        "Authorization": f"Bearer {Configs.TEMPO_API_TOKEN}",
+        "Authorization": f"Bearer {token}",
         "Accept": "application/json",
     }
 
 
-def get_tempo_worklogs(date_from, date_to=None, user_key=None):
+TEMPO_PAGE_LIMIT = int(os.environ.get("TEMPO_PAGE_LIMIT", "1000"))
+TEMPO_TODAY_TTL = float(os.environ.get("TEMPO_TODAY_TTL", "60"))  # seconds
+
+# Day buckets {(tenant, user_key, "YYYY-MM-DD"): [worklogs]}. Past days never expire, today (and
+# future days) expire after TEMPO_TODAY_TTL; our own writes drop the day (invalidate_tempo_day).
+_tempo_cache = TTLCache(ttl=TEMPO_TODAY_TTL, maxsize=4096)
+register_cache("tempo", _tempo_cache)
+
+
+def fetch_tempo_worklogs(date_from, date_to, user_key):
     """
-    Fetch worklogs for a user between date_from and date_to (YYYY-MM-DD).
-    If date_to is None, only date_from is used.
+    Fetch all Tempo worklogs of a user between date_from and date_to (inclusive), following
+    `metadata.next` page links. Servers that answer with a plain list are read as one page.
+    Raises requests.HTTPError on an API error.
     """
-    if not user_key:
-        user_key = get_tempo_user_key()
-    if not date_to:
-        date_to = date_from
     url = f"{Configs.JIRA_BASE_URL}/rest/tempo-timesheets/4/worklogs"
     params = {
         "user": user_key,
         "dateFrom": date_from,
         "dateTo": date_to,
-        "limit": 1000,
+        "limit": TEMPO_PAGE_LIMIT,
     }
-    resp = requests.get(url, headers=get_tempo_headers(), params=params)
-    if resp.status_code != 200:
-        print(f"Tempo API error: {resp.status_code} {resp.text}")
-    return resp.json()  # List of worklog dicts
+    worklogs = []
+    while url:
+        resp = jira_request(
+            "GET", url, "tempo_worklogs", headers=get_tempo_headers(), params=params
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        if isinstance(data, list):
+            worklogs.extend(data)
+            break
+        worklogs.extend(data.get("results", []))
+        # The next link carries the query (with the new offset) itself
+        url = data.get("metadata", {}).get("next")
+        params = None
+    return worklogs
+
+
+def iter_days(date_from, date_to):
+    day = datetime.strptime(date_from, "%Y-%m-%d").date()
+    last = datetime.strptime(date_to, "%Y-%m-%d").date()
+    while day <= last:
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+def get_tempo_worklogs(date_from, date_to=None, user_key=None):
+    """
+    Worklogs for a user between date_from and date_to (YYYY-MM-DD, inclusive; default
+    date_to = date_from), in date order. Served from day buckets; the uncached days are
+    fetched with one paginated range request.
+    """
+    if not user_key:
+        user_key = get_tempo_user_key()
+    if not date_from:
+        date_from = datetime.now().strftime("%Y-%m-%d")
+    if not date_to:
+        date_to = date_from
+    days = list(iter_days(date_from, date_to))
+    tenant = tenants.tenant_name()
+    buckets = {day: _tempo_cache.get((tenant, user_key, day)) for day in days}
+    missing = [day for day, logs in buckets.items() if logs is None]
+    if missing:
+        fetched = {day: [] for day in iter_days(missing[0], missing[-1])}
+        for wl in fetch_tempo_worklogs(missing[0], missing[-1], user_key):
+            day = (wl.get("startDate") or wl.get("started") or "")[:10]
+            if day in fetched:
+                fetched[day].append(wl)
+        today = datetime.now().strftime("%Y-%m-%d")
+        for day, logs in fetched.items():
+            _tempo_cache.set(
+                (tenant, user_key, day), logs, ttl=float("inf") if day < today else None
+            )
+        buckets.update(fetched)
+    return [wl for day in days for wl in buckets[day]]
+
+
+def get_tempo_hours_by_day(date_from, date_to=None, user_key=None):
+    """{"YYYY-MM-DD": hours} for every day in the range (days without worklogs are 0.0)."""
+    totals = {day: 0 for day in iter_days(date_from, date_to or date_from)}
+    for wl in get_tempo_worklogs(date_from, date_to, user_key):
+        day = (wl.get("startDate") or wl.get("started") or "")[:10]
+        if day in totals:
+            totals[day] += wl.get("timeSpentSeconds", 0)
+    return {day: round(seconds / 3600, 2) for day, seconds in totals.items()}
+
+
+def invalidate_tempo_day(date_str=None):
+    """Drop the current tenant's cached Tempo worklogs of a day (default today)."""
+    day = date_str or datetime.now().strftime("%Y-%m-%d")
+    tenant = tenants.tenant_name()
+    for key in _tempo_cache.keys():
+        if key[0] == tenant and key[2] == day:
+            _tempo_cache.pop(key)
 
 
 def get_tempo_hours_logged(date_str, user_key=None):
@@ -163,6 +287,14 @@ JIRA_BASE_URL = Configs.JIRA_BASE_URL
 JIRA_USER = Configs.JIRA_USER
 JIRA_API_TOKEN = Configs.JIRA_API_TOKEN
 START_TIME_FILE = os.environ.get("START_TIME_FILE", "./.worklog_start_time")
+
+
+def start_time_file():
+    """START_TIME_FILE, with a per-tenant suffix when serving a tenant (see tenants.py)."""
+    tenant = tenants.current_tenant()
+    return f"{START_TIME_FILE}.{tenant.name}" if tenant else START_TIME_FILE
+
+
 JIRA_ROUND_MINUTES = int(os.environ.get("JIRA_ROUND_MINUTES", "15"))
 JIRA_MIN_LOG_MINUTES = int(os.environ.get("JIRA_MIN_LOG_MINUTES", "15"))
 JIRA_DONE_STATUS = os.environ.get("JIRA_DONE_STATUS", "Done")
@@ -176,16 +308,16 @@ JIRA_DAY_CUTOFF_TIME = os.environ.get(
 
 def set_start_time():
     # Ensure the directory exists before writing the file
-    os.makedirs(os.path.dirname(START_TIME_FILE), exist_ok=True)
-    with open(START_TIME_FILE, "w") as f:
+    os.makedirs(os.path.dirname(start_time_file()), exist_ok=True)
+    with open(start_time_file(), "w") as f:
         f.write(str(time.time()))
 
 
 def get_start_time():
-    if not os.path.exists(START_TIME_FILE):
+    if not os.path.exists(start_time_file()):
         set_start_time()
         return time.time()
-    with open(START_TIME_FILE, "r") as f:
+    with open(start_time_file(), "r") as f:
         saved_time = float(f.read().strip())
     now = datetime.now()
     saved_dt = datetime.fromtimestamp(saved_time)
@@ -196,7 +328,7 @@ def get_start_time():
     )
     # If saved time is not today and current time is after cutoff time, delete the file and use now
     if (saved_dt.date() != now.date()) and (now >= cutoff):
-        os.remove(START_TIME_FILE)
+        os.remove(start_time_file())
         return time.time()
     return saved_time
 
@@ -222,17 +354,19 @@ def get_open_tickets():
     url = f"{JIRA_BASE_URL}/rest/api/2/search"
     params_user = {
         "jql": jql_user,
-        "fields": "key,summary,description,project,parent,issuetype,customfield_10008,customfield_10009",
+        "fields": "key,summary,description,project,parent,issuetype,status,customfield_10008,customfield_10009",
         "maxResults": 1000,
     }
-    response_user = requests.get(
-        url, params=params_user, auth=(JIRA_USER, JIRA_API_TOKEN)
-    )
+    response_user = jira_request("GET", url, "search", params=params_user)
     if response_user.status_code != 200:
-        print("Error fetching tickets:", response_user.status_code, response_user.text)
+        logger.error(
+            "Error fetching tickets: %s %s", response_user.status_code, response_user.text
+        )
         return []
     data_user = response_user.json()
     user_issues = data_user.get("issues", [])
+    # Lets close_ticket use the cached transition id without a lookup
+    remember_workflows(user_issues)
 
     # Step 2: Collect all parent keys (epic/main task) for user's tickets
     parent_keys = set()
@@ -255,18 +389,26 @@ def get_open_tickets():
             "fields": "key,summary,description,project,parent,issuetype,customfield_10008,customfield_10009",
             "maxResults": 1000,
         }
-        response_parents = requests.get(
-            url, params=params_parents, auth=(JIRA_USER, JIRA_API_TOKEN)
-        )
+        response_parents = jira_request("GET", url, "search", params=params_parents)
         if response_parents.status_code == 200:
             data_parents = response_parents.json()
             parent_issues = data_parents.get("issues", [])
 
-    # Step 4: Build the issues list for hierarchy (user's tickets + their parents)
-    issues = user_issues + [
-        p for p in parent_issues if p["key"] not in {i["key"] for i in user_issues}
-    ]
+    # Step 4: Build the hierarchy from the user's tickets + their parents
+    user_keys = {i["key"] for i in user_issues}
+    issues = user_issues + [p for p in parent_issues if p["key"] not in user_keys]
+    with tracing.span("tickets.build_hierarchy", issues=len(issues)):
+        return build_ticket_hierarchy(issues)
+
 
+def build_ticket_hierarchy(issues):
+    """
+    Group JIRA search issues into Project > Epic > Main Task > Ticket:
+    {project_id: {"name", "epics": {epic_key: {"name", "type", "main_tasks":
+        {main_task_key: {"summary", "type", "tickets": [{"key", "summary", "type"}]}}}}}}
+    Tickets without an epic go under "No Epic", without a parent task under "No Main Task".
+    """
+    issues_by_key = {issue["key"]: issue for issue in issues}
     # Build hierarchy: Project > Epic > Main Task > Ticket
     hierarchy = {}
     # First pass: collect all Epics per project
@@ -330,9 +472,7 @@ def get_open_tickets():
             current_parent_key = parent_key
             found_epic = False
             while current_parent_key:
-                parent_issue = next(
-                    (i for i in issues if i["key"] == current_parent_key), None
-                )
+                parent_issue = issues_by_key.get(current_parent_key)
                 if not parent_issue:
                     break
                 parent_fields = parent_issue.get("fields", {})
@@ -404,6 +544,7 @@ def get_open_tickets():
 
 
 def log_work(ticket_key, time_spent, comment, date_str=None):
+    """Add a worklog to the ticket. Returns True if JIRA stored it."""
     url = f"{JIRA_BASE_URL}/rest/api/2/issue/{ticket_key}/worklog"
     payload = {"timeSpent": time_spent, "comment": comment}
     if date_str:
@@ -411,34 +552,217 @@ def log_work(ticket_key, time_spent, comment, date_str=None):
         payload["started"] = (
             f"{date_str}T09:00:00.000+0000"  # Default 9am, adjust as needed
         )
-    response = requests.post(url, json=payload, auth=(JIRA_USER, JIRA_API_TOKEN))
+    response = jira_request("POST", url, "issue_worklog", json=payload)
+    invalidate_tempo_day(date_str)
     if response.status_code == 201:
-        print("JIRA hours logged.")
-    else:
-        print("Error logging work:", response.status_code, response.text)
+        logger.info("JIRA hours logged on %s (%s).", ticket_key, time_spent)
+        return True
+    logger.error("Error logging work: %s %s", response.status_code, response.text)
+    return False
+
+
+# --- TRANSITION CACHE ---
+# Transition ids are fixed per workflow, so the id of the transition to JIRA_DONE_STATUS is
+# cached per (project, issue type, current status). The workflow of each open ticket is
+# remembered from the ticket searches, so closing a known ticket is a single POST.
+TRANSITION_CACHE_TTL = float(os.environ.get("TRANSITION_CACHE_TTL", "86400"))
+# (tenant, project, issue type, status) -> done transition id
+_transition_cache = TTLCache(ttl=TRANSITION_CACHE_TTL, maxsize=1024)
+# (tenant, issue key) -> (project, issue type, status)
+_issue_workflows = TTLCache(ttl=TRANSITION_CACHE_TTL, maxsize=10000)
+register_cache("transitions", _transition_cache)
+
+
+def workflow_key(fields):
+    """(project, issue type, status) from an issue's fields, or None if any is missing."""
+    project = fields.get("project") or {}
+    key = (
+        project.get("key") or project.get("id"),
+        (fields.get("issuetype") or {}).get("name"),
+        (fields.get("status") or {}).get("name"),
+    )
+    return key if all(key) else None
 
 
-def close_ticket(ticket_key, date_str=None):
-    url = f"{JIRA_BASE_URL}/rest/api/2/issue/{ticket_key}/transitions"
-    response = requests.get(url, auth=(JIRA_USER, JIRA_API_TOKEN))
-    if response.status_code != 200:
-        print("Error fetching transitions:", response.status_code, response.text)
-        return
-    transitions = response.json().get("transitions", [])
-    done_id = None
+def remember_workflows(issues):
+    """Record the workflow key of searched issues for later close_ticket calls."""
+    tenant = tenants.tenant_name()
+    for issue in issues:
+        workflow = workflow_key(issue.get("fields", {}))
+        if workflow:
+            _issue_workflows.set((tenant, issue["key"]), workflow)
+
+
+def find_done_transition(transitions):
     for t in transitions:
-        if t["to"]["name"] == "Done":
-            done_id = t["id"]
-            break
-    if done_id:
-        payload = {"transition": {"id": done_id}}
-        resp = requests.post(url, json=payload, auth=(JIRA_USER, JIRA_API_TOKEN))
-        if resp.status_code == 204:
-            print(f"Ticket {ticket_key} closed.")
+        if t["to"]["name"].lower() == JIRA_DONE_STATUS.lower():
+            return t["id"]
+    return None
+
+
+def lookup_done_transition(ticket_key):
+    """
+    One GET of the issue with its transitions; caches and returns (workflow, done id).
+    Either is None when unknown (the error is logged).
+    """
+    url = f"{JIRA_BASE_URL}/rest/api/2/issue/{ticket_key}"
+    params = {"fields": "project,issuetype,status", "expand": "transitions"}
+    response = jira_request("GET", url, "issue", params=params)
+    if response.status_code != 200:
+        logger.error(
+            "Error fetching transitions: %s %s", response.status_code, response.text
+        )
+        return None, None
+    data = response.json()
+    workflow = workflow_key(data.get("fields", {}))
+    done_id = find_done_transition(data.get("transitions", []))
+    if workflow and done_id:
+        _transition_cache.set((tenants.tenant_name(),) + workflow, done_id)
+    if done_id is None:
+        logger.warning("No '%s' transition available for %s.", JIRA_DONE_STATUS, ticket_key)
+    return workflow, done_id
+
+
+def cached_done_transition(ticket_key, fields=None):
+    """(workflow, done id) from the caches without any request; (workflow|None, None) on a miss."""
+    tenant = tenants.tenant_name()
+    workflow = workflow_key(fields) if fields else _issue_workflows.get((tenant, ticket_key))
+    if workflow is None:
+        return None, None
+    return workflow, _transition_cache.get((tenant,) + workflow)
+
+
+def close_ticket(ticket_key, date_str=None, fields=None):
+    """
+    Transition the ticket to JIRA_DONE_STATUS. Returns True if JIRA accepted the transition.
+    With a cached transition id (workflow known from `fields` or an earlier ticket search)
+    this is one POST; otherwise one GET of the issue's transitions fills the cache first.
+    A 400 on a cached id (the workflow changed) drops it and retries with a fresh lookup.
+    """
+    tenant = tenants.tenant_name()
+    url = f"{JIRA_BASE_URL}/rest/api/2/issue/{ticket_key}/transitions"
+    workflow, done_id = cached_done_transition(ticket_key, fields)
+    cached = done_id is not None
+    if not cached:
+        workflow, done_id = lookup_done_transition(ticket_key)
+        if done_id is None:
+            return False
+    resp = jira_request("POST", url, "transitions", json={"transition": {"id": done_id}})
+    if resp.status_code == 400 and cached:
+        logger.info("Cached transition %s rejected for %s; looking it up again.", done_id, ticket_key)
+        _transition_cache.pop((tenant,) + workflow)
+        workflow, done_id = lookup_done_transition(ticket_key)
+        if done_id is None:
+            return False
+        resp = jira_request("POST", url, "transitions", json={"transition": {"id": done_id}})
+    if resp.status_code == 204:
+        logger.info("Ticket %s closed.", ticket_key)
+        # Its status changed: the remembered workflow key no longer applies
+        _issue_workflows.pop((tenant, ticket_key))
+        return True
+    logger.error("Error closing ticket: %s %s", resp.status_code, resp.text)
+    return False
+
+
+# --- BULK CLOSE ---
+CLOSE_BATCH_MAX = int(os.environ.get("CLOSE_BATCH_MAX", "100"))  # tickets per request
+CLOSE_BATCH_CONCURRENCY = int(os.environ.get("CLOSE_BATCH_CONCURRENCY", "4"))
+# Single-user mode has no tenant limiter: bulk closes share this process-wide one
+_default_limiter = tenants.TokenBucket(tenants.TENANT_RATE_LIMIT, tenants.TENANT_BURST)
+
+
+def search_issue_fields(keys, fields="project,issuetype,status"):
+    """
+    {key: fields} for the given issue keys from one paginated `key in (...)` search;
+    {} if the search fails (e.g. JIRA rejects an unknown key), so callers fall back to
+    per-ticket lookups.
+    """
+    found = {}
+    jql = f"key in ({', '.join(keys)})"
+    try:
+        for issues in iter_search_pages(jql, fields, page_size=len(keys)):
+            for issue in issues:
+                found[issue["key"]] = issue.get("fields", {})
+    except requests.RequestException as e:
+        logger.warning("Bulk close search failed, looking tickets up one by one: %s", e)
+        return {}
+    return found
+
+
+def wait_for_rate_limit():
+    """Block until the current tenant's (or, single-user, the process-wide) rate limiter admits an upstream call."""
+    tenant = tenants.current_tenant()
+    limiter = _default_limiter if tenant is None else tenant.limiter
+    while True:
+        delay = limiter.acquire()
+        if not delay:
+            return
+        time.sleep(min(delay, 1.0))
+
+
+def close_tickets(keys):
+    """
+    Close many tickets. One search fetches their workflows; per workflow whose done
+    transition id is not cached yet, a single ticket is closed first (learning the id),
+    then the rest are closed concurrently (CLOSE_BATCH_CONCURRENCY at a time, each call
+    admitted by the tenant's rate limiter, or single-user by a process-wide one), so most
+    tickets cost one POST.
+    A ticket whose JIRA call raises (timeout, connection reset, malformed response) fails
+    on its own; the rest of the batch still runs. Returns [{"ticket", "closed", "workflow", "error"}] in the
+    order of keys (error is None for closed tickets).
+    """
+    fields_by_key = search_issue_fields(keys)
+    groups = {}
+    for key in keys:
+        fields = fields_by_key.get(key)
+        workflow = workflow_key(fields) if fields else None
+        groups.setdefault(workflow, []).append(key)
+
+    # First wave: one ticket per workflow with an unknown transition id (and every
+    # ticket whose workflow is unknown, since those need their own lookup anyway)
+    first, rest = [], []
+    for workflow, group in groups.items():
+        if workflow is None:
+            first.extend(group)
+        elif cached_done_transition(group[0], fields_by_key[group[0]])[1] is None:
+            first.append(group[0])
+            rest.extend(group[1:])
         else:
-            print("Error closing ticket:", resp.status_code, resp.text)
-    else:
-        print(f"No 'Done' transition available for {ticket_key}.")
+            rest.extend(group)
+
+    closed = {}
+    errors = {}
+    done = 0
+
+    def close_one(key):
+        try:
+            wait_for_rate_limit()
+            ok = close_ticket(key, fields=fields_by_key.get(key))
+            return key, ok, None if ok else "JIRA did not close the ticket"
+        except requests.RequestException as e:
+            logger.warning("Closing %s failed: %s", key, e)
+            return key, False, f"{type(e).__name__}: {e}"
+
+    with ThreadPoolExecutor(max_workers=max(1, CLOSE_BATCH_CONCURRENCY)) as pool:
+        for wave in (first, rest):
+            futures = [pool.submit(contextvars.copy_context().run, close_one, key) for key in wave]
+            for future in futures:
+                key, ok, error = future.result()
+                closed[key] = ok
+                errors[key] = error
+                done += 1
+                jobs.report_progress(done, len(keys), f"Closed {key}" if ok else f"Failed {key}")
+
+    results = []
+    for key in keys:
+        workflow = workflow_key(fields_by_key[key]) if key in fields_by_key else None
+        results.append({
+            "ticket": key,
+            "closed": closed[key],
+            "workflow": "/".join(workflow) if workflow else None,
+            "error": errors[key],
+        })
+    return results
 
 
 def extract_ticket_key(commit_msg):
@@ -515,7 +839,7 @@ def extract_commit_info(commit_msg):
         start_str = start_match.group(1)
         start_time = parse_start_time_str(start_str)
         # Save the start time to file for future auto-calculate
-        with open(START_TIME_FILE, "w") as f:
+        with open(start_time_file(), "w") as f:
             f.write(str(start_time))
     if hours_match:
         duration_tokens = re.findall(r"\d+h|\d+m", hours_match.group(1))
@@ -587,8 +911,8 @@ def print_start_time():
 # 1. When set_start_time() is called (e.g., after logging work, or if .worklog_start_time is missing)
 def set_start_time():
     # Ensure the directory exists before writing the file
-    os.makedirs(os.path.dirname(START_TIME_FILE), exist_ok=True)
-    with open(START_TIME_FILE, "w") as f:
+    os.makedirs(os.path.dirname(start_time_file()), exist_ok=True)
+    with open(start_time_file(), "w") as f:
         f.write(str(time.time()))
 
 
@@ -597,7 +921,7 @@ def set_start_time_manual(hhmm=None):
     from datetime import datetime, timedelta
 
     # Ensure the directory exists before writing the file
-    os.makedirs(os.path.dirname(START_TIME_FILE), exist_ok=True)
+    os.makedirs(os.path.dirname(start_time_file()), exist_ok=True)
     if hhmm:
         # Accept both "09:30" and "12:45pm" formats
         try:
@@ -623,16 +947,16 @@ def set_start_time_manual(hhmm=None):
                 manual_time -= timedelta(days=1)
             timestamp = manual_time.timestamp()
         except Exception:
-            print(
+            logger.warning(
                 "Invalid time format. Use HH:MM (e.g., 09:30) or HH:MMam/pm (e.g., 12:45pm)"
             )
             return
     else:
         timestamp = time.time()
-    with open(START_TIME_FILE, "w") as f:
+    with open(start_time_file(), "w") as f:
         f.write(str(timestamp))
     dt_str = datetime.fromtimestamp(timestamp).strftime("%H:%M")
-    print(f"Workday started at {hhmm if hhmm else 'now'} ({dt_str}).")
+    logger.info("Workday started at %s (%s).", hhmm if hhmm else "now", dt_str)
 
 
 # 3. When -st <time> is passed in the commit message (inside extract_commit_info)
@@ -662,7 +986,7 @@ def extract_commit_info(commit_msg):
         start_str = start_match.group(1)
         start_time = parse_start_time_str(start_str)
         # Save the start time to file for future auto-calculate
-        with open(START_TIME_FILE, "w") as f:
+        with open(start_time_file(), "w") as f:
             f.write(str(start_time))
     if hours_match:
         duration_tokens = re.findall(r"\d+h|\d+m", hours_match.group(1))
@@ -726,7 +1050,7 @@ def set_start_time_manual(hhmm=None):
     from datetime import datetime, timedelta
 
     # Ensure the directory exists before writing the file
-    os.makedirs(os.path.dirname(START_TIME_FILE), exist_ok=True)
+    os.makedirs(os.path.dirname(start_time_file()), exist_ok=True)
     if hhmm:
         # Accept both "09:30" and "12:45pm" formats
         try:
@@ -752,16 +1076,16 @@ def set_start_time_manual(hhmm=None):
                 manual_time -= timedelta(days=1)
             timestamp = manual_time.timestamp()
         except Exception:
-            print(
+            logger.warning(
                 "Invalid time format. Use HH:MM (e.g., 09:30) or HH:MMam/pm (e.g., 12:45pm)"
             )
             return
     else:
         timestamp = time.time()
-    with open(START_TIME_FILE, "w") as f:
+    with open(start_time_file(), "w") as f:
         f.write(str(timestamp))
     dt_str = datetime.fromtimestamp(timestamp).strftime("%H:%M")
-    print(f"Workday started at {hhmm if hhmm else 'now'} ({dt_str}).")
+    logger.info("Workday started at %s (%s).", hhmm if hhmm else "now", dt_str)
 
 
 def test_start_time_extraction():
@@ -923,9 +1247,11 @@ def test_start_time_extraction():
     )
 
 
-def get_hours_logged(date_str=None):
+def fetch_worklog_issues(date_str=None):
     """
-    Returns total hours logged for the given date (YYYY-MM-DD) by the current user (float, in hours).
+    Runs the worklog search for the given date (YYYY-MM-DD, default today) for the current user.
+    Returns (date_query, issues), with issues = None if the JIRA request failed.
+    One search serves both the hours total and the worklog list (see sum_worklog_hours, flatten_worklogs).
     """
     from datetime import datetime
 
@@ -934,18 +1260,22 @@ def get_hours_logged(date_str=None):
     else:
         date_query = datetime.now().strftime("%Y-%m-%d")
     url = f"{JIRA_BASE_URL}/rest/api/2/search"
-    jql = f"worklogAuthor = currentUser() AND worklogDate >= {date_query} AND worklogDate <= {date_query}"
+    jql = f"worklogAuthor = currentUser() AND worklogDate = {date_query}"
     params = {
         "jql": jql,
-        "fields": "worklog",
+        "fields": "worklog,summary",
         "maxResults": 100,
     }
-    response = requests.get(url, params=params, auth=(JIRA_USER, JIRA_API_TOKEN))
+    response = jira_request("GET", url, "search", params=params)
     if response.status_code != 200:
-        return 0.0
-    data = response.json()
+        return date_query, None
+    return date_query, response.json().get("issues", [])
+
+
+def sum_worklog_hours(issues, date_query):
+    """Total hours (float) of the worklogs in issues that started on date_query."""
     total_seconds = 0
-    for issue in data.get("issues", []):
+    for issue in issues:
         worklogs = issue.get("fields", {}).get("worklog", {}).get("worklogs", [])
         for wl in worklogs:
             started = wl.get("started", "")
@@ -954,6 +1284,44 @@ def get_hours_logged(date_str=None):
     return round(total_seconds / 3600, 2)
 
 
+def flatten_worklogs(issues, date_query):
+    """
+    Flattens the worklogs in issues that started on date_query, sorted by started time.
+    Each entry: dict with keys: issue_key, summary, comment, time_spent, started, worklog_id
+    """
+    logs = []
+    for issue in issues:
+        issue_key = issue.get("key")
+        summary = issue.get("fields", {}).get("summary", "")
+        worklogs = issue.get("fields", {}).get("worklog", {}).get("worklogs", [])
+        for wl in worklogs:
+            started = wl.get("started", "")
+            if started.startswith(date_query):
+                logs.append(
+                    {
+                        "issue_key": issue_key,
+                        "summary": summary,
+                        "comment": wl.get("comment", ""),
+                        "time_spent": wl.get("timeSpent", ""),
+                        "started": started,
+                        "worklog_id": wl.get("id", ""),
+                    }
+                )
+    # Sort by started time
+    logs.sort(key=lambda x: x["started"])
+    return logs
+
+
+def get_hours_logged(date_str=None):
+    """
+    Returns total hours logged for the given date (YYYY-MM-DD) by the current user (float, in hours).
+    """
+    date_query, issues = fetch_worklog_issues(date_str)
+    if issues is None:
+        return 0.0
+    return sum_worklog_hours(issues, date_query)
+
+
 def delete_last_worklog(date_str=None):
     """
     Deletes the most recent worklog entry for the current user for the given date.
@@ -972,7 +1340,7 @@ def delete_last_worklog(date_str=None):
         "fields": "worklog",
         "maxResults": 10,
     }
-    response = requests.get(url, params=params, auth=(JIRA_USER, JIRA_API_TOKEN))
+    response = jira_request("GET", url, "search", params=params)
     if response.status_code != 200:
         return {"success": False, "message": "Failed to fetch worklogs."}
     data = response.json()
@@ -994,7 +1362,8 @@ def delete_last_worklog(date_str=None):
     issue_key = last_issue["key"]
     worklog_id = last_wl["id"]
     del_url = f"{JIRA_BASE_URL}/rest/api/2/issue/{issue_key}/worklog/{worklog_id}"
-    del_resp = requests.delete(del_url, auth=(JIRA_USER, JIRA_API_TOKEN))
+    del_resp = jira_request("DELETE", del_url, "issue_worklog")
+    invalidate_tempo_day(date_query)
     if del_resp.status_code == 204:
         return {"success": True, "message": f"Deleted last worklog for {issue_key}."}
     else:
@@ -1018,15 +1387,17 @@ def delete_all_worklogs(date_str=None):
         }
     deleted = 0
     errors = []
-    for log in logs:
+    for done, log in enumerate(logs):
+        jobs.report_progress(done, len(logs), f"Deleting worklogs for {date_str or 'today'}")
         issue_key = log["issue_key"]
         worklog_id = log["worklog_id"]
         del_url = f"{JIRA_BASE_URL}/rest/api/2/issue/{issue_key}/worklog/{worklog_id}"
-        del_resp = requests.delete(del_url, auth=(JIRA_USER, JIRA_API_TOKEN))
+        del_resp = jira_request("DELETE", del_url, "issue_worklog")
         if del_resp.status_code == 204:
             deleted += 1
         else:
             errors.append(f"{issue_key} ({worklog_id}): {del_resp.text}")
+    invalidate_tempo_day(date_str)
     if errors:
         return {
             "success": False,
@@ -1045,44 +1416,412 @@ def get_all_worklogs(date_str=None):
     Returns a list of all worklogs for the given date for the current user.
     Each entry: dict with keys: issue_key, summary, comment, time_spent, started, worklog_id
     """
-    from datetime import datetime
+    date_query, issues = fetch_worklog_issues(date_str)
+    if issues is None:
+        return []
+    return flatten_worklogs(issues, date_query)
 
-    if date_str:
-        date_query = date_str
-    else:
-        date_query = datetime.now().strftime("%Y-%m-%d")
+
+# --- WORKLOG RANGE SECTION ---
+SEARCH_PAGE_SIZE = int(os.environ.get("JIRA_SEARCH_PAGE_SIZE", "100"))
+RANGE_SEARCH_FIELDS = "summary,worklog,issuetype,parent,customfield_10008,customfield_10009"
+RANGE_GROUP_BY = ("day", "ticket", "epic")
+
+
+def iter_search_pages(jql, fields, page_size=None):
+    """Yield the issue pages of a JIRA search, following startAt/total. Raises requests.HTTPError."""
     url = f"{JIRA_BASE_URL}/rest/api/2/search"
-    jql = f"worklogAuthor = currentUser() AND worklogDate = {date_query}"
-    params = {
-        "jql": jql,
-        "fields": "worklog,summary",
-        "maxResults": 20,
+    start_at = 0
+    while True:
+        params = {
+            "jql": jql,
+            "fields": fields,
+            "startAt": start_at,
+            "maxResults": page_size or SEARCH_PAGE_SIZE,
+        }
+        response = jira_request("GET", url, "search", params=params)
+        response.raise_for_status()
+        data = response.json()
+        issues = data.get("issues", [])
+        yield issues
+        start_at += len(issues)
+        if not issues or start_at >= data.get("total", 0):
+            return
+
+
+def fetch_issue_worklogs(issue):
+    """
+    All worklogs of a search result issue. JIRA embeds at most 20 worklogs per issue;
+    when the embedded list is truncated the full list is fetched from the issue.
+    """
+    embedded = issue.get("fields", {}).get("worklog") or {}
+    worklogs = embedded.get("worklogs", [])
+    if embedded.get("total", len(worklogs)) <= len(worklogs):
+        return worklogs
+    url = f"{JIRA_BASE_URL}/rest/api/2/issue/{issue['key']}/worklog"
+    worklogs = []
+    while True:
+        response = jira_request(
+            "GET", url, "issue_worklog", params={"startAt": len(worklogs), "maxResults": 1000}
+        )
+        response.raise_for_status()
+        data = response.json()
+        page = data.get("worklogs", [])
+        worklogs.extend(page)
+        if not page or len(worklogs) >= data.get("total", 0):
+            return worklogs
+
+
+def range_jql(date_from, date_to):
+    return (
+        f"worklogAuthor = currentUser() AND worklogDate >= {date_from} "
+        f"AND worklogDate <= {date_to}"
+    )
+
+
+def iter_range_worklogs(date_from, date_to, pages=None):
+    """
+    Yield (issue, worklog) for the current user's worklog search between date_from and
+    date_to (YYYY-MM-DD, inclusive), skipping worklogs of those issues outside the range.
+    One paginated search; `pages` can supply the issue pages instead.
+    """
+    if pages is None:
+        pages = iter_search_pages(range_jql(date_from, date_to), RANGE_SEARCH_FIELDS)
+    for issues in pages:
+        for issue in issues:
+            for wl in fetch_issue_worklogs(issue):
+                if date_from <= wl.get("started", "")[:10] <= date_to:
+                    yield issue, wl
+
+
+def iter_worklog_export_rows(date_from, date_to):
+    """
+    Yield export rows (worklog_entry + "seconds") for the range, page by page: the next
+    search page is fetched in the background while the current one is consumed, so memory
+    stays bounded by two pages whatever the range size. Rows come in search order.
+    """
+    pages = prefetch(iter_search_pages(range_jql(date_from, date_to), RANGE_SEARCH_FIELDS))
+    try:
+        for issue, wl in iter_range_worklogs(date_from, date_to, pages=pages):
+            row = worklog_entry(issue, wl)
+            row["seconds"] = wl.get("timeSpentSeconds", 0)
+            yield row
+    finally:
+        pages.close()
+
+
+def worklog_entry(issue, wl):
+    """A worklog in the shape returned by flatten_worklogs, plus its date."""
+    started = wl.get("started", "")
+    return {
+        "issue_key": issue.get("key"),
+        "summary": issue.get("fields", {}).get("summary", ""),
+        "comment": wl.get("comment", ""),
+        "time_spent": wl.get("timeSpent", ""),
+        "started": started,
+        "worklog_id": wl.get("id", ""),
+        "date": started[:10],
     }
-    response = requests.get(url, params=params, auth=(JIRA_USER, JIRA_API_TOKEN))
-    if response.status_code != 200:
-        return []
-    data = response.json()
-    logs = []
-    for issue in data.get("issues", []):
-        issue_key = issue.get("key")
-        summary = issue.get("fields", {}).get("summary", "")
-        worklogs = issue.get("fields", {}).get("worklog", {}).get("worklogs", [])
-        for wl in worklogs:
-            started = wl.get("started", "")
-            if started.startswith(date_query):
-                logs.append(
-                    {
-                        "issue_key": issue_key,
-                        "summary": summary,
-                        "comment": wl.get("comment", ""),
-                        "time_spent": wl.get("timeSpent", ""),
-                        "started": started,
-                        "worklog_id": wl.get("id", ""),
-                    }
-                )
-    # Sort by started time
-    logs.sort(key=lambda x: x["started"])
-    return logs
+
+
+def epic_of(key, fields):
+    """(epic key, epic name) from an issue's own fields, or None if that needs its parent."""
+    issuetype = fields.get("issuetype", {}).get("name")
+    if issuetype == "Epic":
+        return key, fields.get("summary", key)
+    epic_link = fields.get("customfield_10008") or fields.get("customfield_10009")
+    if epic_link:
+        return epic_link, epic_link
+    parent = fields.get("parent")
+    if parent and parent.get("fields", {}).get("issuetype", {}).get("name") == "Epic":
+        return parent["key"], parent["fields"].get("summary", parent["key"])
+    return None
+
+
+def resolve_epics(fields_by_key):
+    """
+    {ticket key: (epic key, epic name)} for the given issue fields; tickets without an epic
+    map to "No Epic". Sub-tasks are resolved through their parents with one batched search,
+    and the names of epics known only from an epic link with another.
+    """
+    epics = {}
+    pending = {}  # ticket key -> parent key
+    for key, fields in fields_by_key.items():
+        epic = epic_of(key, fields)
+        parent = fields.get("parent")
+        if epic is None and parent:
+            pending[key] = parent["key"]
+        epics[key] = epic or ("No Epic", "No Epic")
+    if pending:
+        parent_keys = sorted(set(pending.values()))
+        fields = RANGE_SEARCH_FIELDS.replace("worklog,", "")
+        parents = {}
+        # Chunked to keep the JQL (a query parameter) a reasonable length
+        for start in range(0, len(parent_keys), SEARCH_PAGE_SIZE):
+            jql = "key in (" + ",".join(parent_keys[start : start + SEARCH_PAGE_SIZE]) + ")"
+            for issues in iter_search_pages(jql, fields):
+                for issue in issues:
+                    parents[issue["key"]] = epic_of(issue["key"], issue.get("fields", {}))
+        for key, parent_key in pending.items():
+            epics[key] = parents.get(parent_key) or ("No Epic", "No Epic")
+    # An epic link only carries the epic's key: look up the names in one batched search
+    linked = sorted(
+        {epic_key for epic_key, name in epics.values() if name == epic_key != "No Epic"}
+    )
+    names = {}
+    for start in range(0, len(linked), SEARCH_PAGE_SIZE):
+        jql = "key in (" + ",".join(linked[start : start + SEARCH_PAGE_SIZE]) + ")"
+        for issues in iter_search_pages(jql, "summary"):
+            for issue in issues:
+                names[issue["key"]] = issue.get("fields", {}).get("summary") or issue["key"]
+    if names:
+        epics = {
+            key: (epic_key, names.get(epic_key, name)) for key, (epic_key, name) in epics.items()
+        }
+    return epics
+
+
+def aggregate_worklog_range(date_from, date_to, group_by=None, include_worklogs=False):
+    """
+    Totals of the current user's worklogs between date_from and date_to (inclusive) from one
+    paginated search. Seconds are summed into arrays indexed by day and by ticket; epic totals
+    are folded from the ticket totals.
+    Returns {"from", "to", "hours", "days": {date: hours}} plus, with group_by
+    ("day", "ticket" or "epic"), "groups": [{"key", "name", "hours", "count"}] and, with
+    include_worklogs, "worklogs" (flatten_worklogs entries with a "date").
+    """
+    days = list(iter_days(date_from, date_to))
+    day_index = {day: i for i, day in enumerate(days)}
+    day_seconds = array("q", [0]) * len(days)
+    day_counts = array("q", [0]) * len(days)
+    ticket_index = {}
+    ticket_seconds = array("q")
+    ticket_counts = array("q")
+    ticket_fields = []
+    worklogs = []
+    for issue, wl in iter_range_worklogs(date_from, date_to):
+        i = ticket_index.get(issue["key"])
+        if i is None:
+            i = ticket_index[issue["key"]] = len(ticket_seconds)
+            ticket_seconds.append(0)
+            ticket_counts.append(0)
+            ticket_fields.append(issue.get("fields", {}))
+        seconds = wl.get("timeSpentSeconds", 0)
+        d = day_index[wl["started"][:10]]
+        day_seconds[d] += seconds
+        day_counts[d] += 1
+        ticket_seconds[i] += seconds
+        ticket_counts[i] += 1
+        if include_worklogs:
+            worklogs.append(worklog_entry(issue, wl))
+
+    result = {
+        "from": date_from,
+        "to": date_to,
+        "hours": round(sum(day_seconds) / 3600, 2),
+        "days": {day: round(day_seconds[i] / 3600, 2) for day, i in day_index.items()},
+    }
+    if group_by == "day":
+        groups = [(day, day, day_seconds[i], day_counts[i]) for day, i in day_index.items()]
+    elif group_by == "ticket":
+        groups = [
+            (key, ticket_fields[i].get("summary", ""), ticket_seconds[i], ticket_counts[i])
+            for key, i in ticket_index.items()
+        ]
+    elif group_by == "epic":
+        epics = resolve_epics({key: ticket_fields[i] for key, i in ticket_index.items()})
+        epic_index = {}
+        names, epic_seconds, epic_counts = [], array("q"), array("q")
+        for key, i in ticket_index.items():
+            epic_key, epic_name = epics[key]
+            e = epic_index.get(epic_key)
+            if e is None:
+                e = epic_index[epic_key] = len(names)
+                names.append(epic_name)
+                epic_seconds.append(0)
+                epic_counts.append(0)
+            epic_seconds[e] += ticket_seconds[i]
+            epic_counts[e] += ticket_counts[i]
+        groups = [
+            (key, names[e], epic_seconds[e], epic_counts[e]) for key, e in epic_index.items()
+        ]
+    else:
+        groups = None
+    if groups is not None:
+        if group_by != "day":
+            groups.sort(key=lambda g: g[2], reverse=True)
+        result["group_by"] = group_by
+        result["groups"] = [
+            {"key": key, "name": name, "hours": round(seconds / 3600, 2), "count": count}
+            for key, name, seconds, count in groups
+        ]
+    if include_worklogs:
+        worklogs.sort(key=lambda x: x["started"])
+        result["worklogs"] = worklogs
+    return result
+
+
+# --- TEAM TIMESHEET SECTION ---
+TEAM_MEMBERS = [m.strip() for m in os.environ.get("TEAM_MEMBERS", "").split(",") if m.strip()]
+TEAM_BATCH_SIZE = int(os.environ.get("TEAM_BATCH_SIZE", "10"))  # authors per JQL search
+TEAM_CONCURRENCY = int(os.environ.get("TEAM_CONCURRENCY", "4"))  # parallel searches
+TEAM_TODAY_TTL = float(os.environ.get("TEAM_TODAY_TTL", "300"))  # seconds
+# Account IDs ("557058:f58131cb-..."), usernames and e-mail addresses
+TEAM_USER_RE = re.compile(r"[\w.@:+\-]{1,128}")
+
+# Cells {(tenant, user, "YYYY-MM-DD"): seconds}. Past days never expire, today after TEAM_TODAY_TTL.
+_team_cache = TTLCache(ttl=TEAM_TODAY_TTL, maxsize=50000)
+register_cache("team", _team_cache)
+
+
+def valid_team_user(user):
+    return isinstance(user, str) and TEAM_USER_RE.fullmatch(user) is not None
+
+
+def jql_string(value):
+    """value as a double-quoted JQL string literal."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def worklog_author_ids(wl):
+    """The identifiers JIRA may use for a worklog's author (Cloud accountId, Server name/key)."""
+    author = wl.get("author") or {}
+    return {author.get(k) for k in ("accountId", "name", "key", "emailAddress")} - {None}
+
+
+def fetch_team_batch(users, date_from, date_to):
+    """
+    {(user, day): seconds} for one batch of users from one paginated
+    `worklogAuthor in (...)` search. Every (user, day) of the range is present.
+    """
+    cells = {(user, day): 0 for user in users for day in iter_days(date_from, date_to)}
+    wanted = set(users)
+    authors = ", ".join(jql_string(user) for user in users)
+    jql = (
+        f"worklogAuthor in ({authors}) AND worklogDate >= {date_from} "
+        f"AND worklogDate <= {date_to}"
+    )
+    pages = iter_search_pages(jql, "worklog")
+    for issue, wl in iter_range_worklogs(date_from, date_to, pages=pages):
+        for user in worklog_author_ids(wl) & wanted:
+            cells[(user, wl["started"][:10])] += wl.get("timeSpentSeconds", 0)
+    return cells
+
+
+def get_team_hours(users, date_from, date_to, refresh=False):
+    """
+    User x day hours matrix for the range. Cached cells are reused, so a refresh usually
+    only refetches today; missing cells are fetched with batched author searches
+    (TEAM_BATCH_SIZE authors each, TEAM_CONCURRENCY at a time).
+    Returns {"from", "to", "users", "days", "matrix": {user: [hours per day]},
+             "user_totals": {user: hours}, "day_totals": {day: hours}, "hours", "fetched"}.
+    """
+    days = list(iter_days(date_from, date_to))
+    today = datetime.now().strftime("%Y-%m-%d")
+    tenant = tenants.tenant_name()
+    cells = {}
+    missing = {}  # user -> days to fetch
+    for user in users:
+        for day in days:
+            seconds = None if refresh else _team_cache.get((tenant, user, day))
+            if seconds is None:
+                missing.setdefault(user, []).append(day)
+            else:
+                cells[(user, day)] = seconds
+
+    # Users needing the same days share batches (typically: everyone needs just today)
+    by_span = {}
+    for user, user_days in missing.items():
+        by_span.setdefault((user_days[0], user_days[-1]), []).append(user)
+    batches = [
+        (span_users[i : i + TEAM_BATCH_SIZE], first, last)
+        for (first, last), span_users in by_span.items()
+        for i in range(0, len(span_users), TEAM_BATCH_SIZE)
+    ]
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(TEAM_CONCURRENCY, len(batches))) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, fetch_team_batch, *batch)
+                for batch in batches
+            ]
+            for future in futures:
+                for key, seconds in future.result().items():
+                    cells[key] = seconds
+                    _team_cache.set(
+                        (tenant,) + key, seconds, ttl=float("inf") if key[1] < today else None
+                    )
+
+    matrix = {}
+    day_seconds = array("q", [0]) * len(days)
+    for user in users:
+        row = array("q", (cells.get((user, day), 0) for day in days))
+        for i, seconds in enumerate(row):
+            day_seconds[i] += seconds
+        matrix[user] = [round(seconds / 3600, 2) for seconds in row]
+    return {
+        "from": date_from,
+        "to": date_to,
+        "users": list(users),
+        "days": days,
+        "matrix": matrix,
+        "user_totals": {user: round(sum(row), 2) for user, row in matrix.items()},
+        "day_totals": {day: round(day_seconds[i] / 3600, 2) for i, day in enumerate(days)},
+        "hours": round(sum(day_seconds) / 3600, 2),
+        "fetched": len(batches),
+    }
+
+
+def head_commit_sha():
+    """SHA of HEAD in the current repository, or None outside git."""
+    try:
+        return (
+            subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL)
+            .decode()
+            .strip()
+        )
+    except Exception:
+        return None
+
+
+def log_commit_once(commit_sha, ticket_key, hours, comment, close_flag):
+    """
+    Log (and optionally close) a commit's ticket at most once per commit SHA, using the
+    SHA as idempotency key in the shared key store (see idempotency.py).
+    """
+    scope = f"{tenants.tenant_name()}:hook"
+    request = {"ticket": ticket_key, "hours": hours, "close": close_flag}
+    try:
+        state, stored = idempotency.claim(scope, commit_sha, idempotency.fingerprint(request))
+    except Exception as e:
+        logger.warning("Idempotency store unavailable (%s); logging without deduplication", e)
+        state, stored = None, None
+    if state == idempotency.REPLAY:
+        print(f"Commit {commit_sha[:8]} was already logged to {stored[0].get('ticket')}; skipping.")
+        return
+    if state == idempotency.IN_PROGRESS:
+        print(f"Commit {commit_sha[:8]} is being logged by another run; skipping.")
+        return
+    if state == idempotency.MISMATCH:
+        print(f"Commit {commit_sha[:8]} was already logged with different details; skipping.")
+        return
+    print(f"Logging {hours} to JIRA issue {ticket_key}...")
+    try:
+        logged = log_work(ticket_key, hours, comment)
+    except BaseException:
+        if state == idempotency.NEW:
+            idempotency.release(scope, commit_sha)
+        raise
+    # Only a confirmed worklog marks the SHA as done; otherwise the next run retries it
+    if not logged:
+        if state == idempotency.NEW:
+            idempotency.release(scope, commit_sha)
+        print(f"Could not log work to {ticket_key}; run `python commit.py` again to retry.")
+        return
+    if state == idempotency.NEW:
+        idempotency.complete(scope, commit_sha, request, 200)
+    if close_flag.lower() in ("c", "y") and not close_ticket(ticket_key):
+        print(f"Work logged, but {ticket_key} could not be closed; close it manually.")
+    set_start_time()  # Reset start time for next period
 
 
 def main():
@@ -1122,6 +1861,11 @@ def main():
         print(
             f"Detected JIRA info in commit message: {ticket_key}, {hours}, close: {close_flag}"
         )
+        # A hook run again for the same commit must not log the work twice
+        commit_sha = head_commit_sha()
+        if commit_sha:
+            log_commit_once(commit_sha, ticket_key, hours, comment, close_flag)
+            return
         selected_ticket = ticket_key
         logged_time = hours
         close_ticket_flag = close_flag
@@ -1176,6 +1920,9 @@ def main():
 
 
 if __name__ == "__main__":
+    from logging_setup import setup_logging
+
+    setup_logging()
     if len(sys.argv) > 1 and sys.argv[1] == "test":
         test_start_time_extraction()
     # Add CLI for deleting last log for today
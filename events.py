@@ -0,0 +1,236 @@
+"""
+Events - change feed behind the MCP server's GET /events stream
+
+The server publishes an event whenever it learns of a change: its own writes (worklog
+logged or deleted, ticket closed, the date's new hours total) and the background sync
+that refreshes today's hours and the open tickets for connected subscribers. UIs
+subscribe once (server-sent events) instead of re-fetching after every click.
+
+Events are rows in a SQLite file (EVENTS_DB) with increasing ids, so every server process
+streams the events of every other one, and a reconnecting client resumes after the last
+id it saw (Last-Event-ID). Only the newest EVENTS_KEEP events are kept.
+
+Open streams are counted per tenant and process in the same file, so a process can tell
+whether anyone (in any process) is listening before computing an event that costs an
+upstream call (has_subscribers).
+
+Server processes also read each other's "ticket" events to keep their closed-ticket
+overlay and ticket cache in step (mcp_server.apply_ticket_events).
+
+Event types:
+    hours    {"date", "hours"}                      hours total of a date changed
+    worklog  {"action": "logged"|"deleted", "date", ...}
+    ticket   {"ticket", "state": "closed"}          (/close_batch: {"tickets": [...], ...})
+    tickets  {"open", "keys"}                       open-ticket set changed (sync)
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+
+EVENTS_ENABLED = os.environ.get("EVENTS_ENABLED", "1").lower() in ("1", "true", "yes")
+EVENTS_DB = os.environ.get(
+    "EVENTS_DB", os.path.join(tempfile.gettempdir(), "ai-mini-agent", "events.sqlite3")
+)
+EVENTS_KEEP = int(os.environ.get("EVENTS_KEEP", "1000"))
+EVENTS_POLL_INTERVAL = float(os.environ.get("EVENTS_POLL_INTERVAL", "1"))
+EVENTS_HEARTBEAT = float(os.environ.get("EVENTS_HEARTBEAT", "15"))
+PRUNE_EVERY = 100  # publishes between pruning passes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant TEXT NOT NULL,
+    type TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_tenant_id ON events (tenant, id);
+CREATE INDEX IF NOT EXISTS events_topic ON events (tenant, topic, id);
+CREATE TABLE IF NOT EXISTS subscribers (
+    tenant TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    streams INTEGER NOT NULL,
+    PRIMARY KEY (tenant, pid)
+);
+"""
+
+_local = threading.local()
+_published = itertools.count(1)
+# Notified on every publish in this process so local streams wake up at once
+_changed = threading.Condition()
+# Tenants with an open /events stream in this process (name -> stream count)
+_subscribers = Counter()
+_subscribers_lock = threading.Lock()
+
+
+def _connection():
+    """Per-thread connection to EVENTS_DB (autocommit)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == EVENTS_DB:
+        return conn
+    os.makedirs(os.path.dirname(EVENTS_DB) or ".", exist_ok=True)
+    conn = sqlite3.connect(EVENTS_DB, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    _local.conn, _local.path = conn, EVENTS_DB
+    return conn
+
+
+def publish(tenant, event_type, data, topic=None, only_if_changed=False):
+    """
+    Append an event for tenant and return its id. With only_if_changed, nothing is
+    published (None) when the latest event of the same topic carries the same data.
+    """
+    if not EVENTS_ENABLED:
+        return None
+    topic = topic or event_type
+    encoded = json.dumps(data, sort_keys=True, default=str)
+    conn = _connection()
+    if only_if_changed:
+        row = conn.execute(
+            "SELECT data FROM events WHERE tenant = ? AND topic = ? ORDER BY id DESC LIMIT 1",
+            (tenant, topic),
+        ).fetchone()
+        if row is not None and row[0] == encoded:
+            return None
+    event_id = conn.execute(
+        "INSERT INTO events (tenant, type, topic, data, created) VALUES (?, ?, ?, ?, ?)",
+        (tenant, event_type, topic, encoded, time.time()),
+    ).lastrowid
+    if next(_published) % PRUNE_EVERY == 0:
+        conn.execute("DELETE FROM events WHERE id <= ?", (event_id - EVENTS_KEEP,))
+    with _changed:
+        _changed.notify_all()
+    return event_id
+
+
+def latest_id():
+    (event_id,) = _connection().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()
+    return event_id
+
+
+def read_since(tenant, after_id, limit=100, event_type=None, newer_than=None):
+    """The tenant's events after after_id, optionally of one type and created after newer_than."""
+    query = "SELECT id, type, data, created FROM events WHERE tenant = ? AND id > ?"
+    params = [tenant, after_id]
+    if event_type is not None:
+        query += " AND type = ?"
+        params.append(event_type)
+    if newer_than is not None:
+        query += " AND created > ?"
+        params.append(newer_than)
+    query += " ORDER BY id LIMIT ?"
+    params.append(limit)
+    rows = _connection().execute(query, params)
+    return [
+        {"id": event_id, "type": event_type, "data": json.loads(data), "created": created}
+        for event_id, event_type, data, created in rows
+    ]
+
+
+def watch(tenant, last_id=None):
+    """
+    Yield the tenant's events after last_id (default: only new ones) as they arrive;
+    yields None after EVENTS_HEARTBEAT idle seconds so streams can send keep-alives.
+    """
+    last_id = latest_id() if last_id is None else last_id
+    idle_since = time.monotonic()
+    while True:
+        batch = read_since(tenant, last_id)
+        for event in batch:
+            last_id = event["id"]
+            yield event
+        if batch:
+            idle_since = time.monotonic()
+            continue
+        if time.monotonic() - idle_since >= EVENTS_HEARTBEAT:
+            idle_since = time.monotonic()
+            yield None
+        with _changed:
+            _changed.wait(EVENTS_POLL_INTERVAL)
+
+
+# --- SUBSCRIBERS ---
+def add_subscriber(tenant):
+    with _subscribers_lock:
+        _subscribers[tenant] += 1
+        _record_streams(tenant, _subscribers[tenant])
+
+
+def remove_subscriber(tenant):
+    with _subscribers_lock:
+        _subscribers[tenant] -= 1
+        streams = _subscribers[tenant]
+        if streams <= 0:
+            del _subscribers[tenant]
+        _record_streams(tenant, streams)
+
+
+def _record_streams(tenant, streams):
+    """Share this process's stream count for tenant through EVENTS_DB."""
+    try:
+        conn = _connection()
+        if streams > 0:
+            conn.execute(
+                "INSERT OR REPLACE INTO subscribers (tenant, pid, streams) VALUES (?, ?, ?)",
+                (tenant, os.getpid(), streams),
+            )
+        else:
+            conn.execute(
+                "DELETE FROM subscribers WHERE tenant = ? AND pid = ?", (tenant, os.getpid())
+            )
+    except sqlite3.Error:
+        pass  # has_subscribers() then still answers from this process's own count
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        return True  # os.kill(pid, 0) would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def has_subscribers(tenant):
+    """
+    True if any server process on this host has an open stream for tenant. Rows left by
+    dead processes are dropped; if the store is unreadable, assume someone listens.
+    """
+    with _subscribers_lock:
+        if _subscribers.get(tenant):
+            return True
+    try:
+        conn = _connection()
+        rows = conn.execute(
+            "SELECT pid FROM subscribers WHERE tenant = ? AND streams > 0", (tenant,)
+        ).fetchall()
+        for (pid,) in rows:
+            if _pid_alive(pid):
+                return True
+            conn.execute("DELETE FROM subscribers WHERE pid = ?", (pid,))
+        return False
+    except sqlite3.Error:
+        return True
+
+
+def subscribed_tenants():
+    """Names of tenants with an open stream in this process."""
+    with _subscribers_lock:
+        return list(_subscribers)
+
+
+def subscriber_count():
+    with _subscribers_lock:
+        return sum(_subscribers.values())
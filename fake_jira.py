@@ -0,0 +1,599 @@
+"""
+Fake JIRA/Tempo - local stand-in for the Atlassian APIs used by commit.py
+
+Serves a generated, in-memory dataset so the MCP server, the UIs and the benchmarks
+(load_test.py) can run on a laptop without a live instance:
+
+    GET    /rest/api/2/search                          JQL subset, startAt/maxResults paging
+    GET    /rest/api/2/issue/<key>                     issue fields (expand=transitions)
+    GET    /rest/api/2/issue/<key>/worklog             paged worklogs
+    POST   /rest/api/2/issue/<key>/worklog             add worklog (timeSpent / timeSpentSeconds)
+    DELETE /rest/api/2/issue/<key>/worklog/<id>        delete worklog
+    GET    /rest/api/2/issue/<key>/transitions         workflow transitions for the issue's status
+    POST   /rest/api/2/issue/<key>/transitions         apply a transition
+    GET    /rest/tempo-timesheets/4/worklogs           Tempo worklogs (user, dateFrom, dateTo)
+
+Supported JQL: AND-joined clauses on assignee, worklogAuthor (=, in), worklogDate
+(=, >=, <=, >, <), key / project / issuetype / status (=, !=, in, not in) and
+statusCategory (=, !=), with currentUser() and an optional ORDER BY.
+Like JIRA Cloud, search returns at most FAKE_JIRA_MAX_RESULTS issues per page and embeds
+at most 20 worklogs per issue (fields=worklog).
+
+Fault injection (env, CLI flags, or POST /_fake/config at runtime):
+    FAKE_JIRA_LATENCY_MS, FAKE_JIRA_JITTER_MS   added latency per request
+    FAKE_JIRA_429_RATE                          fraction answered 429 + Retry-After
+    FAKE_JIRA_ERROR_RATE                        fraction answered 500
+Dataset: FAKE_JIRA_ISSUES, FAKE_JIRA_USERS, FAKE_JIRA_DAYS, FAKE_JIRA_SEED.
+GET /_fake/stats returns request counts; POST /_fake/reset regenerates the dataset.
+
+Usage:
+    python fake_jira.py --port 8080 --issues 500 --latency-ms 80
+    JIRA_BASE_URL=http://127.0.0.1:8080 python mcp_server.py
+"""
+
+import argparse
+import os
+import random
+import re
+import string
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from flask import Flask, jsonify, request
+
+FAKE_JIRA_HOST = os.environ.get("FAKE_JIRA_HOST", "127.0.0.1")
+FAKE_JIRA_PORT = int(os.environ.get("FAKE_JIRA_PORT", "8080"))
+FAKE_JIRA_USER = os.environ.get("FAKE_JIRA_USER", "fake.user")
+FAKE_JIRA_MAX_RESULTS = int(os.environ.get("FAKE_JIRA_MAX_RESULTS", "100"))
+EMBEDDED_WORKLOG_LIMIT = 20
+
+CONFIG = {
+    "issues": int(os.environ.get("FAKE_JIRA_ISSUES", "200")),
+    "users": int(os.environ.get("FAKE_JIRA_USERS", "5")),
+    "days": int(os.environ.get("FAKE_JIRA_DAYS", "30")),
+    "seed": int(os.environ.get("FAKE_JIRA_SEED", "42")),
+    "latency_ms": float(os.environ.get("FAKE_JIRA_LATENCY_MS", "0")),
+    "jitter_ms": float(os.environ.get("FAKE_JIRA_JITTER_MS", "0")),
+    "rate_429": float(os.environ.get("FAKE_JIRA_429_RATE", "0")),
+    "error_rate": float(os.environ.get("FAKE_JIRA_ERROR_RATE", "0")),
+    "tempo_paged": os.environ.get("FAKE_TEMPO_PAGED", "0").lower() in ("1", "true", "yes"),
+}
+
+STATUS_CATEGORIES = {
+    "To Do": {"key": "new", "name": "To Do"},
+    "In Progress": {"key": "indeterminate", "name": "In Progress"},
+    "In Review": {"key": "indeterminate", "name": "In Progress"},
+    "Done": {"key": "done", "name": "Done"},
+}
+
+# Workflows differ per issue type (different transition IDs), as in real projects
+WORKFLOWS = {
+    "default": {
+        "To Do": [("11", "Start Progress", "In Progress"), ("31", "Done", "Done")],
+        "In Progress": [("21", "Stop Progress", "To Do"), ("31", "Done", "Done")],
+        "Done": [("41", "Reopen", "To Do")],
+    },
+    "Sub-task": {
+        "To Do": [("5", "In Progress", "In Progress"), ("7", "Done", "Done")],
+        "In Progress": [("6", "Review", "In Review"), ("7", "Done", "Done")],
+        "In Review": [("7", "Done", "Done"), ("8", "Back to progress", "In Progress")],
+        "Done": [("9", "Reopen", "To Do")],
+    },
+}
+
+STATE = {}
+STATS = Counter()
+_lock = threading.RLock()
+
+app = Flask(__name__)
+
+
+# --- DATASET ---
+def build_dataset(issues=200, users=5, days=30, seed=42):
+    """
+    Generate projects > epics > stories/tasks > sub-tasks with statuses, assignees and
+    worklogs over the last `days` days. Deterministic for a given seed.
+    """
+    rng = random.Random(seed)
+    user_names = [FAKE_JIRA_USER] + [f"user{i}" for i in range(1, users + 1)]
+    project_count = max(1, issues // 100)
+    projects = [
+        {"id": str(10000 + i), "key": "FK" + string.ascii_uppercase[i % 26] * (1 + i // 26),
+         "name": f"Fake Project {i + 1}"}
+        for i in range(project_count)
+    ]
+    state = {"issues": {}, "worklogs": {}, "next_worklog_id": 1, "next_issue_id": 1,
+             "users": user_names, "projects": projects}
+    counters = Counter()
+
+    def new_issue(project, issuetype, summary, parent=None, epic=None):
+        counters[project["key"]] += 1
+        key = f"{project['key']}-{counters[project['key']]}"
+        issue_id = str(state["next_issue_id"])
+        state["next_issue_id"] += 1
+        status = rng.choices(["To Do", "In Progress", "Done"], [4, 4, 2])[0]
+        state["issues"][key] = {
+            "id": issue_id,
+            "key": key,
+            "project": project,
+            "issuetype": issuetype,
+            "summary": summary,
+            "description": f"Generated {issuetype.lower()} {key}",
+            "status": status,
+            "assignee": rng.choice(user_names) if rng.random() < 0.9 else None,
+            "parent": parent,
+            "epic": epic,
+        }
+        state["worklogs"][key] = []
+        return key
+
+    remaining = issues
+    while remaining > 0:
+        for project in projects:
+            if remaining <= 0:
+                break
+            epic = new_issue(project, "Epic", f"Epic {counters[project['key']] + 1}")
+            remaining -= 1
+            for _ in range(rng.randint(2, 4)):
+                if remaining <= 0:
+                    break
+                story_type = rng.choice(["Story", "Task"])
+                story = new_issue(project, story_type, f"{story_type} work item", epic=epic)
+                remaining -= 1
+                for _ in range(rng.randint(0, 4)):
+                    if remaining <= 0:
+                        break
+                    new_issue(project, "Sub-task", "Sub-task item", parent=story)
+                    remaining -= 1
+
+    # Worklogs: each user logs a few entries per weekday on random non-epic issues
+    workable = [k for k, i in state["issues"].items() if i["issuetype"] != "Epic"]
+    today = date.today()
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        if day.weekday() >= 5 or not workable:
+            continue
+        for user in user_names:
+            for slot in range(rng.randint(1, 4)):
+                key = rng.choice(workable)
+                add_worklog(state, key, user, rng.choice([900, 1800, 3600, 5400, 7200]),
+                            f"Work on {key}", f"{day.isoformat()}T{9 + slot * 2:02d}:00:00.000+0000")
+    return state
+
+
+def add_worklog(state, key, author, seconds, comment, started):
+    worklog_id = str(state["next_worklog_id"])
+    state["next_worklog_id"] += 1
+    worklog = {
+        "id": worklog_id,
+        "issueId": state["issues"][key]["id"],
+        "author": user_ref(author),
+        "updateAuthor": user_ref(author),
+        "comment": comment,
+        "started": started,
+        "timeSpent": format_duration(seconds),
+        "timeSpentSeconds": seconds,
+    }
+    state["worklogs"][key].append(worklog)
+    return worklog
+
+
+def reset_dataset():
+    with _lock:
+        STATE.clear()
+        STATE.update(
+            build_dataset(CONFIG["issues"], CONFIG["users"], CONFIG["days"], CONFIG["seed"])
+        )
+        STATS.clear()
+
+
+def user_ref(name):
+    return {"name": name, "key": name, "accountId": f"acc-{name}", "displayName": name.title()}
+
+
+def format_duration(seconds):
+    hours, minutes = divmod(seconds // 60, 60)
+    parts = ([f"{hours}h"] if hours else []) + ([f"{minutes}m"] if minutes else [])
+    return " ".join(parts) or "0m"
+
+
+def parse_duration(text):
+    """'1h 30m', '2h', '45m', '1d' (8h), '1w' (5d) -> seconds, or None."""
+    units = {"w": 5 * 8 * 3600, "d": 8 * 3600, "h": 3600, "m": 60}
+    matches = re.findall(r"(\d+(?:\.\d+)?)\s*([wdhm])", (text or "").lower())
+    if not matches:
+        return None
+    return int(sum(float(value) * units[unit] for value, unit in matches))
+
+
+# --- JQL ---
+CLAUSE_RE = re.compile(
+    r"^\s*(\w+)\s*(not\s+in|in|!=|>=|<=|=|>|<)\s*(.+?)\s*$", re.IGNORECASE
+)
+
+
+def parse_jql(jql):
+    """AND-joined clauses -> [(field, op, values)]; raises ValueError on unsupported JQL."""
+    jql = re.split(r"\border\s+by\b", jql or "", flags=re.IGNORECASE)[0].strip()
+    clauses = []
+    if not jql:
+        return clauses
+    for part in re.split(r"\s+and\s+", jql, flags=re.IGNORECASE):
+        match = CLAUSE_RE.match(part)
+        if not match:
+            raise ValueError(f"Unsupported JQL clause: {part}")
+        field, op, raw = match.group(1), re.sub(r"\s+", " ", match.group(2).lower()), match.group(3)
+        if op in ("in", "not in"):
+            values = [v.strip().strip("'\"") for v in raw.strip("()").split(",") if v.strip()]
+        else:
+            values = [raw.strip().strip("'\"")]
+        values = [current_user() if v.lower() == "currentuser()" else v for v in values]
+        clauses.append((field.lower(), op, values))
+    return clauses
+
+
+def compare(value, op, values):
+    if op == "=":
+        return value == values[0]
+    if op == "!=":
+        return value != values[0]
+    if op == "in":
+        return value in values
+    if op == "not in":
+        return value not in values
+    if op == ">=":
+        return value >= values[0]
+    if op == "<=":
+        return value <= values[0]
+    if op == ">":
+        return value > values[0]
+    if op == "<":
+        return value < values[0]
+    return False
+
+
+def issue_matches(issue, clauses):
+    key = issue["key"]
+    for field, op, values in clauses:
+        if field == "assignee":
+            ok = compare(issue["assignee"], op, values)
+        elif field == "key":
+            ok = compare(key, op, [v.upper() for v in values])
+        elif field == "project":
+            ok = compare(issue["project"]["key"], op, [v.upper() for v in values])
+        elif field == "issuetype":
+            ok = compare(issue["issuetype"].lower(), op, [v.lower() for v in values])
+        elif field == "status":
+            ok = compare(issue["status"].lower(), op, [v.lower() for v in values])
+        elif field == "statuscategory":
+            category = STATUS_CATEGORIES[issue["status"]]
+            names = {category["name"].lower(), category["key"]}
+            wanted = values[0].lower()
+            ok = (wanted in names) if op == "=" else (wanted not in names)
+        elif field == "worklogauthor":
+            authors = set()
+            for wl in STATE["worklogs"][key]:
+                authors.update((wl["author"]["name"], wl["author"]["accountId"]))
+            ok = any(compare(author, op, values) for author in authors)
+        elif field == "worklogdate":
+            days = {wl["started"][:10] for wl in STATE["worklogs"][key]}
+            ok = any(compare(day, op, values) for day in days)
+        else:
+            raise ValueError(f"Field '{field}' is not supported by the fake JIRA")
+        if not ok:
+            return False
+    return True
+
+
+# --- RESPONSE SHAPES ---
+def issue_fields(issue, fields):
+    """JIRA-shaped fields dict; `fields` is the requested list (None = all)."""
+    full = {
+        "summary": issue["summary"],
+        "description": issue["description"],
+        "project": dict(issue["project"]),
+        "issuetype": {"name": issue["issuetype"], "subtask": issue["issuetype"] == "Sub-task"},
+        "status": {"name": issue["status"], "statusCategory": STATUS_CATEGORIES[issue["status"]]},
+        "assignee": user_ref(issue["assignee"]) if issue["assignee"] else None,
+        "customfield_10008": issue["epic"],
+        "customfield_10009": None,
+    }
+    if issue["parent"]:
+        parent = STATE["issues"][issue["parent"]]
+        full["parent"] = {
+            "id": parent["id"],
+            "key": parent["key"],
+            "fields": {
+                "summary": parent["summary"],
+                "status": {"name": parent["status"]},
+                "issuetype": {"name": parent["issuetype"]},
+            },
+        }
+    if fields is None or "worklog" in fields:
+        worklogs = STATE["worklogs"][issue["key"]]
+        full["worklog"] = {
+            "startAt": 0,
+            "maxResults": EMBEDDED_WORKLOG_LIMIT,
+            "total": len(worklogs),
+            "worklogs": [dict(wl) for wl in worklogs[:EMBEDDED_WORKLOG_LIMIT]],
+        }
+    if fields is None:
+        return full
+    return {name: full[name] for name in fields if name in full}
+
+
+def issue_json(issue, fields=None):
+    return {
+        "id": issue["id"],
+        "key": issue["key"],
+        "self": f"{request.host_url}rest/api/2/issue/{issue['id']}",
+        "fields": issue_fields(issue, fields),
+    }
+
+
+def jira_error(status, message):
+    return jsonify({"errorMessages": [message], "errors": {}}), status
+
+
+def current_user():
+    """Basic-auth username if it is a dataset user, else FAKE_JIRA_USER (any credentials work)."""
+    auth = request.authorization
+    if auth and auth.username in STATE["users"]:
+        return auth.username
+    return FAKE_JIRA_USER
+
+
+def get_issue_or_404(key):
+    return STATE["issues"].get(key.upper())
+
+
+# --- FAULT INJECTION & MIDDLEWARE ---
+class NormalizeSlashes:
+    """WSGI middleware: collapse '//' in paths (JIRA_BASE_URL with a trailing slash)."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        environ["PATH_INFO"] = re.sub(r"/{2,}", "/", environ.get("PATH_INFO", ""))
+        return self.wsgi_app(environ, start_response)
+
+
+app.wsgi_app = NormalizeSlashes(app.wsgi_app)
+
+
+@app.before_request
+def inject_faults():
+    if request.path.startswith("/_fake"):
+        return None
+    STATS[f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"] += 1
+    delay = CONFIG["latency_ms"] + random.uniform(0, CONFIG["jitter_ms"])
+    if delay > 0:
+        time.sleep(delay / 1000)
+    roll = random.random()
+    if roll < CONFIG["rate_429"]:
+        STATS["injected_429"] += 1
+        response, status = jira_error(429, "Rate limit exceeded.")
+        response.headers["Retry-After"] = "1"
+        return response, status
+    if roll < CONFIG["rate_429"] + CONFIG["error_rate"]:
+        STATS["injected_500"] += 1
+        return jira_error(500, "Injected server error.")
+    return None
+
+
+# --- JIRA REST API ---
+@app.route("/rest/api/2/search", methods=["GET", "POST"])
+def search():
+    params = request.args if request.method == "GET" else (request.get_json(silent=True) or {})
+    fields = params.get("fields")
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    if fields and "*all" in fields:
+        fields = None
+    try:
+        start_at = int(params.get("startAt", 0))
+        max_results = min(int(params.get("maxResults", 50)), FAKE_JIRA_MAX_RESULTS)
+        with _lock:
+            clauses = parse_jql(params.get("jql", ""))
+            matched = [i for i in STATE["issues"].values() if issue_matches(i, clauses)]
+            page = [issue_json(i, fields) for i in matched[start_at:start_at + max_results]]
+    except ValueError as e:
+        return jira_error(400, str(e))
+    return jsonify({"startAt": start_at, "maxResults": max_results, "total": len(matched), "issues": page})
+
+
+@app.route("/rest/api/2/issue/<key>", methods=["GET"])
+def get_issue(key):
+    with _lock:
+        issue = get_issue_or_404(key)
+        if issue is None:
+            return jira_error(404, "Issue does not exist or you do not have permission to see it.")
+        fields = request.args.get("fields")
+        payload = issue_json(issue, fields.split(",") if fields else None)
+        if "transitions" in request.args.get("expand", "").split(","):
+            payload["transitions"] = transition_list(issue)
+        return jsonify(payload)
+
+
+@app.route("/rest/api/2/issue/<key>/worklog", methods=["GET", "POST"])
+def issue_worklogs(key):
+    with _lock:
+        issue = get_issue_or_404(key)
+        if issue is None:
+            return jira_error(404, "Issue does not exist or you do not have permission to see it.")
+        if request.method == "GET":
+            worklogs = STATE["worklogs"][issue["key"]]
+            start_at = int(request.args.get("startAt", 0))
+            max_results = int(request.args.get("maxResults", 5000))
+            return jsonify({
+                "startAt": start_at,
+                "maxResults": max_results,
+                "total": len(worklogs),
+                "worklogs": worklogs[start_at:start_at + max_results],
+            })
+        body = request.get_json(silent=True) or {}
+        seconds = body.get("timeSpentSeconds") or parse_duration(body.get("timeSpent"))
+        if not seconds:
+            return jira_error(400, "Worklog must not be null.")
+        started = body.get("started") or datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+        worklog = add_worklog(STATE, issue["key"], current_user(), int(seconds),
+                              body.get("comment", ""), started)
+        return jsonify(worklog), 201
+
+
+@app.route("/rest/api/2/issue/<key>/worklog/<worklog_id>", methods=["DELETE"])
+def delete_worklog(key, worklog_id):
+    with _lock:
+        issue = get_issue_or_404(key)
+        if issue is None:
+            return jira_error(404, "Issue does not exist or you do not have permission to see it.")
+        worklogs = STATE["worklogs"][issue["key"]]
+        for index, worklog in enumerate(worklogs):
+            if worklog["id"] == worklog_id:
+                del worklogs[index]
+                return "", 204
+    return jira_error(404, "Cannot find worklog with id: " + worklog_id)
+
+
+def transition_list(issue):
+    """Transitions available from the issue's status in its issue type's workflow."""
+    workflow = WORKFLOWS.get(issue["issuetype"], WORKFLOWS["default"])
+    return [
+        {"id": tid, "name": name, "to": {"name": to, "statusCategory": STATUS_CATEGORIES[to]}}
+        for tid, name, to in workflow.get(issue["status"], [])
+    ]
+
+
+@app.route("/rest/api/2/issue/<key>/transitions", methods=["GET", "POST"])
+def transitions(key):
+    with _lock:
+        issue = get_issue_or_404(key)
+        if issue is None:
+            return jira_error(404, "Issue does not exist or you do not have permission to see it.")
+        if request.method == "GET":
+            return jsonify({"expand": "transitions", "transitions": transition_list(issue)})
+        workflow = WORKFLOWS.get(issue["issuetype"], WORKFLOWS["default"])
+        available = workflow.get(issue["status"], [])
+        wanted = str(((request.get_json(silent=True) or {}).get("transition") or {}).get("id"))
+        for tid, _, to in available:
+            if tid == wanted:
+                issue["status"] = to
+                return "", 204
+    return jira_error(400, f"Transition id '{wanted}' is not valid for this issue.")
+
+
+# --- TEMPO API ---
+@app.route("/rest/tempo-timesheets/4/worklogs", methods=["GET"])
+def tempo_worklogs():
+    user = request.args.get("user") or "current"
+    if user == "current":
+        user = current_user()
+    date_from = request.args.get("dateFrom", "0000-00-00")
+    date_to = request.args.get("dateTo", "9999-99-99")
+    offset = int(request.args.get("offset", 0))
+    limit = int(request.args.get("limit", 1000))
+    results = []
+    with _lock:
+        for key, worklogs in STATE["worklogs"].items():
+            issue = STATE["issues"][key]
+            for wl in worklogs:
+                day = wl["started"][:10]
+                if wl["author"]["name"] != user or not (date_from <= day <= date_to):
+                    continue
+                results.append({
+                    "tempoWorklogId": int(wl["id"]),
+                    "jiraWorklogId": int(wl["id"]),
+                    "issue": {"key": key, "id": issue["id"]},
+                    "issueKey": key,
+                    "issueSummary": issue["summary"],
+                    "timeSpentSeconds": wl["timeSpentSeconds"],
+                    "billableSeconds": wl["timeSpentSeconds"],
+                    "startDate": day,
+                    "startTime": wl["started"][11:19],
+                    "description": wl["comment"],
+                    "author": {"accountId": wl["author"]["accountId"], "displayName": wl["author"]["displayName"]},
+                })
+    results.sort(key=lambda r: (r["startDate"], r["startTime"]))
+    if not CONFIG["tempo_paged"]:
+        return jsonify(results)
+    page = results[offset:offset + limit]
+    metadata = {"count": len(page), "offset": offset, "limit": limit}
+    if offset + limit < len(results):
+        args = request.args.to_dict()
+        args.update(offset=offset + limit, limit=limit)
+        query = "&".join(f"{k}={v}" for k, v in args.items())
+        metadata["next"] = f"{request.base_url}?{query}"
+    return jsonify({"self": request.url, "metadata": metadata, "results": page})
+
+
+# --- CONTROL ENDPOINTS ---
+@app.route("/_fake/config", methods=["GET", "POST"])
+def fake_config():
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        for key, value in body.items():
+            if key in CONFIG:
+                CONFIG[key] = type(CONFIG[key])(value)
+        if {"issues", "users", "days", "seed"} & set(body):
+            reset_dataset()
+    return jsonify(CONFIG)
+
+
+@app.route("/_fake/stats", methods=["GET"])
+def fake_stats():
+    with _lock:
+        worklogs = sum(len(w) for w in STATE["worklogs"].values())
+        return jsonify({"requests": dict(STATS), "issues": len(STATE["issues"]), "worklogs": worklogs})
+
+
+@app.route("/_fake/reset", methods=["POST"])
+def fake_reset():
+    reset_dataset()
+    return jsonify({"status": "ok", "issues": len(STATE["issues"])})
+
+
+reset_dataset()
+
+
+def start_in_thread(host="127.0.0.1", port=0):
+    """Serve the fake in a daemon thread (for benchmarks). Returns (base_url, server)."""
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server(host, port, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{server.server_port}", server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake JIRA/Tempo server for offline testing")
+    parser.add_argument("--host", default=FAKE_JIRA_HOST)
+    parser.add_argument("--port", type=int, default=FAKE_JIRA_PORT)
+    parser.add_argument("--issues", type=int, default=CONFIG["issues"])
+    parser.add_argument("--users", type=int, default=CONFIG["users"])
+    parser.add_argument("--days", type=int, default=CONFIG["days"])
+    parser.add_argument("--seed", type=int, default=CONFIG["seed"])
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    parser.add_argument("--rate-429", type=float, default=CONFIG["rate_429"])
+    parser.add_argument("--error-rate", type=float, default=CONFIG["error_rate"])
+    parser.add_argument("--tempo-paged", action="store_true", default=CONFIG["tempo_paged"])
+    args = parser.parse_args(argv)
+    for key in CONFIG:
+        CONFIG[key] = getattr(args, key)
+    reset_dataset()
+    print(
+        f"Fake JIRA on http://{args.host}:{args.port} ({len(STATE['issues'])} issues, "
+        f"user '{FAKE_JIRA_USER}'); set JIRA_BASE_URL to this address."
+    )
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
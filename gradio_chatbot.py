@@ -14,16 +14,20 @@ def format_close_response(response):
 
 # --- IMPORTS ---
 
+import asyncio
 import gradio as gr
-import requests
 import os
 import openai
 import re
 import json
+import logging
 import threading
-import time
 from datetime import datetime, timedelta
 from configs import Configs
+from mcp_client import mcp_get, mcp_post, live_state
+import tracing
+
+logger = logging.getLogger(__name__)
 
 
 # --- All imports moved to the top for clarity and best practices ---
@@ -44,7 +48,8 @@ def get_human_date(date_obj):
         return date_obj.strftime("%A, %d %b %Y")
 
 
-MCP_SERVER_URL = "http://localhost:5000"
+# Max chat submissions processed at once (Gradio defaults to 1 per event listener)
+CHAT_CONCURRENCY_LIMIT = int(os.environ.get("CHAT_CONCURRENCY_LIMIT", "16"))
 openai.api_key = Configs.OPENAI_API_KEY
 
 
@@ -120,12 +125,13 @@ Output: {{"intent": "show_hours", "ticket": null, "hours": null, "comment": null
 User command: "{user_input}"
 Output:
     """
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=200,
-        temperature=0,
-    )
+    with tracing.span("openai.extract_command", model="gpt-3.5-turbo"):
+        response = openai.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=200,
+            temperature=0,
+        )
     # Parse JSON from response
     try:
         ai_json = response.choices[0].message.content
@@ -146,59 +152,121 @@ Output:
 # --- OPEN TICKETS LOGIC ---
 def get_open_tickets():
     try:
-        resp = requests.get(f"{MCP_SERVER_URL}/tickets")
-        hierarchy = resp.json().get("tickets", {})
-        display_list = []
-        ticket_count = 0
-        for project_id, project in hierarchy.items():
-            project_name = project["name"]
-            project_first_two = (
-                " ".join(project_name.split()[:2])
-                if project_name and project_name.lower() != "no project"
-                else None
-            )
-            for epic_id, epic in project["epics"].items():
-                epic_name = epic["name"]
-                for main_task_id, main_task in epic["main_tasks"].items():
-                    main_task_summary = main_task["summary"]
-                    for ticket in main_task["tickets"]:
-                        label_parts = []
-                        if project_name and project_name.lower() != "no project":
-                            label_parts.append(
-                                f"🏢 {' '.join(project_name.split()[:2])}"
-                            )
-                        else:
-                            label_parts.append("❓ No Project")
-                        if epic_id and epic_id.lower() != "no epic":
-                            label_parts.append(f"🏷️ {epic_id}")
-                        if main_task_id and main_task_id.lower() != "no main task":
-                            label_parts.append(f"🗂️ {main_task_id}")
-                        ticket_part = f"🔖 {ticket['key']}: {ticket['summary']}"
-                        label_parts.append(ticket_part)
-                        label = " / ".join(label_parts)
-                        full_parts = []
-                        if project_name and project_name.lower() != "no project":
-                            full_parts.append(f"🏢 {project_name}")
-                        else:
-                            full_parts.append("❓ No Project")
-                        if epic_id and epic_id.lower() != "no epic":
-                            full_parts.append(f"🏷️ {epic_id}: {epic_name}")
-                        else:
-                            full_parts.append("❓ No Epic")
-                        if main_task_id and main_task_id.lower() != "no main task":
-                            full_parts.append(f"🗂️ {main_task_id}: {main_task_summary}")
-                        else:
-                            full_parts.append("❓ No Main Task")
-                        full_parts.append(f"🔖 {ticket['key']}: {ticket['summary']}")
-                        full_label = " › ".join(full_parts)
-                        display_list.append((label, ticket["key"], full_label))
-                        ticket_count += 1
+        hierarchy = mcp_get("/tickets").get("tickets", {})
+        display_list, ticket_count = build_ticket_display_list(hierarchy)
         return hierarchy, display_list, ticket_count
     except Exception as e:
-        print(f"[get_open_tickets] Exception: {e}")
+        logger.warning("get_open_tickets failed: %s", e)
     return {}, [], 0
 
 
+def build_ticket_display_list(hierarchy):
+    """
+    Flatten the ticket hierarchy into radio choices.
+    Returns: (display_list of (label, ticket_key, full_label), ticket_count)
+    """
+    display_list = []
+    ticket_count = 0
+    for project_id, project in hierarchy.items():
+        project_name = project["name"]
+        project_first_two = (
+            " ".join(project_name.split()[:2])
+            if project_name and project_name.lower() != "no project"
+            else None
+        )
+        for epic_id, epic in project["epics"].items():
+            epic_name = epic["name"]
+            for main_task_id, main_task in epic["main_tasks"].items():
+                main_task_summary = main_task["summary"]
+                for ticket in main_task["tickets"]:
+                    label_parts = []
+                    if project_name and project_name.lower() != "no project":
+                        label_parts.append(
+                            f"🏢 {' '.join(project_name.split()[:2])}"
+                        )
+                    else:
+                        label_parts.append("❓ No Project")
+                    if epic_id and epic_id.lower() != "no epic":
+                        label_parts.append(f"🏷️ {epic_id}")
+                    if main_task_id and main_task_id.lower() != "no main task":
+                        label_parts.append(f"🗂️ {main_task_id}")
+                    ticket_part = f"🔖 {ticket['key']}: {ticket['summary']}"
+                    label_parts.append(ticket_part)
+                    label = " / ".join(label_parts)
+                    full_parts = []
+                    if project_name and project_name.lower() != "no project":
+                        full_parts.append(f"🏢 {project_name}")
+                    else:
+                        full_parts.append("❓ No Project")
+                    if epic_id and epic_id.lower() != "no epic":
+                        full_parts.append(f"🏷️ {epic_id}: {epic_name}")
+                    else:
+                        full_parts.append("❓ No Epic")
+                    if main_task_id and main_task_id.lower() != "no main task":
+                        full_parts.append(f"🗂️ {main_task_id}: {main_task_summary}")
+                    else:
+                        full_parts.append("❓ No Main Task")
+                    full_parts.append(f"🔖 {ticket['key']}: {ticket['summary']}")
+                    full_label = " › ".join(full_parts)
+                    display_list.append((label, ticket["key"], full_label))
+                    ticket_count += 1
+    return display_list, ticket_count
+
+
+# --- DASHBOARD (HOURS + WORKLOGS + TICKETS IN ONE CALL) ---
+def load_dashboard(selected_date, include_tickets=False):
+    """
+    Fetch hours, worklogs and optionally the open-ticket hierarchy for the date
+    with a single /dashboard call, using the configured API source (JIRA or Tempo).
+    """
+    params = {
+        "date": get_iso_date(selected_date),
+        "source": Configs.WORKLOG_API_SOURCE or "jira",
+    }
+    if Configs.WORKLOG_API_SOURCE == "tempo":
+        params["user"] = Configs.TEMPO_USER_KEY
+    if include_tickets:
+        params["tickets"] = 1
+    return mcp_get("/dashboard", params)
+
+
+def format_hours_label(selected_date, hours):
+    # Format the date for display
+    if hasattr(selected_date, "date"):
+        date_obj = selected_date.date()
+    else:
+        date_obj = selected_date
+    human_date = get_human_date(date_obj)
+    return f"{human_date} — Hours: {hours} h"
+
+
+def format_worklogs(logs, api_source=None):
+    """Render worklogs (JIRA or Tempo shape) as chat markdown."""
+    if not logs:
+        return "No logs for this date."
+    lines = []
+    for log in logs:
+        if api_source == "tempo":
+            started_raw = log.get("startDate", "")
+            started_fmt = started_raw
+            lines.append(
+                f"**{log.get('issueKey', '')} ({log.get('timeSpentSeconds', 0)//3600}h {(log.get('timeSpentSeconds', 0)%3600)//60}m)** *{log.get('issueSummary', '')}*\n"
+                f"{log.get('description', '')}  {started_fmt}"
+            )
+        else:
+            started_raw = log.get("started", "")
+            try:
+                dt = datetime.strptime(started_raw[:19], "%Y-%m-%dT%H:%M:%S")
+                started_fmt = dt.strftime("%Y-%m-%d %H:%M")
+            except Exception:
+                started_fmt = started_raw
+            lines.append(
+                f"**{log['issue_key']} ({log['time_spent']})** *{log['summary']}*\n"
+                f"{log['comment']}  {started_fmt}"
+            )
+    return "\n\n".join(lines)
+
+
 # --- HOURS NORMALIZATION ---
 def normalize_hours(hours):
     """
@@ -229,255 +297,273 @@ def normalize_hours(hours):
 
 
 # --- MAIN MCP SERVER CALL LOGIC ---
-def call_mcp_server(user_input, history):
-    user_input = user_input.strip()
+def parse_user_command(user_input):
+    """
+    Stage 1 of a chat command: extract intent and parameters with OpenAI.
+    A ticket key on the first line (prepended from the UI selection) is patched into log commands.
+    Returns: (params, intent)
+    """
+    params = extract_command_ai(user_input)
+    logger.debug("Extracted params: %s", params)
+    selected_ticket = None
+    if "\n" in user_input:
+        first_line = user_input.split("\n")[0].strip()
+        if re.match(r"^[A-Z]+-\d+$", first_line):
+            selected_ticket = first_line
+    intent = params.get("intent")
+    if intent == "log" and (not params.get("ticket")) and selected_ticket:
+        params["ticket"] = selected_ticket
+        logger.debug("Patched ticket from UI selection: %s", selected_ticket)
+    logger.info("Chat command intent: %s", intent)
+    return params, intent
+
+
+def execute_intent(user_input, params):
+    """
+    Stage 2 of a chat command: run the MCP server call(s) for the parsed intent.
+    Returns: (response, is_refresh_open_tickets, is_close_refresh)
+    """
+    intent = params.get("intent")
     response = ""
-    print(f"[call_mcp_server] User input: {user_input}")
-    try:
-        params = extract_command_ai(user_input)
-        print(f"[call_mcp_server] Extracted params: {params}")
-        selected_ticket = None
-        if "\n" in user_input:
-            first_line = user_input.split("\n")[0].strip()
-            import re
-
-            if re.match(r"^[A-Z]+-\d+$", first_line):
-                selected_ticket = first_line
-        intent = params.get("intent")
-        if intent == "log" and (not params.get("ticket")) and selected_ticket:
-            params["ticket"] = selected_ticket
-            print(
-                f"[call_mcp_server] Patched ticket from UI selection: {selected_ticket}"
-            )
-        print(f"[call_mcp_server] Intent: {intent}")
-
-        is_refresh_open_tickets = False
-        is_close_refresh = False
-        # If the user is logging and also closing a ticket, set refresh_open_tickets True and is_close_refresh True
-        if intent == "log" and (params.get("close") or "N").lower() in [
-            "c",
-            "y",
-            "yes",
-            "true",
-        ]:
-            is_close_refresh = True
-        if intent == "start":
-            resp = requests.post(
-                f"{MCP_SERVER_URL}/start", json={"time": params.get("time")}
-            )
-            response = resp.json()
-            print(f"[call_mcp_server] /start response: {response}")
-        elif intent == "tickets":
-            hierarchy, _, ticket_count = get_open_tickets()
-            is_refresh_open_tickets = True
-            if hierarchy:
-
-                def html_escape(text):
-                    import html
-
-                    return html.escape(str(text))
-
-                def render_tickets_hierarchy(hierarchy):
-                    html_lines = []
-                    for project_id, project in hierarchy.items():
-                        project_name = project.get("name", "No Project")
-                        project_icon = (
-                            "🏢"
-                            if project_name and project_name.lower() != "no project"
-                            else "❓"
-                        )
-                        html_lines.append(
-                            f"<div style='margin-top:0.5em; font-weight:700;'>{project_icon} {html_escape(project_name)}</div>"
-                        )
-                        epics = project.get("epics", {})
-                        for epic_id, epic in epics.items():
-                            epic_name = epic.get("name", "")
-                            if epic_id and epic_id.lower() != "no epic":
-                                epic_icon = "🏷️"
-                                html_lines.append(
-                                    f"<div style='margin-left:1.5em; font-weight:600;'>{epic_icon} {html_escape(epic_id)}: {html_escape(epic_name)}</div>"
-                                )
-                                main_tasks = epic.get("main_tasks", {})
-                                for main_task_id, main_task in main_tasks.items():
-                                    main_task_summary = main_task.get("summary", "")
-                                    if (
-                                        main_task_id
-                                        and main_task_id.lower() != "no main task"
-                                    ):
-                                        main_task_icon = "🗂️"
+    is_refresh_open_tickets = False
+    is_close_refresh = False
+    # If the user is logging and also closing a ticket, set refresh_open_tickets True and is_close_refresh True
+    if intent == "log" and (params.get("close") or "N").lower() in [
+        "c",
+        "y",
+        "yes",
+        "true",
+    ]:
+        is_close_refresh = True
+    if intent == "start":
+        response = mcp_post("/start", {"time": params.get("time")})
+        logger.debug("/start response: %s", response)
+    elif intent == "tickets":
+        hierarchy, _, ticket_count = get_open_tickets()
+        is_refresh_open_tickets = True
+        if hierarchy:
+
+            def html_escape(text):
+                import html
+
+                return html.escape(str(text))
+
+            def render_tickets_hierarchy(hierarchy):
+                html_lines = []
+                for project_id, project in hierarchy.items():
+                    project_name = project.get("name", "No Project")
+                    project_icon = (
+                        "🏢"
+                        if project_name and project_name.lower() != "no project"
+                        else "❓"
+                    )
+                    html_lines.append(
+                        f"<div style='margin-top:0.5em; font-weight:700;'>{project_icon} {html_escape(project_name)}</div>"
+                    )
+                    epics = project.get("epics", {})
+                    for epic_id, epic in epics.items():
+                        epic_name = epic.get("name", "")
+                        if epic_id and epic_id.lower() != "no epic":
+                            epic_icon = "🏷️"
+                            html_lines.append(
+                                f"<div style='margin-left:1.5em; font-weight:600;'>{epic_icon} {html_escape(epic_id)}: {html_escape(epic_name)}</div>"
+                            )
+                            main_tasks = epic.get("main_tasks", {})
+                            for main_task_id, main_task in main_tasks.items():
+                                main_task_summary = main_task.get("summary", "")
+                                if (
+                                    main_task_id
+                                    and main_task_id.lower() != "no main task"
+                                ):
+                                    main_task_icon = "🗂️"
+                                    html_lines.append(
+                                        f"<div style='margin-left:3em; font-weight:500;'>{main_task_icon} {html_escape(main_task_id)}: {html_escape(main_task_summary)}</div>"
+                                    )
+                                    tickets = main_task.get("tickets", [])
+                                    for ticket in tickets:
+                                        ticket_key = ticket.get("key", "?")
+                                        ticket_summary = ticket.get("summary", "")
+                                        ticket_icon = "🔖"
                                         html_lines.append(
-                                            f"<div style='margin-left:3em; font-weight:500;'>{main_task_icon} {html_escape(main_task_id)}: {html_escape(main_task_summary)}</div>"
+                                            f"<div style='margin-left:4.5em; font-weight:400;'>{ticket_icon} {html_escape(ticket_key)}: {html_escape(ticket_summary)}</div>"
                                         )
-                                        tickets = main_task.get("tickets", [])
-                                        for ticket in tickets:
-                                            ticket_key = ticket.get("key", "?")
-                                            ticket_summary = ticket.get("summary", "")
-                                            ticket_icon = "🔖"
-                                            html_lines.append(
-                                                f"<div style='margin-left:4.5em; font-weight:400;'>{ticket_icon} {html_escape(ticket_key)}: {html_escape(ticket_summary)}</div>"
-                                            )
-                                    else:
-                                        tickets = main_task.get("tickets", [])
-                                        for ticket in tickets:
-                                            ticket_key = ticket.get("key", "?")
-                                            ticket_summary = ticket.get("summary", "")
-                                            ticket_icon = "🔖"
-                                            html_lines.append(
-                                                f"<div style='margin-left:3em; font-weight:400;'>{ticket_icon} {html_escape(ticket_key)}: {html_escape(ticket_summary)}</div>"
-                                            )
-                            else:
-                                main_tasks = epic.get("main_tasks", {})
-                                for main_task_id, main_task in main_tasks.items():
-                                    main_task_summary = main_task.get("summary", "")
-                                    if (
-                                        main_task_id
-                                        and main_task_id.lower() != "no main task"
-                                    ):
-                                        main_task_icon = "🗂️"
+                                else:
+                                    tickets = main_task.get("tickets", [])
+                                    for ticket in tickets:
+                                        ticket_key = ticket.get("key", "?")
+                                        ticket_summary = ticket.get("summary", "")
+                                        ticket_icon = "🔖"
                                         html_lines.append(
-                                            f"<div style='margin-left:1.5em; font-weight:500;'>{main_task_icon} {html_escape(main_task_id)}: {html_escape(main_task_summary)}</div>"
+                                            f"<div style='margin-left:3em; font-weight:400;'>{ticket_icon} {html_escape(ticket_key)}: {html_escape(ticket_summary)}</div>"
                                         )
-                                        tickets = main_task.get("tickets", [])
-                                        for ticket in tickets:
-                                            ticket_key = ticket.get("key", "?")
-                                            ticket_summary = ticket.get("summary", "")
-                                            ticket_icon = "🔖"
-                                            html_lines.append(
-                                                f"<div style='margin-left:3em; font-weight:400;'>{ticket_icon} {html_escape(ticket_key)}: {html_escape(ticket_summary)}</div>"
-                                            )
-                                    else:
-                                        tickets = main_task.get("tickets", [])
-                                        for ticket in tickets:
-                                            ticket_key = ticket.get("key", "?")
-                                            ticket_summary = ticket.get("summary", "")
-                                            ticket_icon = "🔖"
-                                            html_lines.append(
-                                                f"<div style='margin-left:1.5em; font-weight:400;'>{ticket_icon} {html_escape(ticket_key)}: {html_escape(ticket_summary)}</div>"
-                                            )
-                    return "\n".join(html_lines)
-
-                response = (
-                    f"<div style='font-weight:600; margin-bottom:0.5em;'>Open Tickets - {ticket_count} (🏢 Project &gt; 🏷️ Epic &gt; 🗂️ Main Task &gt; 🔖 Ticket)</div>"
-                    + render_tickets_hierarchy(hierarchy)
-                    + "<div style='margin-top:1em;'>You can also use the Open Tickets to select a ticket and log hours.</div>"
-                )
-            else:
-                response = "No open tickets found."
-        elif intent == "close":
-            ticket = params.get("ticket")
-            if ticket:
-                resp = requests.post(f"{MCP_SERVER_URL}/close", json={"ticket": ticket})
-                response_json = resp.json()
-                print(f"[call_mcp_server] /close response: {response_json}")
-                if response_json.get("status") == "ok":
-                    response = format_close_command_response(response_json)
-                else:
-                    error_msg = (
-                        response_json.get("error")
-                        or response_json.get("message")
-                        or str(response_json)
-                    )
-                    response = f"Failed to close ticket: {error_msg}"
-                is_close_refresh = True
-            else:
-                response = "Please specify a ticket key to close."
-        elif intent == "log":
-            ticket = params.get("ticket")
-            hours = params.get("hours")
-            comment = params.get("comment")
-            close = params.get("close") or "N"
-            hours = normalize_hours(hours)
-            print(
-                f"[call_mcp_server] Logging: ticket={ticket}, hours={hours}, comment={comment}, close={close}"
+                        else:
+                            main_tasks = epic.get("main_tasks", {})
+                            for main_task_id, main_task in main_tasks.items():
+                                main_task_summary = main_task.get("summary", "")
+                                if (
+                                    main_task_id
+                                    and main_task_id.lower() != "no main task"
+                                ):
+                                    main_task_icon = "🗂️"
+                                    html_lines.append(
+                                        f"<div style='margin-left:1.5em; font-weight:500;'>{main_task_icon} {html_escape(main_task_id)}: {html_escape(main_task_summary)}</div>"
+                                    )
+                                    tickets = main_task.get("tickets", [])
+                                    for ticket in tickets:
+                                        ticket_key = ticket.get("key", "?")
+                                        ticket_summary = ticket.get("summary", "")
+                                        ticket_icon = "🔖"
+                                        html_lines.append(
+                                            f"<div style='margin-left:3em; font-weight:400;'>{ticket_icon} {html_escape(ticket_key)}: {html_escape(ticket_summary)}</div>"
+                                        )
+                                else:
+                                    tickets = main_task.get("tickets", [])
+                                    for ticket in tickets:
+                                        ticket_key = ticket.get("key", "?")
+                                        ticket_summary = ticket.get("summary", "")
+                                        ticket_icon = "🔖"
+                                        html_lines.append(
+                                            f"<div style='margin-left:1.5em; font-weight:400;'>{ticket_icon} {html_escape(ticket_key)}: {html_escape(ticket_summary)}</div>"
+                                        )
+                return "\n".join(html_lines)
+
+            response = (
+                f"<div style='font-weight:600; margin-bottom:0.5em;'>Open Tickets - {ticket_count} (🏢 Project &gt; 🏷️ Epic &gt; 🗂️ Main Task &gt; 🔖 Ticket)</div>"
+                + render_tickets_hierarchy(hierarchy)
+                + "<div style='margin-top:1em;'>You can also use the Open Tickets to select a ticket and log hours.</div>"
             )
-            if ticket and hours and comment:
-                resp = requests.post(
-                    f"{MCP_SERVER_URL}/log",
-                    json={
-                        "ticket": ticket,
-                        "hours": hours,
-                        "comment": comment,
-                        "close": close,
-                    },
-                )
-                response_json = resp.json()
-                print(f"[call_mcp_server] /log response: {response_json}")
-                if response_json.get("status") == "ok":
-                    response = format_log_command_response(response_json)
-                else:
-                    # If not ok, show error or fallback message
-                    error_msg = (
-                        response_json.get("error")
-                        or response_json.get("message")
-                        or str(response_json)
-                    )
-                    response = f"Failed to log hours: {error_msg}"
+        else:
+            response = "No open tickets found."
+    elif intent == "close":
+        ticket = params.get("ticket")
+        if ticket:
+            response_json = mcp_post("/close", {"ticket": ticket})
+            logger.debug("/close response: %s", response_json)
+            if response_json.get("status") == "ok":
+                response = format_close_command_response(response_json)
             else:
-                response = (
-                    "Missing ticket, hours, or comment. "
-                    "Tip: Use the 'Open Tickets' list on the left to select a ticket, then enter hours and a comment to log hours."
-                )
-        elif intent == "commit":
-            commit_msg = params.get("commit_msg")
-            print(f"[call_mcp_server] Commit message: {commit_msg}")
-            if commit_msg:
-                resp = requests.post(
-                    f"{MCP_SERVER_URL}/commit", json={"commit_msg": commit_msg}
+                error_msg = (
+                    response_json.get("error")
+                    or response_json.get("message")
+                    or str(response_json)
                 )
-                response = resp.json()
-                print(f"[call_mcp_server] /commit response: {response}")
-            else:
-                response = "Missing commit message."
-        elif intent == "undo":
-            resp = requests.post(f"{MCP_SERVER_URL}/undo_last_log")
-            result = resp.json()
-            if result.get("success"):
-                response = result.get("message", "Last hour deleted.")
-            else:
-                response = f"Undo failed: {result.get('message', 'Unknown error')}"
-            print(f"[call_mcp_server] /undo_last_log response: {result}")
-        elif intent == "undo_all":
-            resp = requests.post(f"{MCP_SERVER_URL}/undo_all_logs_today")
-            result = resp.json()
-            if result.get("success"):
-                response = result.get("message", "All today's hours deleted.")
+                response = f"Failed to close ticket: {error_msg}"
+            is_close_refresh = True
+        else:
+            response = "Please specify a ticket key to close."
+    elif intent == "log":
+        ticket = params.get("ticket")
+        hours = params.get("hours")
+        comment = params.get("comment")
+        close = params.get("close") or "N"
+        hours = normalize_hours(hours)
+        logger.debug(
+            "Logging: ticket=%s, hours=%s, comment=%s, close=%s",
+            ticket,
+            hours,
+            comment,
+            close,
+        )
+        if ticket and hours and comment:
+            response_json = mcp_post(
+                "/log",
+                {
+                    "ticket": ticket,
+                    "hours": hours,
+                    "comment": comment,
+                    "close": close,
+                },
+            )
+            logger.debug("/log response: %s", response_json)
+            if response_json.get("status") == "ok":
+                response = format_log_command_response(response_json)
             else:
-                response = f"Undo all failed: {result.get('message', 'Unknown error')}"
-            print(f"[call_mcp_server] /undo_all_logs_today response: {result}")
-        elif intent == "show_hours":
-            # Use the selected_date from state or default to today
-            try:
-                selected_date = params.get("selected_date") if params else None
-                if not selected_date:
-                    selected_date = today
-            except Exception:
-                selected_date = today
-            logs_text = fetch_worklogs(selected_date)
-            response = logs_text
-            print(f"[call_mcp_server] show_hours response: {logs_text}")
+                # If not ok, show error or fallback message
+                error_msg = (
+                    response_json.get("error")
+                    or response_json.get("message")
+                    or str(response_json)
+                )
+                response = f"Failed to log hours: {error_msg}"
         else:
             response = (
-                "You can use natural language commands, e.g.:\n"
-                "- 'Start my workday at 09:30am.'\n"
-                "- 'Show my open tickets.'\n"
-                "- 'Log 2 hours for AHPM-124: Fixed login bug and close it.'\n"
-                "- 'Close ticket AHPM-124.'\n"
-                "- 'Log this commit: (AHPM-124 -h 2h) Fixed bug.'\n"
-                "- Or use the dropdown below to select a ticket and log hours."
+                "Missing ticket, hours, or comment. "
+                "Tip: Use the 'Open Tickets' list on the left to select a ticket, then enter hours and a comment to log hours."
             )
-            print(f"[call_mcp_server] Fallback response.")
-        # Patch history for undo/undo_all to use new terminology in chat
-        if intent == "undo":
-            history = history + [("Undo last hour", str(response))]
-        elif intent == "undo_all":
-            history = history + [("Undo all hours for today", str(response))]
+    elif intent == "commit":
+        commit_msg = params.get("commit_msg")
+        logger.debug("Commit message: %s", commit_msg)
+        if commit_msg:
+            response = mcp_post("/commit", {"commit_msg": commit_msg})
+            logger.debug("/commit response: %s", response)
         else:
-            history = history + [(user_input, str(response))]
-        print(f"[call_mcp_server] Updated history: {history[-1]}")
+            response = "Missing commit message."
+    elif intent == "undo":
+        result = mcp_post("/undo_last_log")
+        if result.get("success"):
+            response = result.get("message", "Last hour deleted.")
+        else:
+            response = f"Undo failed: {result.get('message', 'Unknown error')}"
+        logger.debug("/undo_last_log response: %s", result)
+    elif intent == "undo_all":
+        result = mcp_post("/undo_all_logs")
+        if result.get("success"):
+            response = result.get("message", "All today's hours deleted.")
+        else:
+            response = f"Undo all failed: {result.get('message', 'Unknown error')}"
+        logger.debug("/undo_all_logs response: %s", result)
+    elif intent == "show_hours":
+        # Use the selected_date from state or default to today
+        try:
+            selected_date = params.get("selected_date") if params else None
+            if not selected_date:
+                selected_date = today
+        except Exception:
+            selected_date = today
+        logs_text = fetch_worklogs(selected_date)
+        response = logs_text
+        logger.debug("show_hours response: %s", logs_text)
+    else:
+        response = (
+            "You can use natural language commands, e.g.:\n"
+            "- 'Start my workday at 09:30am.'\n"
+            "- 'Show my open tickets.'\n"
+            "- 'Log 2 hours for AHPM-124: Fixed login bug and close it.'\n"
+            "- 'Close ticket AHPM-124.'\n"
+            "- 'Log this commit: (AHPM-124 -h 2h) Fixed bug.'\n"
+            "- Or use the dropdown below to select a ticket and log hours."
+        )
+        logger.debug("Fallback response for intent %s", intent)
+    return response, is_refresh_open_tickets, is_close_refresh
+
+
+def history_entry(user_input, intent, response):
+    # Patch history for undo/undo_all to use new terminology in chat
+    if intent == "undo":
+        return ("Undo last hour", str(response))
+    elif intent == "undo_all":
+        return ("Undo all hours for today", str(response))
+    return (user_input, str(response))
+
+
+def call_mcp_server(user_input, history):
+    user_input = user_input.strip()
+    logger.debug("User input: %s", user_input)
+    try:
+        with tracing.span("ui.chat_command") as root:
+            with tracing.span("chat.parse_command"):
+                params, intent = parse_user_command(user_input)
+            root.set("intent", intent)
+            with tracing.span("chat.execute_intent"):
+                response, is_refresh_open_tickets, is_close_refresh = execute_intent(
+                    user_input, params
+                )
+        history = history + [history_entry(user_input, intent, response)]
+        logger.debug("New history entry: %s", history[-1])
         return history, history, is_refresh_open_tickets, is_close_refresh, intent
     except Exception as e:
         response = f"Error: {str(e)}"
-        print(f"[call_mcp_server] Exception: {e}")
+        logger.exception("Chat command failed")
         return (
             history + [(user_input, str(response))],
             history + [(user_input, str(response))],
@@ -487,6 +573,56 @@ def call_mcp_server(user_input, history):
         )
 
 
+# --- STREAMING MCP SERVER CALL LOGIC (ASYNC) ---
+# Progress text shown in the chat while the MCP/JIRA call for an intent is in flight
+INTENT_PROGRESS = {
+    "start": "Setting workday start time...",
+    "tickets": "Fetching open tickets from JIRA...",
+    "close": "Closing ticket in JIRA...",
+    "log": "Logging hours to JIRA...",
+    "commit": "Logging commit to JIRA...",
+    "undo": "Deleting last worklog in JIRA...",
+    "undo_all": "Deleting all worklogs in JIRA...",
+    "show_hours": "Fetching worklogs from JIRA...",
+}
+
+
+async def stream_mcp_server(user_input, history, span=None):
+    """
+    Async generator version of call_mcp_server.
+    Blocking OpenAI/HTTP stages run in worker threads so the event loop stays free,
+    and a progress row is yielded to the chat as each stage finishes.
+    Stages are traced as children of span (a new "ui.chat_command" trace if None).
+    Yields: (history, result) where result is None until the final yield,
+    then (is_refresh_open_tickets, is_close_refresh, intent).
+    """
+    user_input = user_input.strip()
+    logger.debug("User input: %s", user_input)
+    root = span or tracing.start_span("ui.chat_command")
+    yield history + [(user_input, "⏳ Understanding your request...")], None
+    try:
+        params, intent = await asyncio.to_thread(
+            tracing.call_in_span, root, "chat.parse_command", parse_user_command, user_input
+        )
+        root.set("intent", intent)
+        progress = INTENT_PROGRESS.get(intent)
+        if progress:
+            yield history + [(user_input, f"⏳ {progress}")], None
+        response, is_refresh_open_tickets, is_close_refresh = await asyncio.to_thread(
+            tracing.call_in_span, root, "chat.execute_intent", execute_intent, user_input, params
+        )
+    except Exception as e:
+        logger.exception("Chat command failed")
+        if span is None:
+            root.end(error=e)
+        yield history + [(user_input, f"Error: {str(e)}")], (False, False, None)
+        return
+    if span is None:
+        root.end()
+    history = history + [history_entry(user_input, intent, response)]
+    yield history, (is_refresh_open_tickets, is_close_refresh, intent)
+
+
 # Remove fetch_hours_today (no longer used)
 
 with gr.Blocks() as demo:
@@ -495,33 +631,60 @@ with gr.Blocks() as demo:
     today = datetime.now()
     date_state = gr.State(today)
 
+    def live_hours(selected_date):
+        """
+        Hours from the live event state (JIRA source only), or None to fetch. The first
+        call opens this process's single /events subscription.
+        """
+        live = live_state()
+        if live is None or Configs.WORKLOG_API_SOURCE == "tempo":
+            return None
+        return live.hours(get_iso_date(selected_date))
+
     # --- HOURS LABEL REFRESH (UI) ---
     def refresh_hours_label(selected_date):
         api_source = Configs.WORKLOG_API_SOURCE
         try:
+            hours = live_hours(selected_date)
+            if hours is not None:
+                return format_hours_label(selected_date, hours)
             if api_source == "tempo":
                 user_key = Configs.TEMPO_USER_KEY
-                resp = requests.get(
-                    f"{MCP_SERVER_URL}/tempo_hours",
-                    params={"date": get_iso_date(selected_date), "user": user_key},
-                )
-                hours = resp.json().get("hours", 0.0)
+                hours = mcp_get(
+                    "/tempo_hours",
+                    {"date": get_iso_date(selected_date), "user": user_key},
+                ).get("hours", 0.0)
             else:
-                resp = requests.get(
-                    f"{MCP_SERVER_URL}/hours",
-                    params={"date": get_iso_date(selected_date)},
-                )
-                hours = resp.json().get("hours", 0.0)
-            # Format the date for display
-            if hasattr(selected_date, "date"):
-                date_obj = selected_date.date()
-            else:
-                date_obj = selected_date
-            human_date = get_human_date(date_obj)
-            return f"{human_date} — Hours: {hours} h"
+                hours = mcp_get(
+                    "/hours", {"date": get_iso_date(selected_date)}
+                ).get("hours", 0.0)
+                if live_state() is not None:
+                    live_state().remember_hours(get_iso_date(selected_date), hours)
+            return format_hours_label(selected_date, hours)
         except Exception:
             return "Hours: N/A"
 
+    # --- DASHBOARD REFRESH (UI) ---
+    def refresh_dashboard(selected_date, include_tickets=False):
+        """
+        One /dashboard round trip for the post-action refresh.
+        Returns: (hours_label, worklogs_text, hierarchy or None)
+        """
+        try:
+            dashboard = load_dashboard(selected_date, include_tickets)
+            live = live_state()
+            if live is not None and dashboard.get("source") != "tempo" and "hours" in dashboard:
+                live.remember_hours(get_iso_date(selected_date), dashboard["hours"])
+            return (
+                format_hours_label(selected_date, dashboard.get("hours", 0.0)),
+                format_worklogs(
+                    dashboard.get("worklogs", []), dashboard.get("source")
+                ),
+                dashboard.get("tickets"),
+            )
+        except Exception as e:
+            return "Hours: N/A", f"Error fetching logs: {str(e)}", None
+
     # --- Main layout: left ticket list, right chat column ---
     with gr.Row():
         with gr.Column(scale=1, min_width=300):
@@ -538,6 +701,8 @@ with gr.Blocks() as demo:
             # --- Compact row above chat view ---
             with gr.Row(equal_height=True):
                 with gr.Column(scale=2, min_width=160):
+                    # Re-rendered every 5 s from the live event state: no MCP call
+                    # unless the stream is down or the date was never fetched
                     hours_today_box = gr.Label(
                         value=refresh_hours_label,
                         inputs=[date_state],
@@ -653,43 +818,15 @@ with gr.Blocks() as demo:
         try:
             if api_source == "tempo":
                 user_key = Configs.TEMPO_USER_KEY
-                resp = requests.get(
-                    f"{MCP_SERVER_URL}/tempo_worklogs",
-                    params={"date": get_iso_date(selected_date), "user": user_key},
-                )
-                logs = resp.json().get("worklogs", [])
-                if not logs:
-                    return "No logs for this date."
-                lines = []
-                for log in logs:
-                    started_raw = log.get("startDate", "")
-                    started_fmt = started_raw
-                    lines.append(
-                        f"**{log.get('issueKey', '')} ({log.get('timeSpentSeconds', 0)//3600}h {(log.get('timeSpentSeconds', 0)%3600)//60}m)** *{log.get('issueSummary', '')}*\n"
-                        f"{log.get('description', '')}  {started_fmt}"
-                    )
-                return "\n\n".join(lines)
+                logs = mcp_get(
+                    "/tempo_worklogs",
+                    {"date": get_iso_date(selected_date), "user": user_key},
+                ).get("worklogs", [])
             else:
-                resp = requests.get(
-                    f"{MCP_SERVER_URL}/worklogs",
-                    params={"date": get_iso_date(selected_date)},
-                )
-                logs = resp.json().get("worklogs", [])
-                if not logs:
-                    return "No logs for this date."
-                lines = []
-                for log in logs:
-                    started_raw = log.get("started", "")
-                    try:
-                        dt = datetime.strptime(started_raw[:19], "%Y-%m-%dT%H:%M:%S")
-                        started_fmt = dt.strftime("%Y-%m-%d %H:%M")
-                    except Exception:
-                        started_fmt = started_raw
-                    lines.append(
-                        f"**{log['issue_key']} ({log['time_spent']})** *{log['summary']}*\n"
-                        f"{log['comment']}  {started_fmt}"
-                    )
-                return "\n\n".join(lines)
+                logs = mcp_get(
+                    "/worklogs", {"date": get_iso_date(selected_date)}
+                ).get("worklogs", [])
+            return format_worklogs(logs, api_source)
         except Exception as e:
             return f"Error fetching logs: {str(e)}"
 
@@ -846,7 +983,9 @@ with gr.Blocks() as demo:
     )
 
     # --- Update log_hours_dropdown to use selected_ticket_state ---
-    def log_hours_dropdown(selected_ticket_label, hours, comment, history):
+    def log_hours_dropdown(
+        selected_ticket_label, hours, comment, history, selected_date=None
+    ):
         # Default unit to hours if not specified
         import re
 
@@ -857,34 +996,33 @@ with gr.Blocks() as demo:
             hours_input = f"{hours_input}h"
         # selected_ticket_label is now the ticket key directly
         ticket_key = selected_ticket_label
-        # --- Add logging for dropdown log ---
-        print(f"[log_hours_dropdown] Selected ticket label: {selected_ticket_label}")
-        print(f"[log_hours_dropdown] Ticket key: {ticket_key}")
-        print(f"[log_hours_dropdown] Hours input: {hours_input}")
-        print(f"[log_hours_dropdown] Comment: {comment}")
+        logger.debug(
+            "Dropdown log: ticket=%s, hours=%s, comment=%s",
+            ticket_key,
+            hours_input,
+            comment,
+        )
         if not ticket_key or not hours_input or not comment:
             response = "Please select a ticket, enter hours, and a comment."
         else:
             try:
-                resp = requests.post(
-                    f"{MCP_SERVER_URL}/log",
-                    json={
+                response = mcp_post(
+                    "/log",
+                    {
                         "ticket": ticket_key,
                         "hours": hours_input,
                         "comment": comment,
                         "close": "N",
                     },
                 )
-                response = resp.json()
-                print(f"[log_hours_dropdown] /log response: {response}")
+                logger.debug("/log response: %s", response)
             except Exception as e:
                 response = f"Error: {str(e)}"
-                print(f"[log_hours_dropdown] Exception: {e}")
+                logger.exception("Dropdown log failed")
         history = history + [
             (f"Log {hours_input} for {ticket_key}: {comment}", str(response))
         ]
-        print(f"[log_hours_dropdown] Updated history: {history[-1]}")
-        return history, history
+        return history, history, refresh_hours_label(selected_date or datetime.now())
 
     # Confirmation state for undo
     confirm_undo_state = gr.State(False)
@@ -898,7 +1036,7 @@ with gr.Blocks() as demo:
                 "Are you sure you want to undo the last hour? Click 'Undo Last Hour' again to confirm.",
             )
         ]
-        return history, history, True
+        return history, history, True, gr.update()
 
     def ask_undo_all_confirmation(history):
         history = history + [
@@ -907,7 +1045,7 @@ with gr.Blocks() as demo:
                 "Are you sure you want to undo ALL hours for today? Click 'Undo All Hours' again to confirm.",
             )
         ]
-        return history, history, True
+        return history, history, True, gr.update()
 
     def do_undo_last_log(history, confirm, date=None):
         if not confirm:
@@ -922,26 +1060,20 @@ with gr.Blocks() as demo:
                     payload["date"] = date.strftime("%Y-%m-%d")
                 else:
                     payload["date"] = str(date)
-            resp = requests.post(f"{MCP_SERVER_URL}/undo_last_log", json=payload)
-            if not resp.text.strip():
-                response = (
-                    "Undo failed: No response from server. Please check backend logs."
-                )
-            else:
-                try:
-                    result = resp.json()
-                    if result.get("success"):
-                        response = result.get("message", "Last hour deleted.")
-                    else:
-                        response = (
-                            f"Undo failed: {result.get('message', 'Unknown error')}"
-                        )
-                except Exception as e:
-                    response = f"Undo failed: Invalid server response. {str(e)}"
+            try:
+                result = mcp_post("/undo_last_log", payload)
+            except ValueError as e:
+                result = None
+                response = f"Undo failed: Invalid server response. {str(e)}"
+            if result is not None:
+                if result.get("success"):
+                    response = result.get("message", "Last hour deleted.")
+                else:
+                    response = f"Undo failed: {result.get('message', 'Unknown error')}"
         except Exception as e:
             response = f"Error: {str(e)}"
         history = history + [("Undo Last Hour", response)]
-        return history, history, False
+        return history, history, False, refresh_hours_label(date or datetime.now())
 
     def do_undo_all_logs(history, confirm, date=None):
         if not confirm:
@@ -955,24 +1087,22 @@ with gr.Blocks() as demo:
                     payload["date"] = date.strftime("%Y-%m-%d")
                 else:
                     payload["date"] = str(date)
-            resp = requests.post(f"{MCP_SERVER_URL}/undo_all_logs", json=payload)
-            if not resp.text.strip():
-                response = "Undo all failed: No response from server. Please check backend logs."
-            else:
-                try:
-                    result = resp.json()
-                    if result.get("success"):
-                        response = result.get("message", "All hours deleted.")
-                    else:
-                        response = (
-                            f"Undo all failed: {result.get('message', 'Unknown error')}"
-                        )
-                except Exception as e:
-                    response = f"Undo all failed: Invalid server response. {str(e)}"
+            try:
+                result = mcp_post("/undo_all_logs", payload)
+            except ValueError as e:
+                result = None
+                response = f"Undo all failed: Invalid server response. {str(e)}"
+            if result is not None:
+                if result.get("success"):
+                    response = result.get("message", "All hours deleted.")
+                else:
+                    response = (
+                        f"Undo all failed: {result.get('message', 'Unknown error')}"
+                    )
         except Exception as e:
             response = f"Error: {str(e)}"
         history = history + [("Undo All Hours", response)]
-        return history, history, False
+        return history, history, False, refresh_hours_label(date or datetime.now())
 
     def reset_undo_confirmation(*args):
         # Always reset confirmation state to False
@@ -985,8 +1115,7 @@ with gr.Blocks() as demo:
     # Add Undo Last Log button handler
     def undo_last_log(history):
         try:
-            resp = requests.post(f"{MCP_SERVER_URL}/undo_last_log")
-            result = resp.json()
+            result = mcp_post("/undo_last_log")
             if result.get("success"):
                 response = result.get("message", "Last hour deleted.")
             else:
@@ -999,8 +1128,7 @@ with gr.Blocks() as demo:
     # Add Undo All Today's Logs button handler
     def undo_all_logs_today(history):
         try:
-            resp = requests.post(f"{MCP_SERVER_URL}/undo_all_logs_today")
-            result = resp.json()
+            result = mcp_post("/undo_all_logs")
             if result.get("success"):
                 response = result.get("message", "All today's hours deleted.")
             else:
@@ -1011,15 +1139,20 @@ with gr.Blocks() as demo:
         return history, history
 
     def list_logs_on_chat(history, selected_date):
-        logs_text = fetch_worklogs(selected_date)
+        # Worklogs and the hours label come from the same /dashboard call
+        hours_label, logs_text, _ = refresh_dashboard(selected_date)
         history = history + [
             (f"List logs for {get_iso_date(selected_date)}", logs_text)
         ]
-        return history, history
+        return history, history, hours_label
 
     # Update dropdown choices on load and every 5 seconds in the background
-    def refresh_open_tickets():
-        _, display_list, ticket_count = get_open_tickets()
+    def refresh_open_tickets(hierarchy=None):
+        # Reuse a hierarchy already fetched (e.g. from /dashboard) when given
+        if hierarchy is None:
+            _, display_list, ticket_count = get_open_tickets()
+        else:
+            display_list, ticket_count = build_ticket_display_list(hierarchy)
         return (
             gr.update(
                 choices=[label for label, key, _ in display_list],
@@ -1042,11 +1175,7 @@ with gr.Blocks() as demo:
     log_btn.click(
         log_hours_dropdown,
         [selected_ticket_state, hours_box, comment_box, state, date_state],
-        [chatbot, state],
-    ).then(
-        refresh_hours_label,
-        [date_state],
-        [hours_today_box],
+        [chatbot, state, hours_today_box],
     ).then(
         reset_undo_confirmation,
         [],
@@ -1059,29 +1188,17 @@ with gr.Blocks() as demo:
     undo_btn.click(
         do_undo_last_log,
         [state, confirm_undo_state, date_state],
-        [chatbot, state, confirm_undo_state],
-    ).then(
-        refresh_hours_label,
-        [date_state],
-        [hours_today_box],
+        [chatbot, state, confirm_undo_state, hours_today_box],
     )
     undo_all_btn.click(
         do_undo_all_logs,
         [state, confirm_undo_all_state, date_state],
-        [chatbot, state, confirm_undo_all_state],
-    ).then(
-        refresh_hours_label,
-        [date_state],
-        [hours_today_box],
+        [chatbot, state, confirm_undo_all_state, hours_today_box],
     )
     list_logs_btn.click(
         list_logs_on_chat,
         [state, date_state],
-        [chatbot, state],
-    ).then(
-        refresh_hours_label,
-        [date_state],
-        [hours_today_box],
+        [chatbot, state, hours_today_box],
     ).then(
         reset_undo_confirmation,
         [],
@@ -1093,9 +1210,8 @@ with gr.Blocks() as demo:
     )
 
     # Function to handle user text input submit (fixes NameError)
-    def user_submit(user_input, history, selected_ticket_tuple, selected_date):
-        import re
-
+    # Async generator: streams progress rows into the chat while the command runs
+    async def user_submit(user_input, history, selected_ticket_tuple, selected_date):
         merged_input = user_input
         ticket_key = None
         if selected_ticket_tuple and isinstance(selected_ticket_tuple, tuple):
@@ -1122,17 +1238,52 @@ with gr.Blocks() as demo:
         else:
             selected_date_obj = selected_date
 
-        # Optionally, patch the user_input or state with the date if needed by backend
-        # If your backend expects the date in the input, you can add it here
-        # For now, just call as before
-        history, state, is_refresh_open_tickets, is_close_refresh, intent = (
-            call_mcp_server(merged_input, history)
-        )
+        # One trace per chat submission: parse, execute and the dashboard refresh
+        root = tracing.start_span("ui.chat_submit", ui="gradio")
+        result = None
+        async for partial_history, result in stream_mcp_server(
+            merged_input, history, span=root
+        ):
+            if result is None:
+                # Progress row: show it in the chat but keep state unchanged until done
+                yield (
+                    partial_history,
+                    gr.update(),
+                    gr.update(),
+                    gr.update(),
+                    gr.update(),
+                    gr.update(),
+                )
+            else:
+                history = partial_history
+        is_refresh_open_tickets, is_close_refresh, intent = result
+        # Hours label and (if needed) the ticket list come from one /dashboard call.
+        # The server hides tickets it just closed, so no need to wait for JIRA here
+        needs_ticket_refresh = is_refresh_open_tickets or is_close_refresh
+        try:
+            # The server pushes the new hours total after a write; only fall back to
+            # /dashboard when tickets are needed or the total did not arrive
+            hours = None
+            if not needs_ticket_refresh:
+                hours = await asyncio.to_thread(live_hours, selected_date_obj)
+            if hours is not None:
+                hours_label, hierarchy = format_hours_label(selected_date_obj, hours), None
+            else:
+                hours_label, _, hierarchy = await asyncio.to_thread(
+                    tracing.call_in_span,
+                    root,
+                    "ui.refresh_dashboard",
+                    refresh_dashboard,
+                    selected_date_obj,
+                    needs_ticket_refresh,
+                )
+        finally:
+            root.end()
         # Only refresh ticket list and selected ticket if needed
-        if is_refresh_open_tickets or is_close_refresh:
-            if is_close_refresh:
-                time.sleep(1)
-            ticket_choices_update, display_list = refresh_open_tickets()
+        if needs_ticket_refresh:
+            ticket_choices_update, display_list = await asyncio.to_thread(
+                refresh_open_tickets, hierarchy
+            )
             selected_ticket_tuple_new = selected_ticket_tuple
             # Try to preserve selected ticket after refresh
             if selected_ticket_tuple and isinstance(selected_ticket_tuple, tuple):
@@ -1143,25 +1294,37 @@ with gr.Blocks() as demo:
                         break
                 else:
                     selected_ticket_tuple_new = (None, "")
-            return (
+            yield (
+                history,
                 history,
-                state,
                 ticket_choices_update,
                 display_list,
                 selected_ticket_tuple_new,
+                hours_label,
             )
         else:
             # No refresh: return unchanged ticket list and selection
-            return history, state, gr.update(), gr.update(), selected_ticket_tuple
+            yield (
+                history,
+                history,
+                gr.update(),
+                gr.update(),
+                selected_ticket_tuple,
+                hours_label,
+            )
 
     txt.submit(
         user_submit,
         [txt, state, selected_ticket_tuple_state, date_state],
-        [chatbot, state, ticket_list, display_list_state],
-    ).then(
-        refresh_hours_label,
-        [date_state],
-        [hours_today_box],
+        [
+            chatbot,
+            state,
+            ticket_list,
+            display_list_state,
+            selected_ticket_tuple_state,
+            hours_today_box,
+        ],
+        concurrency_limit=CHAT_CONCURRENCY_LIMIT,
     ).then(
         reset_undo_confirmation,
         [],
@@ -1418,6 +1581,9 @@ if __name__ == "__main__":
             """
         )
 
+    from logging_setup import setup_logging
+
+    setup_logging()
     if len(sys.argv) > 1 and sys.argv[1] == "test":
         test_extract_command_ai()
     else:
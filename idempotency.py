@@ -0,0 +1,219 @@
+"""
+Idempotency - bounded persistent store of write results keyed by Idempotency-Key
+
+A client that may retry a write (/log, /commit, /close; the commit hook) sends the same
+key with every attempt. The first attempt claims the key and runs; its (payload, status)
+is stored, and later attempts with that key get the stored result back without another
+upstream write. A duplicate that arrives while the first attempt is still running is told
+so (IN_PROGRESS) instead of running in parallel; a key reused with different arguments is
+rejected (MISMATCH).
+
+Results live in a SQLite file (IDEMPOTENCY_DB) so they survive restarts and are shared by
+all server processes on the host. Entries expire after IDEMPOTENCY_TTL seconds and the
+table is trimmed to the IDEMPOTENCY_MAX_KEYS most recent keys. The process running a
+claimed write refreshes the claim's heartbeat while it runs, however long that takes; a
+claim whose process died (crash, kill) is taken over IDEMPOTENCY_LOCK_TIMEOUT seconds
+after its last heartbeat.
+
+Usage:
+    state, stored = idempotency.claim(scope, key, idempotency.fingerprint(args))
+    if state == idempotency.NEW:
+        payload, status = run(args)
+        idempotency.complete(scope, key, payload, status)
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+IDEMPOTENCY_DB = os.environ.get(
+    "IDEMPOTENCY_DB",
+    os.path.join(tempfile.gettempdir(), "ai-mini-agent", "idempotency.sqlite3"),
+)
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "10000"))
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT", "300"))
+MAX_KEY_LENGTH = 255
+PRUNE_EVERY = 100  # completed writes between pruning passes
+
+# claim() states
+NEW = "new"
+REPLAY = "replay"
+IN_PROGRESS = "in_progress"
+MISMATCH = "mismatch"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status INTEGER,
+    response TEXT,
+    created REAL NOT NULL,
+    completed REAL,
+    heartbeat REAL,
+    PRIMARY KEY (scope, key)
+);
+CREATE INDEX IF NOT EXISTS idempotency_keys_created ON idempotency_keys (created);
+"""
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_completions = itertools.count(1)
+_held = set()  # (scope, key) claims this process is running (heartbeat thread)
+_held_lock = threading.Lock()
+_heartbeat_pid = None
+
+
+def _connection():
+    """Per-thread connection to IDEMPOTENCY_DB (autocommit; writes use BEGIN IMMEDIATE)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == IDEMPOTENCY_DB:
+        return conn
+    os.makedirs(os.path.dirname(IDEMPOTENCY_DB) or ".", exist_ok=True)
+    conn = sqlite3.connect(IDEMPOTENCY_DB, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    _local.conn, _local.path = conn, IDEMPOTENCY_DB
+    return conn
+
+
+def fingerprint(args):
+    """Stable digest of a request's arguments, to detect a key reused for another request."""
+    encoded = json.dumps(args or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def valid_key(key):
+    return isinstance(key, str) and 0 < len(key) <= MAX_KEY_LENGTH
+
+
+def claim(scope, key, request_fingerprint):
+    """
+    Claim key within scope (e.g. "<tenant>:POST /log"). Returns (state, stored):
+    (NEW, None) - caller runs the write, then complete() or release();
+    (REPLAY, (payload, status)) - already done, return the stored result;
+    (IN_PROGRESS, None) - another attempt holds the key right now;
+    (MISMATCH, None) - the key was used with different arguments.
+    """
+    now = time.time()
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT fingerprint, status, response, created, completed, heartbeat "
+            "FROM idempotency_keys WHERE scope = ? AND key = ?",
+            (scope, key),
+        ).fetchone()
+        if row is not None:
+            created, completed, heartbeat = row[3], row[4], row[5]
+            expired = now - created > IDEMPOTENCY_TTL
+            abandoned = (
+                completed is None and now - (heartbeat or created) > IDEMPOTENCY_LOCK_TIMEOUT
+            )
+            if expired or abandoned:
+                row = None
+        if row is None:
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys "
+                "(scope, key, fingerprint, created, heartbeat) VALUES (?, ?, ?, ?, ?)",
+                (scope, key, request_fingerprint, now, now),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if row is None:
+        _hold(scope, key)
+        return NEW, None
+    stored_fingerprint, status, response, _, completed, _ = row
+    if stored_fingerprint != request_fingerprint:
+        return MISMATCH, None
+    if completed is None:
+        return IN_PROGRESS, None
+    return REPLAY, (json.loads(response), status)
+
+
+def complete(scope, key, payload, status):
+    """Store the result of a claimed write; later claims of the key replay it."""
+    _unhold(scope, key)
+    conn = _connection()
+    conn.execute(
+        "UPDATE idempotency_keys SET status = ?, response = ?, completed = ? "
+        "WHERE scope = ? AND key = ?",
+        (status, json.dumps(payload, default=str), time.time(), scope, key),
+    )
+    if next(_completions) % PRUNE_EVERY == 0:
+        prune()
+
+
+def release(scope, key):
+    """Drop an unfinished claim (the write failed) so a retry runs it again."""
+    _unhold(scope, key)
+    _connection().execute(
+        "DELETE FROM idempotency_keys WHERE scope = ? AND key = ? AND completed IS NULL",
+        (scope, key),
+    )
+
+
+def _hold(scope, key):
+    """Keep the claim alive until complete()/release(); starts this process's heartbeat once."""
+    global _heartbeat_pid
+    with _held_lock:
+        _held.add((scope, key))
+        if _heartbeat_pid != os.getpid():
+            threading.Thread(target=_heartbeat, name="idempotency-heartbeat", daemon=True).start()
+            _heartbeat_pid = os.getpid()
+
+
+def _unhold(scope, key):
+    with _held_lock:
+        _held.discard((scope, key))
+
+
+def _heartbeat():
+    """Refresh the claims this process is running so no retry takes them over mid-write."""
+    while True:
+        time.sleep(IDEMPOTENCY_LOCK_TIMEOUT / 3)
+        with _held_lock:
+            held = list(_held)
+        if not held:
+            continue
+        try:
+            now = time.time()
+            _connection().executemany(
+                "UPDATE idempotency_keys SET heartbeat = ? "
+                "WHERE scope = ? AND key = ? AND completed IS NULL",
+                [(now, scope, key) for scope, key in held],
+            )
+        except sqlite3.Error as e:
+            logger.warning("Could not refresh idempotency claims: %s", e)
+
+
+def prune():
+    """Delete expired keys, then the oldest beyond IDEMPOTENCY_MAX_KEYS. Returns rows deleted."""
+    conn = _connection()
+    deleted = conn.execute(
+        "DELETE FROM idempotency_keys WHERE created < ?", (time.time() - IDEMPOTENCY_TTL,)
+    ).rowcount
+    (count,) = conn.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()
+    if count > IDEMPOTENCY_MAX_KEYS:
+        deleted += conn.execute(
+            "DELETE FROM idempotency_keys WHERE rowid IN "
+            "(SELECT rowid FROM idempotency_keys ORDER BY created LIMIT ?)",
+            (count - IDEMPOTENCY_MAX_KEYS,),
+        ).rowcount
+    return deleted
+
+
+def key_count():
+    (count,) = _connection().execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()
+    return count
@@ -0,0 +1,376 @@
+"""
+Jobs - persistent background queue for slow MCP write operations
+
+/log (with close), /commit, /close and the undo endpoints can run as jobs: the request
+returns a job id at once (202) and a pool of JOBS_WORKERS threads per server process runs
+the service later. Progress and the final (payload, status) are stored with the job and
+read through GET /jobs/<id> (optionally long-polled with ?wait=) or streamed as
+server-sent events from GET /jobs/<id>/events.
+
+Jobs live in a SQLite file (JOBS_DB) shared by all worker processes, so queued jobs
+survive a restart and any process may run them. Workers refresh the heartbeat of their
+running jobs every JOBS_HEARTBEAT seconds. A running job whose process died (no heartbeat
+for JOBS_STALE_AFTER seconds) is queued again, up to JOBS_MAX_ATTEMPTS runs, if it was
+submitted as retryable: those run idempotent services whose idempotency key (see
+idempotency.py) makes a rerun replay a write that already reached JIRA. Other jobs (e.g.
+the undo endpoints) are marked failed instead of being run twice. Resubmitting a job with
+the same idempotency key but different arguments raises KeyMismatch. Finished jobs are
+kept for JOBS_RETENTION seconds.
+
+Usage:
+    jobs.set_runner(lambda job: call_service(job["method"], job["path"], job["args"], ...))
+    job = jobs.submit("POST", "/undo_all_logs", {"date": "2025-08-01"}, tenant="default")
+    jobs.wait(job["id"], timeout=10)
+
+Inside a running job, long loops report progress with jobs.report_progress(done, total).
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+import idempotency
+
+JOBS_DB = os.environ.get(
+    "JOBS_DB", os.path.join(tempfile.gettempdir(), "ai-mini-agent", "jobs.sqlite3")
+)
+JOBS_ENABLED = os.environ.get("JOBS_ENABLED", "1").lower() in ("1", "true", "yes")
+JOBS_WORKERS = int(os.environ.get("JOBS_WORKERS", "4"))
+JOBS_POLL_INTERVAL = float(os.environ.get("JOBS_POLL_INTERVAL", "1"))
+JOBS_STALE_AFTER = float(os.environ.get("JOBS_STALE_AFTER", "600"))
+JOBS_HEARTBEAT = float(os.environ.get("JOBS_HEARTBEAT", "30"))
+JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", "3"))
+JOBS_RETENTION = float(os.environ.get("JOBS_RETENTION", "86400"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    args TEXT NOT NULL,
+    dedupe_key TEXT UNIQUE,
+    idempotency_key TEXT,
+    fingerprint TEXT,
+    retryable INTEGER NOT NULL DEFAULT 1,
+    traceparent TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    progress TEXT,
+    status INTEGER,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    heartbeat REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_created ON jobs (state, created);
+"""
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_current_job = ContextVar("current_job", default=None)
+# Notified on every job change made by this process (wakes workers, waiters, SSE streams)
+_changed = threading.Condition()
+_runner = None
+_running = set()  # ids of the jobs this process is running (heartbeat thread)
+_running_lock = threading.Lock()
+_workers = []
+_workers_pid = None
+_workers_lock = threading.Lock()
+
+
+def _connection():
+    """Per-thread connection to JOBS_DB (autocommit; multi-statement updates use BEGIN IMMEDIATE)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == JOBS_DB:
+        return conn
+    os.makedirs(os.path.dirname(JOBS_DB) or ".", exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB, timeout=10, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    _local.conn, _local.path = conn, JOBS_DB
+    return conn
+
+
+def _notify():
+    with _changed:
+        _changed.notify_all()
+
+
+def to_dict(row):
+    """Public view of a job row."""
+    return {
+        "id": row["id"],
+        "method": row["method"],
+        "path": row["path"],
+        "args": json.loads(row["args"]),
+        "state": row["state"],
+        "attempts": row["attempts"],
+        "progress": json.loads(row["progress"]) if row["progress"] else None,
+        "status": row["status"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "created": row["created"],
+        "started": row["started"],
+        "finished": row["finished"],
+    }
+
+
+class KeyMismatch(Exception):
+    """The idempotency key already belongs to a job with different arguments."""
+
+
+# --- QUEUE ---
+def submit(method, path, args, tenant, idempotency_key=None, traceparent=None, retryable=True):
+    """
+    Queue a service call and return the job dict. With an idempotency key, resubmitting
+    the same call returns the existing job instead of queueing another one, and
+    resubmitting it with other args raises KeyMismatch. retryable=False: never run the
+    job again after its worker died.
+    """
+    dedupe_key = f"{tenant}:{method} {path}:{idempotency_key}" if idempotency_key else None
+    request_fingerprint = idempotency.fingerprint(args)
+    job_id = uuid.uuid4().hex
+    conn = _connection()
+    conn.execute(
+        "INSERT OR IGNORE INTO jobs (id, tenant, method, path, args, dedupe_key, "
+        "idempotency_key, fingerprint, retryable, traceparent, state, created) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            job_id, tenant, method, path, json.dumps(args or {}, default=str), dedupe_key,
+            idempotency_key or job_id, request_fingerprint, int(bool(retryable)), traceparent,
+            QUEUED, time.time(),
+        ),
+    )
+    if dedupe_key:
+        row = conn.execute("SELECT * FROM jobs WHERE dedupe_key = ?", (dedupe_key,)).fetchone()
+        if row["fingerprint"] not in (None, request_fingerprint):
+            raise KeyMismatch(idempotency_key)
+    else:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    ensure_workers()
+    _notify()
+    return to_dict(row)
+
+
+def get(job_id, tenant=None):
+    """The job dict, or None if unknown (or owned by another tenant when tenant is given)."""
+    row = _connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None or (tenant is not None and row["tenant"] != tenant):
+        return None
+    return to_dict(row)
+
+
+def list_jobs(tenant, state=None, limit=50):
+    """Most recent jobs of a tenant, newest first."""
+    query = "SELECT * FROM jobs WHERE tenant = ?"
+    params = [tenant]
+    if state:
+        query += " AND state = ?"
+        params.append(state)
+    query += " ORDER BY created DESC LIMIT ?"
+    params.append(limit)
+    return [to_dict(row) for row in _connection().execute(query, params)]
+
+
+def wait(job_id, timeout, tenant=None):
+    """
+    Block until the job finishes or timeout seconds pass; returns the latest job dict.
+    Changes from other processes are seen within JOBS_POLL_INTERVAL.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get(job_id, tenant)
+        remaining = deadline - time.monotonic()
+        if job is None or job["state"] in FINISHED_STATES or remaining <= 0:
+            return job
+        with _changed:
+            _changed.wait(min(remaining, JOBS_POLL_INTERVAL))
+
+
+def watch(job_id, tenant=None, heartbeat=15):
+    """
+    Yield the job dict each time it changes, ending after it finishes; yields None when
+    `heartbeat` seconds pass without a change (keeps SSE connections alive).
+    """
+    last, idle_since = None, time.monotonic()
+    while True:
+        job = get(job_id, tenant)
+        if job is None:
+            return
+        version = (job["state"], job["progress"], job["attempts"])
+        if version != last:
+            last, idle_since = version, time.monotonic()
+            yield job
+            if job["state"] in FINISHED_STATES:
+                return
+        elif time.monotonic() - idle_since >= heartbeat:
+            idle_since = time.monotonic()
+            yield None
+        with _changed:
+            _changed.wait(JOBS_POLL_INTERVAL)
+
+
+def claim_next():
+    """
+    Atomically take the oldest queued job. Jobs of dead workers are queued again first
+    when retryable and under JOBS_MAX_ATTEMPTS, otherwise marked failed.
+    """
+    now = time.time()
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        stale = now - JOBS_STALE_AFTER
+        conn.execute(
+            "UPDATE jobs SET state = ?, error = 'worker lost', finished = ? "
+            "WHERE state = ? AND heartbeat < ? AND (attempts >= ? OR retryable = 0)",
+            (FAILED, now, RUNNING, stale, JOBS_MAX_ATTEMPTS),
+        )
+        conn.execute(
+            "UPDATE jobs SET state = ? WHERE state = ? AND heartbeat < ?",
+            (QUEUED, RUNNING, stale),
+        )
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE state = ? ORDER BY created LIMIT 1", (QUEUED,)
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, started = ?, heartbeat = ? "
+                "WHERE id = ?",
+                (RUNNING, now, now, row["id"]),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if row is None:
+        return None
+    job = to_dict(row)
+    job.update(tenant=row["tenant"], idempotency_key=row["idempotency_key"],
+               traceparent=row["traceparent"], state=RUNNING)
+    return job
+
+
+def report_progress(done, total=None, message=None):
+    """Record progress of the job running in this context; no-op outside a job."""
+    job_id = _current_job.get()
+    if job_id is None:
+        return
+    progress = {"done": done, "total": total, "message": message}
+    now = time.time()
+    _connection().execute(
+        "UPDATE jobs SET progress = ?, heartbeat = ? WHERE id = ?",
+        (json.dumps(progress), now, job_id),
+    )
+    _notify()
+
+
+def finish(job_id, payload, status, error=None):
+    now = time.time()
+    state = SUCCEEDED if status < 400 else FAILED
+    conn = _connection()
+    conn.execute(
+        "UPDATE jobs SET state = ?, status = ?, result = ?, error = ?, finished = ?, heartbeat = ? "
+        "WHERE id = ?",
+        (state, status, json.dumps(payload, default=str), error, now, now, job_id),
+    )
+    conn.execute(
+        "DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?", (now - JOBS_RETENTION,)
+    )
+    _notify()
+
+
+def queue_depth():
+    (count,) = _connection().execute(
+        "SELECT COUNT(*) FROM jobs WHERE state = ?", (QUEUED,)
+    ).fetchone()
+    return count
+
+
+# --- WORKERS ---
+def set_runner(runner):
+    """runner(job) -> (payload, status); called by the workers for every claimed job."""
+    global _runner
+    _runner = runner
+
+
+def run_job(job):
+    token = _current_job.set(job["id"])
+    with _running_lock:
+        _running.add(job["id"])
+    try:
+        payload, status = _runner(job)
+        finish(job["id"], payload, status)
+    except Exception as e:
+        logger.exception("Job %s (%s %s) failed", job["id"], job["method"], job["path"])
+        finish(job["id"], {"error": str(e)}, 500, error=f"{type(e).__name__}: {e}")
+    finally:
+        with _running_lock:
+            _running.discard(job["id"])
+        _current_job.reset(token)
+
+
+def _heartbeat():
+    """Keep this process's running jobs from looking stale, however long they take."""
+    while True:
+        time.sleep(min(JOBS_HEARTBEAT, JOBS_STALE_AFTER / 3))
+        with _running_lock:
+            running = list(_running)
+        if not running:
+            continue
+        try:
+            _connection().execute(
+                f"UPDATE jobs SET heartbeat = ? WHERE state = ? AND id IN "
+                f"({', '.join('?' * len(running))})",
+                [time.time(), RUNNING, *running],
+            )
+        except sqlite3.Error as e:
+            logger.warning("Could not refresh job heartbeats: %s", e)
+
+
+def _work():
+    while True:
+        try:
+            job = claim_next()
+        except sqlite3.Error as e:
+            logger.warning("Job queue unavailable: %s", e)
+            job = None
+        if job is None:
+            with _changed:
+                _changed.wait(JOBS_POLL_INTERVAL)
+            continue
+        run_job(job)
+
+
+def ensure_workers():
+    """Start this process's worker threads once (again after a fork, e.g. gunicorn workers)."""
+    global _workers_pid
+    if _workers_pid == os.getpid() or _runner is None:
+        return
+    with _workers_lock:
+        if _workers_pid == os.getpid():
+            return
+        _workers.clear()
+        for i in range(JOBS_WORKERS):
+            thread = threading.Thread(target=_work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            _workers.append(thread)
+        threading.Thread(target=_heartbeat, name="job-heartbeat", daemon=True).start()
+        _workers_pid = os.getpid()
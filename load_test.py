@@ -0,0 +1,435 @@
+"""
+Load Test - throughput and latency benchmark for the MCP HTTP API
+
+Drives mcp_server.py endpoints with concurrent closed-loop clients and a weighted request
+mix, then reports requests/s and p50/p95/p99 latency per endpoint. By default it starts
+fake_jira.py and a production mcp_server.py as subprocesses on free local ports, so runs
+are offline and repeatable; --url targets an already running server instead. Against
+--url the default mix is read-only (READ_ONLY_MIX): endpoints that write or delete
+worklogs (WRITE_ENDPOINTS) run only with --allow-writes.
+
+Results are written as JSON to LOAD_TEST_DIR (one file per run plus last.json).
+--compare checks a run against a baseline file (default: the previous last.json) and
+exits with status 1 when throughput drops or p95 grows by more than --tolerance.
+
+Usage:
+    python load_test.py                                   # 8 clients, 20 s, default mix
+    python load_test.py -c 32 -d 60 --workers 4 --threads 16
+    python load_test.py --mix tickets=5,hours=3,log=1 --jira-latency-ms 150
+    python load_test.py --ramp 1,4,16,64 -d 15            # find where it falls over
+    python load_test.py --compare                         # vs previous run
+    python load_test.py --url http://localhost:5000                 # read-only mix
+    python load_test.py --url http://localhost:5000 --allow-writes --tickets AHPM-1,AHPM-2
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+LOAD_TEST_DIR = os.environ.get("LOAD_TEST_DIR", ".load_tests")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (method, path, payload builder(ticket_key) or None)
+ENDPOINTS = {
+    "tickets": ("GET", "/tickets", None),
+    "tickets_refresh": ("GET", "/tickets", lambda key: {"refresh": "1"}),
+    "hours": ("GET", "/hours", None),
+    "worklogs": ("GET", "/worklogs", None),
+    "dashboard": ("GET", "/dashboard", lambda key: {"tickets": "1"}),
+    "log": (
+        "POST",
+        "/log",
+        lambda key: {"ticket": key, "hours": "15m", "comment": "load test"},
+    ),
+    "commit": (
+        "POST",
+        "/commit",
+        lambda key: {"commit_msg": f"{key} 30m load test commit"},
+    ),
+    "undo_last_log": ("POST", "/undo_last_log", None),
+    "undo_all_logs": ("POST", "/undo_all_logs", None),
+}
+
+DEFAULT_MIX = "tickets=30,tickets_refresh=3,hours=20,worklogs=20,log=10,commit=5,undo_last_log=10,undo_all_logs=2"
+READ_ONLY_MIX = "tickets=30,tickets_refresh=3,hours=20,worklogs=20,dashboard=10"
+WRITE_ENDPOINTS = {"log", "commit", "undo_last_log", "undo_all_logs"}
+
+
+# --- HELPERS ---
+def parse_mix(spec):
+    """'tickets=5,hours=3' -> {"tickets": 5.0, "hours": 3.0}; unknown names raise ValueError."""
+    mix = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+def ticket_keys(tickets):
+    """Ticket keys found anywhere in a /tickets hierarchy."""
+    return sorted(set(re.findall(r"\b[A-Z]+-\d+\b", json.dumps(tickets))))
+
+
+# --- STACK SETUP ---
+def start_stack(args):
+    """Start fake_jira.py and mcp_server.py subprocesses; returns (mcp_url, processes)."""
+    jira_port, mcp_port = free_port(), free_port()
+    run_dir = tempfile.mkdtemp(prefix="load-test-")
+    fake = subprocess.Popen(
+        [
+            sys.executable, os.path.join(HERE, "fake_jira.py"),
+            "--port", str(jira_port),
+            "--issues", str(args.issues),
+            "--latency-ms", str(args.jira_latency_ms),
+            "--jitter-ms", str(args.jira_jitter_ms),
+            "--rate-429", str(args.jira_429_rate),
+            "--error-rate", str(args.jira_error_rate),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    processes = [fake]
+    jira_url = f"http://127.0.0.1:{jira_port}"
+    if not wait_for(f"{jira_url}/_fake/stats"):
+        stop_stack(processes)
+        raise RuntimeError("fake_jira.py did not start")
+    env = dict(
+        os.environ,
+        JIRA_BASE_URL=jira_url,
+        JIRA_USER="fake.user",
+        JIRA_API_TOKEN="fake",
+        MCP_HOST="127.0.0.1",
+        MCP_PORT=str(mcp_port),
+        START_TIME_FILE=os.path.join(run_dir, ".worklog_start_time"),
+        APP_RUN_DIR=run_dir,
+        LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"),
+    )
+    command = [sys.executable, os.path.join(HERE, "mcp_server.py")]
+    if args.dev:
+        command.append("--dev")
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    if args.threads:
+        command += ["--threads", str(args.threads)]
+    processes.append(
+        subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    )
+    mcp_url = f"http://127.0.0.1:{mcp_port}"
+    if not wait_for(f"{mcp_url}/health"):
+        stop_stack(processes)
+        raise RuntimeError("mcp_server.py did not start")
+    return mcp_url, processes
+
+
+def stop_stack(processes):
+    for proc in reversed(processes):
+        proc.terminate()
+    for proc in processes:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# --- LOAD GENERATION ---
+def run_load(url, mix, concurrency, duration, keys, warmup=2.0, timeout=30.0):
+    """
+    Run `concurrency` closed-loop clients for warmup + duration seconds.
+    Only requests started after the warmup are recorded.
+    Returns {"endpoints": {...}, "total": {...}} with counts, errors and latency percentiles.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {name: [] for name in names}  # (latency_ms, ok)
+    statuses = {name: {} for name in names}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while True:
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            method, path, build = ENDPOINTS[name]
+            payload = build(rng.choice(keys) if keys else None) if build else None
+            try:
+                if method == "GET":
+                    resp = session.get(url + path, params=payload, timeout=timeout)
+                else:
+                    resp = session.post(url + path, json=payload or {}, timeout=timeout)
+                status = resp.status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed_ms = (time.perf_counter() - sent) * 1000
+            if sent < measure_from:
+                continue
+            with lock:
+                samples[name].append((elapsed_ms, isinstance(status, int) and status < 400))
+                statuses[name][str(status)] = statuses[name].get(str(status), 0) + 1
+
+    threads = [
+        threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - measure_from
+
+    def summarize(entries, status_counts):
+        latencies = sorted(ms for ms, _ in entries)
+        errors = sum(1 for _, ok in entries if not ok)
+        return {
+            "requests": len(entries),
+            "errors": errors,
+            "error_rate": round(errors / len(entries), 4) if entries else 0.0,
+            "throughput_rps": round(len(entries) / elapsed, 2) if elapsed > 0 else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": round(latencies[-1], 3) if latencies else None,
+            "statuses": status_counts,
+        }
+
+    all_statuses = {}
+    for counts in statuses.values():
+        for status, count in counts.items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "endpoints": {name: summarize(samples[name], statuses[name]) for name in names},
+        "total": summarize([s for name in names for s in samples[name]], all_statuses),
+    }
+
+
+def print_report(result):
+    print(
+        f"\nConcurrency {result['concurrency']}, {result['duration_s']} s measured"
+    )
+    print(
+        f"{'Endpoint':<16} {'Reqs':>7} {'Err%':>6} {'RPS':>8} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    )
+    print("-" * 80)
+    rows = list(result["endpoints"].items()) + [("TOTAL", result["total"])]
+    for name, stats in rows:
+        fmt = lambda v: f"{v:>9.1f}" if v is not None else f"{'-':>9}"
+        print(
+            f"{name:<16} {stats['requests']:>7} {stats['error_rate'] * 100:>6.1f} "
+            f"{stats['throughput_rps']:>8.1f} {fmt(stats['p50_ms'])} {fmt(stats['p95_ms'])} "
+            f"{fmt(stats['p99_ms'])} {fmt(stats['max_ms'])}"
+        )
+
+
+# --- BASELINES ---
+def save_results(document):
+    os.makedirs(LOAD_TEST_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(LOAD_TEST_DIR, f"{stamp}.json")
+    for target in (path, os.path.join(LOAD_TEST_DIR, "last.json")):
+        with open(target, "w") as f:
+            json.dump(document, f, indent=2)
+    return path
+
+
+def compare_results(baseline, current, tolerance):
+    """
+    Compare runs step by step (matching concurrency). Returns a list of regression
+    messages: throughput down or p95 up by more than `tolerance` (fraction).
+    """
+    regressions = []
+    base_steps = {step["concurrency"]: step for step in baseline.get("steps", [])}
+    print(f"\nCompared with baseline from {baseline.get('timestamp', '?')} (tolerance {tolerance:.0%})")
+    print(f"{'Conc':>5} {'Endpoint':<16} {'RPS':>17} {'p95 ms':>21}")
+    print("-" * 62)
+    if not set(base_steps) & {step["concurrency"] for step in current["steps"]}:
+        print("No concurrency steps in common with the baseline.")
+    for step in current["steps"]:
+        base = base_steps.get(step["concurrency"])
+        if base is None:
+            continue
+        for name, stats in list(step["endpoints"].items()) + [("TOTAL", step["total"])]:
+            old = base["total"] if name == "TOTAL" else base["endpoints"].get(name)
+            if not old or not old["requests"] or not stats["requests"]:
+                continue
+            rps_change = (stats["throughput_rps"] - old["throughput_rps"]) / old["throughput_rps"]
+            p95_change = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+            flag = ""
+            if rps_change < -tolerance or p95_change > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(
+                    f"c={step['concurrency']} {name}: rps {rps_change:+.0%}, p95 {p95_change:+.0%}"
+                )
+            print(
+                f"{step['concurrency']:>5} {name:<16} "
+                f"{old['throughput_rps']:>7.1f} -> {stats['throughput_rps']:>7.1f} "
+                f"{old['p95_ms']:>9.1f} -> {stats['p95_ms']:>9.1f}{flag}"
+            )
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- MAIN ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the MCP HTTP API")
+    parser.add_argument("--url", help="target a running MCP server instead of starting one")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--ramp", help="comma-separated concurrency steps, e.g. 1,4,16,64")
+    parser.add_argument("-d", "--duration", type=float, default=20, help="seconds per step")
+    parser.add_argument("--warmup", type=float, default=2, help="unrecorded seconds per step")
+    parser.add_argument(
+        "--mix",
+        help=f"endpoint weights (default {DEFAULT_MIX}; with --url {READ_ONLY_MIX})",
+    )
+    parser.add_argument(
+        "--allow-writes",
+        action="store_true",
+        help="with --url, allow endpoints that write or delete worklogs on the real JIRA",
+    )
+    parser.add_argument("--tickets", help="ticket keys for /log and /commit (default: from /tickets)")
+    parser.add_argument("--max-error-rate", type=float, default=0.05, help="stop ramping above this")
+    parser.add_argument("--compare", nargs="?", const="", help="baseline JSON (default: previous run)")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression fraction")
+    parser.add_argument("--no-save", action="store_true", help="do not write results")
+    server = parser.add_argument_group("self-hosted server and fake JIRA")
+    server.add_argument("--workers", type=int, help="mcp_server.py worker processes")
+    server.add_argument("--threads", type=int, help="mcp_server.py threads per worker")
+    server.add_argument("--dev", action="store_true", help="use the Flask development server")
+    server.add_argument("--issues", type=int, default=300, help="fake JIRA dataset size")
+    server.add_argument("--jira-latency-ms", type=float, default=50)
+    server.add_argument("--jira-jitter-ms", type=float, default=20)
+    server.add_argument("--jira-429-rate", type=float, default=0.0)
+    server.add_argument("--jira-error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix or (READ_ONLY_MIX if args.url else DEFAULT_MIX))
+    writes = sorted(WRITE_ENDPOINTS & set(mix))
+    if args.url and writes and not args.allow_writes:
+        parser.error(
+            f"{', '.join(writes)} would change worklogs behind {args.url}; "
+            "pass --allow-writes to run them against a live server"
+        )
+    steps = [int(c) for c in args.ramp.split(",")] if args.ramp else [args.concurrency]
+    baseline = None
+    if args.compare is not None:
+        baseline_path = args.compare or os.path.join(LOAD_TEST_DIR, "last.json")
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    processes = []
+    url = args.url
+    if not url:
+        url, processes = start_stack(args)
+        print(f"Started fake JIRA and MCP server at {url}")
+    try:
+        if args.tickets:
+            keys = [k.strip() for k in args.tickets.split(",") if k.strip()]
+        else:
+            keys = ticket_keys(requests.get(f"{url}/tickets", timeout=60).json())
+        if not keys and ({"log", "commit"} & set(mix)):
+            print("No ticket keys found: /log and /commit requests will fail (use --tickets).")
+        results = []
+        for concurrency in steps:
+            result = run_load(url, mix, concurrency, args.duration, keys, args.warmup)
+            print_report(result)
+            results.append(result)
+            if result["total"]["error_rate"] > args.max_error_rate and len(steps) > 1:
+                print(
+                    f"\nError rate {result['total']['error_rate']:.1%} above "
+                    f"{args.max_error_rate:.0%} at concurrency {concurrency}: stopping ramp."
+                )
+                break
+    finally:
+        if processes:
+            stop_stack(processes)
+
+    healthy = [r for r in results if r["total"]["error_rate"] <= args.max_error_rate]
+    if len(steps) > 1 and healthy:
+        best = max(healthy, key=lambda r: r["total"]["throughput_rps"])
+        print(
+            f"\nPeak sustained: {best['total']['throughput_rps']:.1f} req/s at concurrency "
+            f"{best['concurrency']} (p99 {best['total']['p99_ms']:.1f} ms)"
+        )
+
+    document = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "target": args.url or "self-hosted",
+        "mix": mix,
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "duration", "warmup", "workers", "threads", "dev", "issues",
+                "jira_latency_ms", "jira_jitter_ms", "jira_429_rate", "jira_error_rate",
+            )
+        },
+        "steps": results,
+    }
+    if not args.no_save:
+        print(f"\nResults saved to {save_results(document)}")
+    if baseline is not None:
+        regressions = compare_results(baseline, document, args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
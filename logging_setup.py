@@ -0,0 +1,150 @@
+"""
+Logging Setup - leveled, non-blocking logging shared by the server, UIs and commit.py
+
+Modules log through the standard library (`logger = logging.getLogger(__name__)`, lazy
+%-style arguments). setup_logging(), called once by each entry point, routes all records
+through a bounded queue to a background listener thread, so callers never block on
+stdout/file writes. When the queue is full, records are dropped and counted instead.
+
+Environment:
+    LOG_LEVEL               root level (default INFO)
+    LOG_LEVELS              per-module levels, e.g. "commit=DEBUG,gradio_chatbot=WARNING"
+    LOG_FORMAT              "text" (default) or "json" (one JSON object per line)
+    LOG_FILE                write to this file instead of stderr
+    LOG_DEBUG_SAMPLE_RATE   fraction of DEBUG records kept (default 1.0)
+    LOG_QUEUE_SIZE          max records waiting for the writer thread (default 10000)
+
+JSON records carry the current trace_id/span_id (see tracing.py) when inside a span.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import metrics
+import tracing
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_FILE = os.environ.get("LOG_FILE")
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+# Chatty third-party loggers, unless overridden in LOG_LEVELS
+DEFAULT_LOG_LEVELS = {"httpx": "WARNING", "urllib3": "WARNING", "openai": "WARNING"}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener = None
+_setup_lock = threading.Lock()
+dropped_records = 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, trace ids, exception, extras."""
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+            + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self.RESERVED and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Runs in the caller's thread, before the record is queued: keeps a sample of DEBUG
+    records and stamps the current trace context (the listener thread cannot see it).
+    """
+
+    def __init__(self, debug_sample_rate=1.0):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record):
+        if (
+            record.levelno <= logging.DEBUG
+            and self.debug_sample_rate < 1.0
+            and random.random() >= self.debug_sample_rate
+        ):
+            return False
+        current = tracing.current_span()
+        if current is not None:
+            record.trace_id = current.trace_id
+            record.span_id = current.span_id
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller: records are dropped when the queue is full."""
+
+    def enqueue(self, record):
+        global dropped_records
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records += 1
+
+
+def parse_levels(spec):
+    """'commit=DEBUG, mcp_server=WARNING' -> {"commit": "DEBUG", "mcp_server": "WARNING"}"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level=None):
+    """Configure root logging once per process (later calls are no-ops)."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        if LOG_FILE:
+            target = logging.FileHandler(LOG_FILE)
+        else:
+            target = logging.StreamHandler(sys.stderr)
+        if LOG_FORMAT == "json":
+            target.setFormatter(JsonFormatter())
+        else:
+            target.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        handler.addFilter(ContextFilter(LOG_DEBUG_SAMPLE_RATE))
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level or LOG_LEVEL)
+        levels = dict(DEFAULT_LOG_LEVELS, **parse_levels(LOG_LEVELS))
+        for name, module_level in levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = logging.handlers.QueueListener(
+            handler.queue, target, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(_listener.stop)
+        metrics.Counter(
+            "log_records_dropped_total",
+            "Log records dropped because the log queue was full",
+            callback=lambda: {(): dropped_records},
+        )
@@ -0,0 +1,405 @@
+"""
+MCP Client - shared transport for the chat UIs (gradio_chatbot.py, streamlit_chatbot.py)
+
+Transports:
+- "http"  : call the MCP server at MCP_SERVER_URL (default, for a remote or separate server process)
+- "local" : call the mcp_server.py services directly in-process, skipping JSON encoding,
+            the localhost socket and Flask request parsing. Used by `python app.py all`.
+
+Both transports return the same payload dicts, owned by the caller: the local transport
+returns a deep copy, since services may answer with objects they cache. Each call runs in a trace span; over HTTP
+the trace context is sent in a `traceparent` header (see tracing.py).
+
+Writes to IDEMPOTENT_PATHS carry an Idempotency-Key. Every call (one user action) gets a
+fresh key; when the HTTP request fails with a connection error or timeout it is resent
+with the same key, up to MCP_WRITE_RETRIES times, so a retry returns the first attempt's
+result instead of logging the work twice. Repeating an action logs it again.
+
+Over HTTP, slow writes (JOB_PATHS) are sent with `Prefer: respond-async`: the server
+queues them as background jobs (see jobs.py) and this client polls /jobs/<id> until the
+job finishes. The polls return at once (backing off up to MCP_JOB_POLL seconds apart), so
+waiting for a job holds no server thread.
+
+live_state() keeps one subscription to the server's /events stream per process and
+serves hours totals from it (LiveState), so the UIs stop re-fetching /hours on a timer
+and after every click; see events.py for the event types.
+
+Usage:
+    from mcp_client import mcp_get, mcp_post
+    mcp_get("/hours", {"date": "2025-08-01"})
+    mcp_post("/log", {"ticket": "AHPM-124", "hours": "2h", "comment": "Fixed bug"})
+
+Benchmark the per-action latency saved by the local transport:
+    python mcp_client.py bench [path ...]
+"""
+
+import copy
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import requests
+import tracing
+
+MCP_SERVER_URL = os.environ.get("MCP_SERVER_URL", "http://localhost:5000")
+MCP_TRANSPORT = os.environ.get("MCP_TRANSPORT", "http")  # "http" or "local"
+MCP_TIMEOUT = (
+    float(os.environ["MCP_TIMEOUT"]) if os.environ.get("MCP_TIMEOUT") else None
+)
+MCP_TOKEN = os.environ.get("MCP_TOKEN")  # bearer token for a multi-tenant server
+MCP_WRITE_RETRIES = int(os.environ.get("MCP_WRITE_RETRIES", "2"))
+IDEMPOTENT_PATHS = {"/log", "/commit", "/close", "/close_batch"}
+JOB_PATHS = {"/log", "/commit", "/close", "/close_batch", "/undo_last_log", "/undo_all_logs"}
+MCP_ASYNC_WRITES = os.environ.get("MCP_ASYNC_WRITES", "1").lower() in ("1", "true", "yes")
+MCP_JOB_POLL = float(os.environ.get("MCP_JOB_POLL", "1"))  # longest pause between job polls
+MCP_JOB_TIMEOUT = float(os.environ.get("MCP_JOB_TIMEOUT", "300"))
+MCP_EVENTS = os.environ.get("MCP_EVENTS", "1").lower() in ("1", "true", "yes")
+MCP_EVENTS_WAIT = float(os.environ.get("MCP_EVENTS_WAIT", "2"))
+# Writes after which the server publishes the date's new hours total
+HOURS_PATHS = {"/log", "/commit", "/undo_last_log", "/undo_all_logs"}
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive session so repeated HTTP calls reuse one connection
+_session = requests.Session()
+
+
+def set_transport(transport):
+    """Switch between the "http" and "local" transports at runtime."""
+    global MCP_TRANSPORT
+    if transport not in ("http", "local"):
+        raise ValueError(f"Unknown MCP transport: {transport}")
+    MCP_TRANSPORT = transport
+
+
+def mcp_request(method, path, payload=None, transport=None, idempotency_key=None):
+    """
+    Call an MCP server endpoint and return its JSON payload.
+    For GET, payload is sent as query params; for POST, as the JSON body.
+    POSTs to IDEMPOTENT_PATHS get a fresh Idempotency-Key unless idempotency_key is given.
+    """
+    transport = transport or MCP_TRANSPORT
+    if idempotency_key is None and method.upper() == "POST" and path in IDEMPOTENT_PATHS:
+        idempotency_key = uuid.uuid4().hex
+    live = _live if method.upper() == "POST" and path in HOURS_PATHS else None
+    if live is not None:
+        write_date = (payload or {}).get("date") or datetime.now().strftime("%Y-%m-%d")
+        live.begin_write(write_date)
+    try:
+        with tracing.span(f"mcp {method.upper()} {path}", transport=transport):
+            result = _send_with_retries(method, path, payload, transport, idempotency_key)
+    finally:
+        if live is not None:
+            live.end_write()
+    return result
+
+
+def _send_with_retries(method, path, payload, transport, idempotency_key):
+    """
+    _send, resent with the same Idempotency-Key after a connection error or timeout
+    (HTTP writes only): the server runs the write at most once for that key.
+    """
+    retries = MCP_WRITE_RETRIES if idempotency_key and transport != "local" else 0
+    for attempt in range(retries + 1):
+        try:
+            return _send(method, path, payload, transport, idempotency_key)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == retries:
+                raise
+            logger.warning("%s %s failed (%s); retrying with the same Idempotency-Key", method, path, e)
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def _send(method, path, payload, transport, idempotency_key):
+    if transport == "local":
+        from mcp_server import call_service
+
+        result, _ = call_service(method, path, payload, idempotency_key=idempotency_key)
+        # e.g. /tickets answers with the tenant's cached hierarchy: callers may mutate theirs
+        return copy.deepcopy(result)
+    url = f"{MCP_SERVER_URL}{path}"
+    header = tracing.traceparent()
+    headers = {"traceparent": header} if header else {}
+    if MCP_TOKEN:
+        headers["Authorization"] = f"Bearer {MCP_TOKEN}"
+    if method.upper() == "GET":
+        resp = _session.get(url, params=payload, headers=headers, timeout=MCP_TIMEOUT)
+        return resp.json()
+    poll_headers = dict(headers)
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    if MCP_ASYNC_WRITES and path in JOB_PATHS:
+        headers["Prefer"] = "respond-async"
+    resp = _session.post(url, json=payload or {}, headers=headers, timeout=MCP_TIMEOUT)
+    if resp.status_code == 202:
+        return wait_for_job(resp.json(), poll_headers)
+    return resp.json()
+
+
+def wait_for_job(job, headers):
+    """
+    Poll a queued job until it finishes; its result payload, or a pending notice.
+    Polls start 0.1 s apart and back off to MCP_JOB_POLL seconds.
+    """
+    deadline = time.monotonic() + MCP_JOB_TIMEOUT
+    pause = 0.1
+    while True:
+        time.sleep(pause)
+        pause = min(pause * 2, MCP_JOB_POLL)
+        resp = _session.get(
+            f"{MCP_SERVER_URL}{job['status_url']}", headers=headers, timeout=MCP_TIMEOUT
+        )
+        current = resp.json()
+        if resp.status_code != 200:
+            return current
+        if current["state"] in ("succeeded", "failed"):
+            return current["result"]
+        if time.monotonic() >= deadline:
+            return {
+                "status": "pending",
+                "job_id": job["job_id"],
+                "message": f"Still running in the background (job {job['job_id']}).",
+            }
+
+
+def mcp_get(path, params=None):
+    return mcp_request("GET", path, params)
+
+
+def mcp_post(path, payload=None, idempotency_key=None):
+    return mcp_request("POST", path, payload, idempotency_key=idempotency_key)
+
+
+# --- LIVE EVENTS ---
+class LiveState:
+    """
+    Hours totals per date, kept current by the /events stream. hours() returns None when
+    a date is unknown or the stream is down, so callers fall back to an MCP request.
+    """
+
+    def __init__(self):
+        self.connected = False
+        self.tickets_version = 0  # bumped on every ticket/tickets event
+        self._hours = {}
+        self._awaiting = set()  # dates written through this client, new total pending
+        self._writes = 0
+        self._cond = threading.Condition()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        callback(event_type, data) is called from the subscriber thread for every event,
+        and with ("connection", {"connected": bool}) when the stream goes up or down.
+        """
+        self._listeners.append(callback)
+
+    def _notify_listeners(self, event_type, data):
+        for callback in list(self._listeners):
+            try:
+                callback(event_type, data)
+            except Exception:
+                logger.exception("Event listener failed for %s", event_type)
+
+    def apply(self, event_type, data):
+        with self._cond:
+            if event_type == "hours":
+                self._hours[data["date"]] = data["hours"]
+                self._awaiting.discard(data["date"])
+            elif event_type in ("ticket", "tickets"):
+                self.tickets_version += 1
+            self._cond.notify_all()
+        self._notify_listeners(event_type, data)
+
+    def set_connected(self, connected):
+        with self._cond:
+            changed = connected != self.connected
+            self.connected = connected
+            if not connected:
+                # Events may be missed while down: start from fresh fetches
+                self._hours.clear()
+                self._awaiting.clear()
+            self._cond.notify_all()
+        if changed:
+            self._notify_listeners("connection", {"connected": connected})
+
+    def begin_write(self, date_iso):
+        with self._cond:
+            self._writes += 1
+            self._hours.pop(date_iso, None)
+            self._awaiting.add(date_iso)
+
+    def end_write(self):
+        with self._cond:
+            self._writes -= 1
+
+    def hours(self, date_iso, wait=MCP_EVENTS_WAIT):
+        """
+        Hours total for date_iso, or None. Right after a write to that date, waits up to
+        `wait` seconds for the total the server publishes.
+        """
+        with self._cond:
+            if date_iso in self._awaiting and self.connected:
+                self._cond.wait_for(
+                    lambda: date_iso not in self._awaiting or not self.connected, wait
+                )
+                self._awaiting.discard(date_iso)
+            return self._hours.get(date_iso) if self.connected else None
+
+    def remember_hours(self, date_iso, hours):
+        """Cache a fetched total; ignored while writes are in flight or offline."""
+        with self._cond:
+            if self.connected and not self._writes and date_iso not in self._awaiting:
+                self._hours[date_iso] = hours
+
+
+_live = None
+_live_lock = threading.Lock()
+
+
+def live_state():
+    """The process-wide LiveState, subscribing to /events on first use (None if MCP_EVENTS=0)."""
+    global _live
+    if not MCP_EVENTS:
+        return None
+    with _live_lock:
+        if _live is None:
+            _live = LiveState()
+            threading.Thread(
+                target=_follow_events, args=(_live,), name="mcp-events", daemon=True
+            ).start()
+    return _live
+
+
+def iter_events(last_event_id=None):
+    """
+    Yield (event_id, event_type, data) from the server's /events stream; frames without
+    data (the initial resume point) come as (event_id, None, None).
+    """
+    if MCP_TRANSPORT == "local":
+        import events
+        from mcp_server import ensure_event_sync
+
+        start = events.latest_id() if last_event_id is None else last_event_id
+        events.add_subscriber("default")
+        ensure_event_sync()
+        try:
+            yield start, None, None
+            for event in events.watch("default", start):
+                if event is not None:
+                    yield event["id"], event["type"], event["data"]
+        finally:
+            events.remove_subscriber("default")
+        return
+    headers = {"Accept": "text/event-stream"}
+    if MCP_TOKEN:
+        headers["Authorization"] = f"Bearer {MCP_TOKEN}"
+    if last_event_id is not None:
+        headers["Last-Event-ID"] = str(last_event_id)
+    # Own session: the stream holds its connection for as long as it runs
+    with requests.Session() as session:
+        # Read timeout above the server's keep-alive interval detects dead streams
+        resp = session.get(
+            f"{MCP_SERVER_URL}/events", headers=headers, stream=True, timeout=(10, 60)
+        )
+        resp.raise_for_status()
+        event_id, event_type, data = None, None, []
+        for line in resp.iter_lines(decode_unicode=True):
+            if line:
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "id":
+                    event_id = int(value)
+                elif field == "event":
+                    event_type = value
+                elif field == "data":
+                    data.append(value)
+                continue
+            if data:
+                yield event_id, event_type or "message", json.loads("\n".join(data))
+            elif event_id is not None:
+                yield event_id, None, None
+            event_type, data = None, []
+
+
+def _follow_events(state):
+    """Subscriber thread: feed events into state, reconnecting with backoff."""
+    last_id, delay = None, 1
+    while True:
+        try:
+            for event_id, event_type, data in iter_events(last_id):
+                if not state.connected:
+                    state.set_connected(True)
+                    delay = 1
+                if event_id is not None:
+                    last_id = event_id
+                if event_type:
+                    state.apply(event_type, data)
+        except Exception as e:
+            logger.debug("Event stream ended: %s", e)
+        state.set_connected(False)
+        time.sleep(delay)
+        delay = min(delay * 2, 30)
+
+
+def benchmark_transports(paths=None, iterations=200):
+    """
+    Start the MCP server on a free local port and time each path over both transports.
+    Prints mean/p50/p95 latency per transport and the per-call latency saved.
+    """
+    import statistics
+    import threading
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from mcp_server import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    global MCP_SERVER_URL
+    paths = paths or ["/health"]
+    server = make_server(
+        "127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    previous_url = MCP_SERVER_URL
+    MCP_SERVER_URL = f"http://127.0.0.1:{server.server_port}"
+    try:
+        print(f"{'Path':<20} {'Transport':<10} {'Mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+        print("-" * 60)
+        for path in paths:
+            means = {}
+            results = {}
+            for transport in ("http", "local"):
+                results[transport] = mcp_request("GET", path, transport=transport)
+                samples = []
+                for _ in range(iterations):
+                    t0 = time.perf_counter()
+                    mcp_request("GET", path, transport=transport)
+                    samples.append((time.perf_counter() - t0) * 1000)
+                samples.sort()
+                means[transport] = statistics.mean(samples)
+                print(
+                    f"{path:<20} {transport:<10} {means[transport]:>9.3f} "
+                    f"{samples[len(samples) // 2]:>9.3f} {samples[int(len(samples) * 0.95)]:>9.3f}"
+                )
+            identical = "yes" if results["http"] == results["local"] else "NO"
+            print(
+                f"{path:<20} saved {means['http'] - means['local']:.3f} ms per call "
+                f"(identical results: {identical})"
+            )
+        print("-" * 60)
+    finally:
+        server.shutdown()
+        MCP_SERVER_URL = previous_url
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark_transports(sys.argv[2:] or None)
+    else:
+        print("Usage: python mcp_client.py bench [path ...]")
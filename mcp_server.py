@@ -1,13 +1,23 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, abort, request, jsonify, send_file
 
 import sys
 import os
+import csv
+import errno
+import io
+import json
+import re
+import socket
+import time
+import logging
+from datetime import datetime
 
 sys.path.append(os.path.dirname(__file__))
 from commit import (
     set_start_time_manual,
     log_work,
     close_ticket,
+    close_tickets,
     get_open_tickets,
     extract_commit_info,
     extract_commit_comment,
@@ -16,153 +26,1250 @@ from commit import (
     delete_last_worklog,
     delete_all_worklogs,
     get_all_worklogs,
+    fetch_worklog_issues,
+    sum_worklog_hours,
+    flatten_worklogs,
+    aggregate_worklog_range,
+    iter_worklog_export_rows,
+    get_team_hours,
+    RANGE_GROUP_BY,
+    TEAM_MEMBERS,
+    valid_team_user,
+    CLOSE_BATCH_MAX,
 )
+from configs import Configs
+from utils import TTLCache
+import metrics
+import tracing
+import profiler
+import tenants
+import idempotency
+import jobs
+import events
+from logging_setup import setup_logging
 
 
  # --- IMPORTS & SETUP ---
 # Import Tempo API helpers from commit.py (must be before endpoints)
 try:
-    from commit import get_tempo_hours_logged, get_tempo_all_worklogs
+    from commit import (
+        get_tempo_hours_logged,
+        get_tempo_all_worklogs,
+        get_tempo_hours_by_day,
+        get_tempo_worklogs,
+    )
 except ImportError:
     get_tempo_hours_logged = None
     get_tempo_all_worklogs = None
+    get_tempo_hours_by_day = None
+    get_tempo_worklogs = None
 
 
 # --- FLASK APP INIT ---
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
+
+
+# --- TICKET CACHE & CLOSE OVERLAY ---
+# Open-ticket hierarchy is cached briefly; tickets closed through this server are
+# kept in a short-lived overlay and hidden from /tickets until JIRA's search catches up.
+TICKETS_CACHE_TTL = float(os.environ.get("TICKETS_CACHE_TTL", "30"))
+TICKET_OVERLAY_TTL = float(os.environ.get("TICKET_OVERLAY_TTL", "120"))
+MAX_RANGE_DAYS = int(os.environ.get("MAX_RANGE_DAYS", "366"))
+# Keyed by tenant (see tenants.py): one hierarchy per active tenant
+_tickets_cache = TTLCache(ttl=TICKETS_CACHE_TTL, maxsize=256)
+_closed_overlay = TTLCache(ttl=TICKET_OVERLAY_TTL, maxsize=4096)
+metrics.register_cache("tickets", _tickets_cache)
+
+
+def close_and_track(ticket_key, date_str=None):
+    """
+    Close the ticket in JIRA and, on success, record it in the closed overlay and
+    tell /events subscribers.
+    """
+    closed = close_ticket(ticket_key, date_str)
+    if closed:
+        _closed_overlay.set((tenants.tenant_name(), ticket_key), True)
+        publish_event("ticket", {"ticket": ticket_key, "state": "closed"})
+    return closed
+
+
+def write_failed(message, ticket_key):
+    """
+    502 response for a JIRA write that did not go through. Being a 5xx, it is never stored
+    under an Idempotency-Key, so a retry with the same key runs the write again.
+    """
+    return {"status": "error", "message": message, "ticket": ticket_key}, 502
+
+
+def close_after_log(ticket_key, date_str=None):
+    """
+    Close a ticket whose worklog was just stored; result fields for the response. A failed
+    close does not fail the request (retrying it would log the work twice), it is reported
+    as status "partial" with closed=False so the caller can retry /close on its own.
+    """
+    if close_and_track(ticket_key, date_str):
+        return {"closed": True}
+    return {
+        "status": "partial",
+        "closed": False,
+        "message": f"Work logged, but JIRA did not close {ticket_key}",
+    }
+
+
+# Closes made by other worker processes (including the background jobs they run) reach
+# this one through the shared events table: before serving tickets, each process applies
+# the tenant's "ticket" events it has not seen yet to its own overlay and cache.
+TICKET_EVENTS_BATCH = 500
+_applied_ticket_events = {}  # tenant -> id of the last "ticket" event applied here
+
+
+def apply_ticket_events():
+    """Overlay tickets closed elsewhere; a bulk close also drops the cached hierarchy."""
+    if not events.EVENTS_ENABLED:
+        return
+    tenant = tenants.tenant_name()
+    after = _applied_ticket_events.get(tenant, 0)
+    now = time.time()
+    try:
+        while True:
+            batch = events.read_since(
+                tenant, after, TICKET_EVENTS_BATCH, event_type="ticket",
+                newer_than=now - TICKET_OVERLAY_TTL,
+            )
+            for event in batch:
+                data = event["data"]
+                remaining = TICKET_OVERLAY_TTL - (now - event["created"])
+                for key in data.get("tickets") or [data.get("ticket")]:
+                    if key:
+                        _closed_overlay.set((tenant, key), True, ttl=remaining)
+                if "tickets" in data:
+                    _tickets_cache.pop(tenant)
+                after = event["id"]
+            if len(batch) < TICKET_EVENTS_BATCH:
+                break
+    except Exception as e:
+        logger.warning("Could not read ticket events: %s", e)
+    _applied_ticket_events[tenant] = max(after, _applied_ticket_events.get(tenant, 0))
+
+
+def get_cached_open_tickets(refresh=False):
+    """Return the open-ticket hierarchy, served from cache unless expired or refresh=True."""
+    apply_ticket_events()
+    tenant = tenants.tenant_name()
+    hierarchy = None if refresh else _tickets_cache.get(tenant)
+    if hierarchy is None:
+        hierarchy = get_open_tickets()
+        # get_open_tickets returns [] on JIRA errors; only cache real hierarchies
+        if isinstance(hierarchy, dict):
+            _tickets_cache.set(tenant, hierarchy)
+    return apply_ticket_overlay(hierarchy)
+
+
+def apply_ticket_overlay(hierarchy):
+    """
+    Return a copy of the hierarchy without recently closed tickets.
+    Main tasks and epics emptied by the overlay are dropped; the input is not mutated.
+    """
+    tenant = tenants.tenant_name()
+    closed = {key for owner, key in _closed_overlay.keys() if owner == tenant}
+    if not closed or not isinstance(hierarchy, dict):
+        return hierarchy
+    result = {}
+    for project_id, project in hierarchy.items():
+        epics = {}
+        for epic_id, epic in project["epics"].items():
+            main_tasks = {}
+            for main_task_id, main_task in epic["main_tasks"].items():
+                tickets = [t for t in main_task["tickets"] if t["key"] not in closed]
+                if tickets or not main_task["tickets"]:
+                    main_tasks[main_task_id] = dict(main_task, tickets=tickets)
+            if main_tasks or not epic["main_tasks"]:
+                epics[epic_id] = dict(epic, main_tasks=main_tasks)
+        result[project_id] = dict(project, epics=epics)
+    return result
+
+
+# --- LIVE EVENTS ---
+# Changes the server makes or sees are published to GET /events (see events.py). While a
+# tenant has a stream open, a sync thread re-reads today's hours and the open tickets
+# every EVENTS_SYNC_INTERVAL seconds, so edits made outside the server reach the UIs too.
+EVENTS_SYNC_INTERVAL = float(os.environ.get("EVENTS_SYNC_INTERVAL", "60"))
+_sync_pid = None
+
+
+def event_date(date_str=None):
+    return date_str or datetime.now().strftime("%Y-%m-%d")
+
+
+def publish_event(event_type, data, **options):
+    """Publish for the current tenant; a failing event store never fails the write."""
+    try:
+        events.publish(tenants.tenant_name(), event_type, data, **options)
+    except Exception as e:
+        logger.warning("Could not publish %s event: %s", event_type, e)
+
+
+def publish_hours(date_str=None):
+    """
+    Publish the date's hours total if it changed (one worklog search). Skipped while no
+    process has an /events stream open for the tenant: nobody would read the total.
+    """
+    if not events.EVENTS_ENABLED or not events.has_subscribers(tenants.tenant_name()):
+        return
+    day = event_date(date_str)
+    date_query, issues = fetch_worklog_issues(day)
+    if issues is None:
+        return
+    hours = sum_worklog_hours(issues, date_query)
+    publish_event(
+        "hours", {"date": day, "hours": hours}, topic=f"hours:{day}", only_if_changed=True
+    )
+
+
+def announce_worklogs(action, date_str=None, **details):
+    """After a worklog write: publish the change and the date's new hours total."""
+    if not events.EVENTS_ENABLED:
+        return
+    day = event_date(date_str)
+    publish_event("worklog", dict(details, action=action, date=day))
+    try:
+        publish_hours(day)
+    except Exception as e:
+        logger.warning("Could not refresh hours for %s: %s", day, e)
+
+
+def open_ticket_keys(hierarchy):
+    return sorted(
+        ticket["key"]
+        for project in hierarchy.values()
+        for epic in project["epics"].values()
+        for main_task in epic["main_tasks"].values()
+        for ticket in main_task["tickets"]
+    )
+
+
+def sync_tenant(name):
+    """Re-read today's hours and the open tickets of one subscribed tenant."""
+    tenant = None
+    if tenants.enabled():
+        tenant = tenants.tenant_by_name(name)
+        if tenant is None:
+            return
+    with tenants.activate(tenant):
+        publish_hours()
+        hierarchy = get_cached_open_tickets(refresh=True)
+        if isinstance(hierarchy, dict):
+            keys = open_ticket_keys(hierarchy)
+            publish_event("tickets", {"open": len(keys), "keys": keys}, only_if_changed=True)
+
+
+def sync_events_forever():
+    while True:
+        time.sleep(EVENTS_SYNC_INTERVAL)
+        for name in events.subscribed_tenants():
+            try:
+                sync_tenant(name)
+            except Exception as e:
+                logger.warning("Event sync for tenant %s failed: %s", name, e)
+
+
+def ensure_event_sync():
+    """Start this process's sync thread on the first /events stream."""
+    global _sync_pid
+    if EVENTS_SYNC_INTERVAL <= 0 or _sync_pid == os.getpid():
+        return
+    _sync_pid = os.getpid()
+    import threading
+
+    threading.Thread(target=sync_events_forever, name="event-sync", daemon=True).start()
+
+
+# --- SERVICE REGISTRY ---
+# Every endpoint is a plain function that takes a dict of arguments (query params for GET,
+# JSON body for POST) and returns a JSON-able payload, or (payload, status).
+# Flask routes and the in-process client in mcp_client.py both dispatch through call_service,
+# so HTTP and in-process calls return identical results.
+SERVICES = {}
+# Writes that honour an Idempotency-Key header (see idempotency.py)
+IDEMPOTENT_SERVICES = set()
+# Slow writes a client may run as background jobs with `Prefer: respond-async` (see jobs.py)
+BACKGROUND_SERVICES = set()
+
+# Service time per endpoint, recorded in call_service for both transports
+REQUEST_LATENCY = metrics.Histogram(
+    "mcp_request_seconds",
+    "MCP endpoint service time",
+    ["path", "method", "status", "transport"],
+)
+REQUESTS_IN_FLIGHT = metrics.Gauge(
+    "mcp_requests_in_flight", "MCP requests currently being served"
+)
+
+
+def service(path, methods, idempotent=False, background=False):
+    """
+    Register func as the service for path and expose it as a Flask route.
+    idempotent=True: retries carrying the same Idempotency-Key replay the first result.
+    background=True: callers may queue it as a job and get 202 + job id right away.
+    """
+
+    def decorator(func):
+        for method in methods:
+            SERVICES[(method, path)] = func
+            if idempotent:
+                IDEMPOTENT_SERVICES.add((method, path))
+            if background:
+                BACKGROUND_SERVICES.add((method, path))
+
+        def view():
+            tenant, denied = resolve_tenant(path)
+            if denied is not None:
+                return denied
+            if request.method == "GET":
+                args = request.args.to_dict()
+            else:
+                args = request.get_json(silent=True) or {}
+            payload, status = call_service(
+                request.method,
+                path,
+                args,
+                transport="http",
+                traceparent=request.headers.get("traceparent"),
+                tenant=tenant,
+                idempotency_key=request.headers.get("Idempotency-Key"),
+                respond_async="respond-async" in request.headers.get("Prefer", ""),
+            )
+            response = jsonify(payload)
+            if status == 202 and "job_id" in payload:
+                response.headers["Location"] = payload["status_url"]
+            return response, status
+
+        app.add_url_rule(path, func.__name__, view, methods=methods)
+        return func
+
+    return decorator
+
+
+# Paths served without a tenant token in multi-tenant mode
+PUBLIC_PATHS = {"/health"}
+# Server-wide data across tenants: admin tenants only in multi-tenant mode
+OPERATOR_PATHS = {"/metrics", "/debug/traces"}
+
+TENANT_REQUESTS = metrics.Counter(
+    "mcp_tenant_requests_total",
+    "HTTP requests by tenant and admission result",
+    ["tenant", "result"],
+)
+metrics.Gauge(
+    "mcp_tenant_sessions",
+    "Tenants with an open upstream connection pool",
+    callback=lambda: {(): tenants.active_sessions()},
+)
+
+
+def resolve_tenant(path):
+    """
+    (tenant, None) for the current HTTP request, or (None, error response) when the
+    bearer token is unknown (401), the tenant is over its rate limit (429) or the path
+    is an operator path and the tenant no admin (403).
+    Single-user mode (no TENANTS_FILE) always admits with tenant None.
+    """
+    if not tenants.enabled() or path in PUBLIC_PATHS:
+        return None, None
+    tenant = tenants.tenant_for_token(tenants.bearer_token(request.headers))
+    if tenant is None:
+        TENANT_REQUESTS.inc("unknown", "unauthorized")
+        response = jsonify({"error": "Missing or unknown bearer token"})
+        response.headers["WWW-Authenticate"] = "Bearer"
+        return None, (response, 401)
+    retry_after = tenant.limiter.acquire()
+    if retry_after:
+        TENANT_REQUESTS.inc(tenant.name, "rate_limited")
+        response = jsonify({"error": "Rate limit exceeded"})
+        response.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+        return None, (response, 429)
+    if path in OPERATOR_PATHS and not tenant.admin:
+        TENANT_REQUESTS.inc(tenant.name, "forbidden")
+        return None, (jsonify({"error": "Admin tenant required"}), 403)
+    TENANT_REQUESTS.inc(tenant.name, "ok")
+    return tenant, None
+
+
+def profile_scope():
+    """Tenant whose profiles the caller may see; None (all) in single-user mode and for admins."""
+    tenant = tenants.current_tenant()
+    if tenant is None or tenant.admin:
+        return None
+    return tenant.name
+
+
+def call_service(
+    method, path, args=None, transport="local", traceparent=None, tenant=None,
+    idempotency_key=None, respond_async=False,
+):
+    """
+    Run the service registered for (method, path) in-process. Returns (payload, status).
+    The call is traced as a child of traceparent (HTTP) or of the caller's current span,
+    and acts for `tenant` (None: the single-user Configs credentials). For idempotent
+    services an idempotency_key makes retries return the first attempt's result.
+    respond_async=True queues a background service as a job and returns (job info, 202).
+    """
+    method = method.upper()
+    func = SERVICES.get((method, path))
+    if func is None:
+        return {"error": f"No endpoint for {method} {path}"}, 404
+    REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    with tracing.span(
+        f"service {method} {path}", traceparent=traceparent, transport=transport
+    ) as span:
+        try:
+            with tenants.activate(tenant), profiler.profile_request(
+                method, path, tenants.tenant_name()
+            ):
+                if respond_async and jobs.JOBS_ENABLED and (method, path) in BACKGROUND_SERVICES:
+                    result = queue_job(method, path, args or {}, idempotency_key)
+                elif idempotency_key and (method, path) in IDEMPOTENT_SERVICES:
+                    result = run_idempotent(func, method, path, args or {}, idempotency_key)
+                else:
+                    result = func(args or {})
+            if not isinstance(result, tuple):
+                result = (result, 200)
+            status = result[1]
+            return result
+        finally:
+            span.set("status", status)
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start, path, method, str(status), transport
+            )
+
+
+IDEMPOTENT_REQUESTS = metrics.Counter(
+    "mcp_idempotent_requests_total",
+    "Writes carrying an Idempotency-Key, by outcome (new, replay, in_progress, mismatch)",
+    ["path", "outcome"],
+)
+
+
+def run_idempotent(func, method, path, args, key):
+    """
+    Run func(args) at most once per (tenant, endpoint, key). The first result with a
+    status below 500 is stored and returned to every retry; failures release the key.
+    Services must therefore answer a write JIRA rejected with a 5xx (see write_failed).
+    """
+    if not idempotency.valid_key(key):
+        return {"error": f"Idempotency-Key must be 1-{idempotency.MAX_KEY_LENGTH} characters"}, 400
+    scope = f"{tenants.tenant_name()}:{method} {path}"
+    try:
+        state, stored = idempotency.claim(scope, key, idempotency.fingerprint(args))
+    except Exception as e:
+        # A broken key store must not block writes: run them without deduplication
+        logger.warning("Idempotency store unavailable (%s); running %s %s once more", e, method, path)
+        return func(args)
+    IDEMPOTENT_REQUESTS.inc(path, state)
+    current = tracing.current_span()
+    if current is not None:
+        current.set("idempotency", state)
+    if state == idempotency.REPLAY:
+        return stored
+    if state == idempotency.IN_PROGRESS:
+        return {"error": "A request with this Idempotency-Key is still in progress"}, 409
+    if state == idempotency.MISMATCH:
+        return {"error": "Idempotency-Key was already used for a different request"}, 422
+    try:
+        result = func(args)
+    except BaseException:
+        idempotency.release(scope, key)
+        raise
+    payload, status = result if isinstance(result, tuple) else (result, 200)
+    if status < 500:
+        idempotency.complete(scope, key, payload, status)
+    else:
+        idempotency.release(scope, key)
+    return payload, status
+
+
+# --- BACKGROUND JOBS ---
+JOB_MAX_WAIT = float(os.environ.get("JOB_MAX_WAIT", "30"))
+
+metrics.Gauge(
+    "mcp_jobs_queued",
+    "Background jobs waiting for a worker (all processes)",
+    callback=lambda: {(): jobs.queue_depth()},
+)
+
+
+def job_links(job):
+    """Job summary returned by the 202 response and GET /jobs."""
+    return {
+        "job_id": job["id"],
+        "state": job["state"],
+        "status_url": f"/jobs/{job['id']}",
+        "events_url": f"/jobs/{job['id']}/events",
+    }
+
+
+def queue_job(method, path, args, idempotency_key=None):
+    """
+    Queue (method, path, args) for the current tenant; (job summary, 202). Only idempotent
+    services are run again after a worker dies; the others would repeat their writes.
+    """
+    if idempotency_key is not None and not idempotency.valid_key(idempotency_key):
+        return {"error": f"Idempotency-Key must be 1-{idempotency.MAX_KEY_LENGTH} characters"}, 400
+    try:
+        job = jobs.submit(
+            method, path, args, tenants.tenant_name(), idempotency_key, tracing.traceparent(),
+            retryable=(method, path) in IDEMPOTENT_SERVICES,
+        )
+    except jobs.KeyMismatch:
+        return {"error": "Idempotency-Key was already used for a different request"}, 422
+    return job_links(job), 202
+
+
+def run_job(job):
+    """jobs.py runner: the queued service call, as the tenant that submitted it."""
+    tenant = None
+    if tenants.enabled():
+        tenant = tenants.tenant_by_name(job["tenant"])
+        if tenant is None:
+            return {"error": f"Tenant {job['tenant']} no longer exists"}, 403
+    return call_service(
+        job["method"],
+        job["path"],
+        job["args"],
+        transport="job",
+        traceparent=job["traceparent"],
+        tenant=tenant,
+        idempotency_key=job["idempotency_key"],
+    )
+
+
+jobs.set_runner(run_job)
+
+
+@app.before_request
+def start_job_workers():
+    # Lazily, so every gunicorn worker starts its own pool after the fork and resumes
+    # jobs left queued by a previous run
+    if jobs.JOBS_ENABLED:
+        jobs.ensure_workers()
+
+
+metrics.Gauge(
+    "mcp_event_subscribers",
+    "Open /events streams in this process",
+    callback=lambda: {(): events.subscriber_count()},
+)
+
+
+@app.route("/events", methods=["GET"])
+def api_events():
+    """
+    Server-sent events of the caller's changes (see events.py): `hours`, `worklog`,
+    `ticket` and `tickets`, each with its id so a reconnect resumes after Last-Event-ID.
+    """
+    tenant, denied = resolve_tenant("/events")
+    if denied is not None:
+        return denied
+    if not events.EVENTS_ENABLED:
+        return jsonify({"error": "Events are disabled"}), 404
+    last = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_id = int(last) if last else None
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+    name = tenant.name if tenant is not None else "default"
+    ensure_event_sync()
+
+    def generate():
+        events.add_subscriber(name)
+        try:
+            # Browsers reconnect after `retry` ms; send the current id for the resume point
+            yield f"retry: 3000\nid: {last_id if last_id is not None else events.latest_id()}\n\n"
+            for event in events.watch(name, last_id):
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield (
+                    f"id: {event['id']}\nevent: {event['type']}\n"
+                    f"data: {json.dumps(event['data'], default=str)}\n\n"
+                )
+        finally:
+            events.remove_subscriber(name)
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@service("/jobs", ["GET"])
+def api_jobs(args):
+    """
+    One job with ?id= (long-polled up to ?wait= seconds, at most JOB_MAX_WAIT), else the
+    tenant's recent jobs (?state=queued|running|succeeded|failed, ?limit=).
+    """
+    tenant = tenants.tenant_name()
+    job_id = args.get("id")
+    try:
+        wait = min(float(args.get("wait", 0)), JOB_MAX_WAIT)
+        limit = int(args.get("limit", 50))
+    except ValueError:
+        return {"error": "wait and limit must be numbers"}, 400
+    if not job_id:
+        recent = jobs.list_jobs(tenant, args.get("state"), limit)
+        return {"jobs": [dict(job, **job_links(job)) for job in recent]}
+    if wait > 0:
+        with profiler.waiting():
+            job = jobs.wait(job_id, wait, tenant)
+    else:
+        job = jobs.get(job_id, tenant)
+    if job is None:
+        return {"error": f"Unknown job {job_id}"}, 404
+    return dict(job, **job_links(job))
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def api_job(job_id):
+    """GET /jobs/<id>[?wait=N]: one job through the /jobs service."""
+    tenant, denied = resolve_tenant("/jobs")
+    if denied is not None:
+        return denied
+    payload, status = call_service(
+        "GET",
+        "/jobs",
+        dict(request.args.to_dict(), id=job_id),
+        transport="http",
+        traceparent=request.headers.get("traceparent"),
+        tenant=tenant,
+    )
+    return jsonify(payload), status
+
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def api_job_events(job_id):
+    """
+    Server-sent events for one job: `progress` on every change, then one `done` with the
+    result, after which the stream ends. Comment lines keep idle connections open.
+    """
+    tenant, denied = resolve_tenant("/jobs")
+    if denied is not None:
+        return denied
+    owner = tenant.name if tenant is not None else "default"
+    if jobs.get(job_id, owner) is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+
+    def generate():
+        for job in jobs.watch(job_id, owner):
+            if job is None:
+                yield ": keep-alive\n\n"
+                continue
+            event = "done" if job["state"] in jobs.FINISHED_STATES else "progress"
+            yield f"event: {event}\ndata: {json.dumps(job, default=str)}\n\n"
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def is_truthy(value):
+    """Interpret a query/body flag such as ?refresh=1 or {"tickets": true}."""
+    return str(value or "").lower() in ("1", "true", "yes")
+
+
+@service("/health", ["GET"])
+def api_health(args):
+    return {"status": "ok"}
+
+
+@service("/debug/traces", ["GET"])
+def api_debug_traces(args):
+    """Recent traces (most recent first) with per-span timing; ?limit=N&trace_id=..."""
+    try:
+        limit = int(args.get("limit", 20))
+    except ValueError:
+        return {"error": "limit must be an integer"}, 400
+    return {"traces": tracing.get_traces(limit, args.get("trace_id"))}
+
+
+@service("/debug/profiles", ["GET"])
+def api_debug_profiles(args):
+    """Stored slow/sampled request profiles (the caller's own unless admin), newest first."""
+    return {
+        "enabled": profiler.PROFILE_ENABLED,
+        "sample_rate": profiler.PROFILE_SAMPLE_RATE,
+        "slow_ms": profiler.PROFILE_SLOW_MS,
+        "profiles": profiler.list_profiles(profile_scope()),
+    }
+
+
+@app.route("/debug/profiles/<profile_id>", methods=["GET"])
+def api_debug_profile_download(profile_id):
+    """Download one profile: JSON (default), ?format=prof (raw cProfile) or ?format=folded."""
+    tenant, denied = resolve_tenant("/debug/profiles")
+    if denied is not None:
+        return denied
+    fmt = request.args.get("format", "json")
+    with tenants.activate(tenant):
+        path = profiler.profile_file(profile_id, fmt, profile_scope())
+    if path is None:
+        abort(404)
+    if fmt == "folded":
+        with open(path) as f:
+            stacks = json.load(f).get("stacks") or []
+        return Response("\n".join(stacks) + "\n", mimetype="text/plain")
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path))
+
+
+@app.route("/metrics", methods=["GET"])
+def api_metrics():
+    """Prometheus text format: endpoint/upstream latency, in-flight requests, cache hit ratios."""
+    tenant, denied = resolve_tenant("/metrics")
+    if denied is not None:
+        return denied
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 
 # --- TEMPO API ENDPOINTS ---
-@app.route("/tempo_hours", methods=["GET"])
-def api_tempo_hours():
+@service("/tempo_hours", ["GET"])
+def api_tempo_hours(args):
+    """Hours for ?date=; with ?to= also per-day totals ("days") for the whole range."""
     if not get_tempo_hours_logged:
-        return jsonify({"error": "Tempo API not available"}), 500
-    date_str = request.args.get("date")
-    user_key = request.args.get("user")
+        return {"error": "Tempo API not available"}, 500
+    date_str = args.get("date")
+    to_str = args.get("to")
+    user_key = args.get("user")
     try:
+        if to_str:
+            days = get_tempo_hours_by_day(date_str, to_str, user_key)
+            hours = round(sum(days.values()), 2)
+            return {"hours": hours, "days": days, "date": date_str, "to": to_str, "user": user_key}
         hours = get_tempo_hours_logged(date_str, user_key)
-        return jsonify({"hours": hours, "date": date_str, "user": user_key})
+        return {"hours": hours, "date": date_str, "user": user_key}
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
 
-@app.route("/tempo_worklogs", methods=["GET"])
-def api_tempo_worklogs():
+@service("/tempo_worklogs", ["GET"])
+def api_tempo_worklogs(args):
+    """Worklogs for ?date=, or for the range ?date= to ?to= (inclusive)."""
     if not get_tempo_all_worklogs:
-        return jsonify({"error": "Tempo API not available"}), 500
-    date_str = request.args.get("date")
-    user_key = request.args.get("user")
+        return {"error": "Tempo API not available"}, 500
+    date_str = args.get("date")
+    to_str = args.get("to")
+    user_key = args.get("user")
     try:
+        if to_str:
+            logs = get_tempo_worklogs(date_str, to_str, user_key)
+            return {"worklogs": logs, "date": date_str, "to": to_str, "user": user_key}
         logs = get_tempo_all_worklogs(date_str, user_key)
-        return jsonify({"worklogs": logs, "date": date_str, "user": user_key})
+        return {"worklogs": logs, "date": date_str, "user": user_key}
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
 
  # --- JIRA API ENDPOINTS ---
-@app.route("/start", methods=["POST"])
-def api_start():
-    hhmm = request.json.get("time")
+@service("/start", ["POST"])
+def api_start(args):
+    hhmm = args.get("time")
     set_start_time_manual(hhmm)
-    return jsonify({"status": "ok", "start_time": hhmm})
-
-
-@app.route("/log", methods=["POST"])
-def api_log():
-    data = request.json
-    ticket_key = data.get("ticket")
-    hours = data.get("hours")
-    comment = data.get("comment", "")
-    close_flag = data.get("close", "N")
-    date_str = data.get("date")
-    log_work(ticket_key, hours, comment, date_str)
-    if close_flag.lower() in ["c", "y"]:
-        close_ticket(ticket_key)
+    return {"status": "ok", "start_time": hhmm}
+
+
+@service("/log", ["POST"], idempotent=True, background=True)
+def api_log(args):
+    ticket_key = args.get("ticket")
+    hours = args.get("hours")
+    comment = args.get("comment", "")
+    close_flag = args.get("close", "N")
+    date_str = args.get("date")
+    closing = close_flag.lower() in ["c", "y"]
+    steps = 2 if closing else 1
+    if not log_work(ticket_key, hours, comment, date_str):
+        return write_failed(f"JIRA did not accept the worklog for {ticket_key}", ticket_key)
+    jobs.report_progress(1, steps, "Work logged")
+    result = {
+        "status": "ok",
+        "ticket": ticket_key,
+        "hours": hours,
+        "comment": comment,
+        "close": close_flag,
+        "date": date_str,
+    }
+    if closing:
+        result.update(close_after_log(ticket_key))
+        jobs.report_progress(2, steps, "Ticket closed" if result["closed"] else "Close failed")
     set_start_time()
-    return jsonify(
-        {
-            "status": "ok",
-            "ticket": ticket_key,
-            "hours": hours,
-            "comment": comment,
-            "close": close_flag,
-            "date": date_str,
-        }
-    )
+    announce_worklogs("logged", date_str, ticket=ticket_key, time_spent=hours)
+    return result
+
+
+@service("/close", ["POST"], idempotent=True, background=True)
+def api_close(args):
+    ticket_key = args.get("ticket")
+    date_str = args.get("date")
+    if not close_and_track(ticket_key, date_str):
+        return write_failed(f"JIRA did not close {ticket_key}", ticket_key)
+    return {"status": "ok", "ticket": ticket_key, "date": date_str}
+
 
+TICKET_KEY_RE = re.compile(r"[A-Z][A-Z0-9_]*-\d+")
 
-@app.route("/close", methods=["POST"])
-def api_close():
-    data = request.json
-    ticket_key = data.get("ticket")
-    date_str = data.get("date")
-    close_ticket(ticket_key, date_str)
-    return jsonify({"status": "ok", "ticket": ticket_key, "date": date_str})
 
+@service("/close_batch", ["POST"], idempotent=True, background=True)
+def api_close_batch(args):
+    """
+    Close {"tickets": ["AHPM-1", ...]} (or a comma-separated string) in one call.
+    Returns per-ticket results; the ticket cache is invalidated (in every worker, through
+    the events table) and subscribers are told once for the whole batch.
+    """
+    raw = args.get("tickets") or []
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    keys = list(dict.fromkeys(str(k).strip().upper() for k in raw if str(k).strip()))
+    if not keys:
+        return {"error": "No tickets given"}, 400
+    if len(keys) > CLOSE_BATCH_MAX:
+        return {"error": f"At most {CLOSE_BATCH_MAX} tickets per request"}, 400
+    invalid = [k for k in keys if not TICKET_KEY_RE.fullmatch(k)]
+    if invalid:
+        return {"error": f"Invalid ticket keys: {', '.join(invalid)}"}, 400
+    results = close_tickets(keys)
+    closed = [r["ticket"] for r in results if r["closed"]]
+    if closed:
+        tenant = tenants.tenant_name()
+        for key in closed:
+            _closed_overlay.set((tenant, key), True)
+        _tickets_cache.pop(tenant)
+        # Other workers apply the event to their overlay and cache (apply_ticket_events)
+        publish_event("ticket", {"tickets": closed, "state": "closed"})
+    failed = len(results) - len(closed)
+    return {
+        "status": "ok" if not failed else ("partial" if closed else "error"),
+        "closed": len(closed),
+        "failed": failed,
+        "results": results,
+    }
 
-@app.route("/tickets", methods=["GET"])
-def api_tickets():
-    hierarchy = get_open_tickets()
-    return jsonify({"tickets": hierarchy})
 
+@service("/tickets", ["GET"])
+def api_tickets(args):
+    refresh = is_truthy(args.get("refresh"))
+    hierarchy = get_cached_open_tickets(refresh)
+    return {"tickets": hierarchy}
 
-@app.route("/commit", methods=["POST"])
-def api_commit():
-    data = request.json
-    commit_msg = data.get("commit_msg", "")
-    date_str = data.get("date")
+
+@service("/commit", ["POST"], idempotent=True, background=True)
+def api_commit(args):
+    commit_msg = args.get("commit_msg", "")
+    date_str = args.get("date")
     ticket_key, hours, close_flag, start_time = extract_commit_info(commit_msg)
     comment = "On commit: " + extract_commit_comment(commit_msg)
     if ticket_key and hours:
-        log_work(ticket_key, hours, comment, date_str)
+        if not log_work(ticket_key, hours, comment, date_str):
+            return write_failed(f"JIRA did not accept the worklog for {ticket_key}", ticket_key)
+        result = {"status": "ok", "ticket": ticket_key, "hours": hours, "date": date_str}
         if close_flag.lower() in ["c", "y"]:
-            close_ticket(ticket_key, date_str)
+            result.update(close_after_log(ticket_key, date_str))
         set_start_time()
-        return jsonify(
-            {"status": "ok", "ticket": ticket_key, "hours": hours, "date": date_str}
-        )
+        announce_worklogs("logged", date_str, ticket=ticket_key, time_spent=hours)
+        return result
     else:
-        return (
-            jsonify({"status": "error", "message": "Could not extract ticket/hours"}),
-            400,
-        )
+        return {"status": "error", "message": "Could not extract ticket/hours"}, 400
 
 
-@app.route("/hours", methods=["GET"])
-def api_hours():
-    date_str = request.args.get("date")
+@service("/hours", ["GET"])
+def api_hours(args):
+    date_str = args.get("date")
     hours = get_hours_logged(date_str)
-    return jsonify({"hours": hours, "date": date_str})
+    return {"hours": hours, "date": date_str}
+
+
+@service("/dashboard", ["GET"])
+def api_dashboard(args):
+    """
+    Everything the UI refreshes after an action, from one upstream worklog query:
+    hours total and worklogs for ?date=, plus the open-ticket hierarchy when ?tickets=1.
+    ?source=tempo (default: WORKLOG_API_SOURCE) reads worklogs from Tempo for ?user= instead.
+    """
+    date_str = args.get("date")
+    source = args.get("source") or Configs.WORKLOG_API_SOURCE or "jira"
+    if source == "tempo":
+        if not get_tempo_all_worklogs:
+            return {"error": "Tempo API not available"}, 500
+        try:
+            logs = get_tempo_all_worklogs(date_str, args.get("user"))
+        except Exception as e:
+            return {"error": str(e)}, 500
+        total_seconds = sum(wl.get("timeSpentSeconds", 0) for wl in logs)
+        hours = round(total_seconds / 3600, 2)
+    else:
+        date_query, issues = fetch_worklog_issues(date_str)
+        issues = issues or []
+        hours = sum_worklog_hours(issues, date_query)
+        logs = flatten_worklogs(issues, date_query)
+    payload = {"date": date_str, "source": source, "hours": hours, "worklogs": logs}
+    if is_truthy(args.get("tickets")):
+        payload["tickets"] = get_cached_open_tickets(is_truthy(args.get("refresh")))
+    return payload
 
 
-@app.route("/undo_last_log", methods=["POST"])
-def api_undo_last_log():
-    data = request.json
-    date_str = data.get("date") if data else None
+@service("/undo_last_log", ["POST"], background=True)
+def api_undo_last_log(args):
+    date_str = args.get("date")
     result = delete_last_worklog(date_str)
-    return jsonify(result)
+    if result.get("success"):
+        announce_worklogs("deleted", date_str, deleted=1)
+    return result
 
 
-@app.route("/undo_all_logs", methods=["POST"])
-def api_undo_all_logs():
-    data = request.json
-    date_str = data.get("date") if data else None
+@service("/undo_all_logs", ["POST"], background=True)
+def api_undo_all_logs(args):
+    date_str = args.get("date")
     result = delete_all_worklogs(date_str)
-    return jsonify(result)
+    if result.get("deleted"):
+        announce_worklogs("deleted", date_str, deleted=result["deleted"])
+    return result
 
 
-@app.route("/worklogs", methods=["GET"])
-def api_worklogs():
-    date_str = request.args.get("date")
+@service("/worklogs", ["GET"])
+def api_worklogs(args):
+    date_str = args.get("date")
     logs = get_all_worklogs(date_str)
-    return jsonify({"worklogs": logs, "date": date_str})
+    return {"worklogs": logs, "date": date_str}
+
+
+def parse_range_args(args):
+    """(from, to) YYYY-MM-DD strings from ?from=&to=, or raise ValueError."""
+    date_from, date_to = args.get("from"), args.get("to")
+    if not date_from or not date_to:
+        raise ValueError("'from' and 'to' (YYYY-MM-DD) are required")
+    start = datetime.strptime(date_from, "%Y-%m-%d").date()
+    end = datetime.strptime(date_to, "%Y-%m-%d").date()
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"Ranges are limited to {MAX_RANGE_DAYS} days")
+    return start.isoformat(), end.isoformat()
+
+
+@service("/hours_range", ["GET"])
+def api_hours_range(args):
+    """Total and per-day hours for ?from=&to= (inclusive), from one worklog search."""
+    try:
+        date_from, date_to = parse_range_args(args)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    try:
+        return aggregate_worklog_range(date_from, date_to)
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+@service("/worklogs_range", ["GET"])
+def api_worklogs_range(args):
+    """
+    Worklogs for ?from=&to= (inclusive) with per-day totals and, with
+    ?group_by=day|ticket|epic, grouped totals. One worklog search per range.
+    """
+    group_by = args.get("group_by") or "day"
+    if group_by not in RANGE_GROUP_BY:
+        return {"error": f"group_by must be one of: {', '.join(RANGE_GROUP_BY)}"}, 400
+    try:
+        date_from, date_to = parse_range_args(args)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    try:
+        return aggregate_worklog_range(date_from, date_to, group_by, include_worklogs=True)
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+@service("/team_hours", ["GET"])
+def api_team_hours(args):
+    """
+    User x day hours for ?from=&to= (default: today) for ?users=id1,id2 (default:
+    TEAM_MEMBERS). ?refresh=1 refetches every cell instead of only the expired ones.
+    """
+    users = [u.strip() for u in (args.get("users") or "").split(",") if u.strip()]
+    users = users or TEAM_MEMBERS
+    if not users:
+        return {"error": "No users: pass ?users= or set TEAM_MEMBERS"}, 400
+    invalid = [u for u in users if not valid_team_user(u)]
+    if invalid:
+        return {"error": f"Invalid user ids: {', '.join(invalid)}"}, 400
+    today = datetime.now().strftime("%Y-%m-%d")
+    try:
+        date_from, date_to = parse_range_args(
+            {"from": args.get("from") or today, "to": args.get("to") or args.get("from") or today}
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    try:
+        return get_team_hours(users, date_from, date_to, is_truthy(args.get("refresh")))
+    except Exception as e:
+        return {"error": str(e)}, 500
 
 
+EXPORT_COLUMNS = [
+    "date", "started", "issue_key", "summary", "time_spent", "seconds", "comment", "worklog_id",
+]
+
+
+@app.route("/worklogs/export", methods=["GET"])
+def api_worklogs_export():
+    """
+    Stream the worklogs of ?from=&to= as NDJSON (default) or ?format=csv, row by row as
+    JIRA search pages arrive. Not a registered service: the body is a stream, not a payload.
+    The status is already sent when rows stream, so a JIRA failure ends NDJSON with an
+    {"error": ...} line and CSV with a row whose date is "#error" and comment the message.
+    """
+    tenant, denied = resolve_tenant("/worklogs/export")
+    if denied is not None:
+        return denied
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        date_from, date_to = parse_range_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    span = tracing.start_span(
+        "service GET /worklogs/export",
+        traceparent=request.headers.get("traceparent"),
+        transport="http",
+        format=fmt,
+    )
+
+    def generate():
+        start = time.perf_counter()
+        rows = 0
+        status = "200"
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, EXPORT_COLUMNS, extrasaction="ignore")
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            with tracing.activate(span), tenants.activate(tenant):
+                if fmt == "csv":
+                    writer.writeheader()
+                    for row in iter_worklog_export_rows(date_from, date_to):
+                        writer.writerow(row)
+                        rows += 1
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+                    yield buffer.getvalue()
+                else:
+                    for row in iter_worklog_export_rows(date_from, date_to):
+                        rows += 1
+                        yield json.dumps(row) + "\n"
+        except Exception as e:
+            status = "500"
+            logger.error("Worklog export %s..%s failed after %d rows: %s", date_from, date_to, rows, e)
+            span.end(error=e)
+            if fmt == "ndjson":
+                yield json.dumps({"error": str(e)}) + "\n"
+            else:
+                writer.writerow({"date": "#error", "comment": str(e)})
+                yield buffer.getvalue()
+        finally:
+            span.set("rows", rows)
+            span.end()
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start, "/worklogs/export", "GET", status, "http"
+            )
+
+    if fmt == "csv":
+        return Response(
+            generate(),
+            mimetype="text/csv",
+            headers={
+                "Content-Disposition": f"attachment; filename=worklogs_{date_from}_{date_to}.csv"
+            },
+        )
+    return Response(generate(), mimetype="application/x-ndjson")
+
 
 # --- SERVER RUN LOGIC ---
-def run_server():
-    app.run(host="0.0.0.0", port=5000)
+# Production serving: gunicorn (gthread workers) where available, waitress otherwise.
+# Caches are per worker process; closes reach every worker's overlay and ticket cache
+# through the events table (apply_ticket_events), other caches expire on their TTL.
+MCP_HOST = os.environ.get("MCP_HOST", "0.0.0.0")
+MCP_PORT = int(os.environ.get("MCP_PORT", "5000"))
+MCP_WORKERS = int(os.environ.get("MCP_WORKERS", "1"))  # worker processes (gunicorn)
+MCP_THREADS = int(os.environ.get("MCP_THREADS", "8"))  # request threads per worker
+MCP_BACKLOG = int(os.environ.get("MCP_BACKLOG", "128"))  # pending connection queue
+MCP_MAX_CONNECTIONS = int(os.environ.get("MCP_MAX_CONNECTIONS", "100"))  # per worker
+MCP_KEEPALIVE = int(os.environ.get("MCP_KEEPALIVE", "5"))  # idle keep-alive seconds
+MCP_GRACEFUL_TIMEOUT = int(os.environ.get("MCP_GRACEFUL_TIMEOUT", "30"))
+MCP_WORKER_TIMEOUT = int(os.environ.get("MCP_WORKER_TIMEOUT", "120"))
+# SO_REUSEPORT lets a restarted server bind while the previous instance drains
+MCP_REUSE_PORT = is_truthy(os.environ.get("MCP_REUSE_PORT", "1")) and hasattr(
+    socket, "SO_REUSEPORT"
+)
+
+
+def bind_listen_socket(host, port):
+    """Open the listening socket with SO_REUSEADDR (and SO_REUSEPORT when enabled)."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if MCP_REUSE_PORT:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+def port_shareable(host, port):
+    """
+    False when a listener holds port without SO_REUSEPORT (the Flask dev server, an older
+    instance), so binding next to it fails with EADDRINUSE.
+    """
+    try:
+        bind_listen_socket(host, port).close()
+    except OSError as e:
+        if e.errno == errno.EADDRINUSE:
+            return False
+        raise
+    return True
+
+
+def run_gunicorn(workers, threads, on_ready=None):
+    import threading
+    import time
+    from gunicorn.app.base import BaseApplication
+
+    def call_when_serving(arbiter):
+        # when_ready fires before workers are spawned: wait for the first one so the
+        # previous instance is only retired once this one accepts connections
+        while not arbiter.WORKERS:
+            time.sleep(0.05)
+        time.sleep(0.5)
+        on_ready()
+
+    class MCPApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{MCP_HOST}:{MCP_PORT}",
+                "workers": workers,
+                "threads": threads,
+                "worker_class": "gthread",
+                "backlog": MCP_BACKLOG,
+                "worker_connections": MCP_MAX_CONNECTIONS,
+                "keepalive": MCP_KEEPALIVE,
+                "graceful_timeout": MCP_GRACEFUL_TIMEOUT,
+                "timeout": MCP_WORKER_TIMEOUT,
+                "reuse_port": MCP_REUSE_PORT,
+            }
+            if on_ready:
+                options["when_ready"] = lambda arbiter: threading.Thread(
+                    target=call_when_serving, args=(arbiter,), daemon=True
+                ).start()
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    MCPApplication().run()
+
+
+def run_waitress(threads, on_ready=None):
+    import signal
+    import threading
+    from waitress import create_server
+
+    server = create_server(
+        app,
+        sockets=[bind_listen_socket(MCP_HOST, MCP_PORT)],
+        threads=threads,
+        backlog=MCP_BACKLOG,
+        connection_limit=MCP_MAX_CONNECTIONS,
+        channel_timeout=MCP_KEEPALIVE,
+    )
+    # Graceful shutdown: stop accepting on SIGTERM (signals only work in the main thread)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *args: server.close())
+    if on_ready:
+        on_ready()
+    logger.info(
+        "MCP server (waitress, %s threads) on http://%s:%s", threads, MCP_HOST, MCP_PORT
+    )
+    try:
+        server.run()
+    except (KeyboardInterrupt, OSError):
+        pass
+    finally:
+        server.close()
+
+
+def run_server(production=False, workers=None, threads=None, on_ready=None):
+    """
+    Run the MCP HTTP server.
+    production=False: Flask development server (default, single process).
+    production=True : gunicorn with `workers` processes x `threads` threads when installed
+                      and running in the main thread (POSIX), else waitress with `threads`.
+    on_ready: called once the port is bound (used by app.py to retire a previous instance);
+              called before binding when the port cannot be shared (no SO_REUSEPORT here or
+              in the instance holding it, dev server).
+    """
+    workers = workers or MCP_WORKERS
+    threads = threads or MCP_THREADS
+    if on_ready and not (
+        production and MCP_REUSE_PORT and port_shareable(MCP_HOST, MCP_PORT)
+    ):
+        on_ready()
+        on_ready = None
+    if production:
+        import threading
+
+        in_main_thread = threading.current_thread() is threading.main_thread()
+        try:
+            if in_main_thread:
+                return run_gunicorn(workers, threads, on_ready)
+        except ImportError:
+            pass
+        try:
+            if workers > 1:
+                logger.warning("gunicorn not available: serving with a single waitress process.")
+            return run_waitress(threads, on_ready)
+        except ImportError:
+            logger.warning(
+                "No production server installed (gunicorn/waitress): using Flask dev server."
+            )
+        if on_ready:
+            on_ready()
+    app.run(host=MCP_HOST, port=MCP_PORT, threaded=True)
+
+
+def main(argv=None, on_ready=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="JIRA Worklog MCP HTTP server")
+    parser.add_argument(
+        "--workers", type=int, help=f"worker processes (default {MCP_WORKERS})"
+    )
+    parser.add_argument(
+        "--threads", type=int, help=f"threads per worker (default {MCP_THREADS})"
+    )
+    parser.add_argument(
+        "--dev", action="store_true", help="use the Flask development server"
+    )
+    args = parser.parse_args(argv)
+    setup_logging()
+    run_server(
+        production=not args.dev,
+        workers=args.workers,
+        threads=args.threads,
+        on_ready=on_ready,
+    )
 
 
 if __name__ == "__main__":
-    run_server()
+    main()
@@ -0,0 +1,166 @@
+"""
+Metrics - minimal Prometheus-style counters, gauges and histograms (no dependencies)
+
+Usage:
+    from metrics import Counter, Histogram, render
+    REQUESTS = Counter("app_requests_total", "Requests handled", ["route"])
+    REQUESTS.inc("/hours")
+    LATENCY = Histogram("app_latency_seconds", "Request latency", ["route"])
+    LATENCY.observe(0.012, "/hours")
+    render()  # Prometheus text exposition format (served on /metrics by mcp_server.py)
+
+Label values are passed positionally, in labelnames order. Recording is a dict lookup
+and an add under a per-metric lock; all formatting happens in render().
+Values are per process: with several gunicorn workers each worker reports its own.
+"""
+
+import bisect
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY = []
+CACHES = {}
+
+
+def format_labels(labelnames, labelvalues, extra=""):
+    pairs = [
+        f'{name}="{escape_label(value)}"' for name, value in zip(labelnames, labelvalues)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named metric family with optional labels, registered for render()."""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # callback() -> {labelvalues tuple: value}, read at render time
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def samples(self):
+        """Yield (suffix, labelvalues, extra_label, value) tuples."""
+        values = self.callback() if self.callback else dict(self._values)
+        for labelvalues, value in sorted(values.items()):
+            yield "", labelvalues, "", value
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labelvalues, extra, value in self.samples():
+            labels = format_labels(self.labelnames, labelvalues, extra)
+            lines.append(f"{self.name}{suffix}{labels} {format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labelvalues):
+        # Per-bucket (non-cumulative) counts; the last slot is +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {
+                key: (list(counts), total, count)
+                for key, (counts, total, count) in self._values.items()
+            }
+        for labelvalues, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield "_bucket", labelvalues, f'le="{format_value(bound)}"', cumulative
+            yield "_sum", labelvalues, "", total
+            yield "_count", labelvalues, "", count
+
+
+def register_cache(name, cache):
+    """Expose a utils.TTLCache's hits, misses and hit ratio under the given name."""
+    CACHES[name] = cache
+
+
+def cache_lookups():
+    values = {}
+    for name, cache in CACHES.items():
+        values[(name, "hit")] = cache.hits
+        values[(name, "miss")] = cache.misses
+    return values
+
+
+def cache_hit_ratios():
+    values = {}
+    for name, cache in CACHES.items():
+        lookups = cache.hits + cache.misses
+        values[(name,)] = round(cache.hits / lookups, 4) if lookups else 0.0
+    return values
+
+
+Counter(
+    "cache_lookups_total",
+    "Cache lookups by result",
+    ["cache", "result"],
+    callback=cache_lookups,
+)
+Gauge("cache_hit_ratio", "Cache hits / lookups", ["cache"], callback=cache_hit_ratios)
+
+
+def render():
+    """All registered metrics in Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
@@ -0,0 +1,282 @@
+"""
+Profiler - opt-in slow-request profiling for mcp_server.py
+
+Two capture modes, both off unless PROFILE_ENABLED=1:
+- sampled : a random PROFILE_SAMPLE_RATE fraction of requests runs under cProfile
+            and is always saved.
+- slow    : every other request is stack-sampled by a shared background thread
+            (every PROFILE_STACK_INTERVAL seconds) and saved only if it took
+            longer than PROFILE_SLOW_MS. Unsampled fast requests cost one registration.
+
+Each saved profile is a JSON document with the request, its duration, the upstream call
+timeline (JIRA/Tempo spans from tracing.py) and either the top cProfile functions or
+folded stacks (flamegraph.pl / speedscope input). cProfile runs also keep the raw
+.prof file (snakeviz, pstats). Files live in PROFILE_DIR, a ring of at most
+PROFILE_MAX_FILES profiles; the oldest are deleted first.
+
+Browse: GET /debug/profiles, download: GET /debug/profiles/<id>[?format=prof|folded]
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import tracing
+
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "0").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0.0"))
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "2000"))
+PROFILE_STACK_INTERVAL = float(os.environ.get("PROFILE_STACK_INTERVAL", "0.01"))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "50"))
+PROFILE_TOP_FUNCTIONS = int(os.environ.get("PROFILE_TOP_FUNCTIONS", "40"))
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "ai-mini-agent-profiles")
+)
+
+PROFILE_ID_RE = re.compile(r"^[0-9]+-[a-z0-9_]+-[0-9a-f]{6}$")
+
+_ring_lock = threading.Lock()
+_waits = threading.local()  # seconds the current request spent in waiting() blocks
+
+
+# --- STACK SAMPLER ---
+class StackSampler:
+    """
+    One daemon thread that samples the stacks of registered request threads.
+    Runs only while at least one request is registered.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._threads = {}  # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self):
+        thread_id = threading.get_ident()
+        stacks = Counter()
+        with self._lock:
+            self._threads[thread_id] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="profile-sampler", daemon=True
+                )
+                self._thread.start()
+        return stacks
+
+    def unregister(self):
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._threads:
+                    self._thread = None
+                    return
+                targets = dict(self._threads)
+            frames = sys._current_frames()
+            for thread_id, stacks in targets.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[fold_stack(frame)] += 1
+
+
+def fold_stack(frame):
+    """'outer;...;inner' frame names, the folded-stack format used by flame graphs."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_sampler = StackSampler(PROFILE_STACK_INTERVAL)
+
+
+# --- REQUEST PROFILING ---
+@contextmanager
+def profile_request(method, path, tenant=None):
+    """
+    Profile the enclosed request handling if it is sampled or turns out slow; the
+    profile records the tenant it was taken for. No-op unless PROFILE_ENABLED.
+    """
+    if not PROFILE_ENABLED:
+        yield
+        return
+    current = tracing.current_span()
+    trace_id = getattr(current, "trace_id", None)
+    started = time.time()
+    start = time.perf_counter()
+    profile = None
+    stacks = None
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active on this thread (nested call)
+            profile = None
+    if profile is None and PROFILE_SLOW_MS > 0:
+        stacks = _sampler.register()
+    outer_waited = getattr(_waits, "seconds", 0.0)
+    _waits.seconds = 0.0
+    try:
+        yield
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        waited_ms = _waits.seconds * 1000
+        _waits.seconds = outer_waited
+        if profile is not None:
+            profile.disable()
+        if stacks is not None:
+            _sampler.unregister()
+        if profile is not None or duration_ms - waited_ms >= PROFILE_SLOW_MS:
+            try:
+                save_profile(
+                    method, path, started, duration_ms, trace_id, profile, stacks, tenant
+                )
+            except OSError:
+                pass
+
+
+@contextmanager
+def waiting():
+    """
+    Mark a deliberate wait (e.g. a job long-poll): its time does not count towards
+    PROFILE_SLOW_MS, so idle requests are not saved as slow ones.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _waits.seconds = getattr(_waits, "seconds", 0.0) + time.perf_counter() - start
+
+
+def save_profile(method, path, started, duration_ms, trace_id, profile, stacks, tenant=None):
+    slug = re.sub(r"[^a-z0-9]+", "_", f"{method}{path}".lower()).strip("_")
+    profile_id = f"{int(started * 1000)}-{slug}-{os.urandom(3).hex()}"
+    document = {
+        "id": profile_id,
+        "method": method,
+        "path": path,
+        "started": started,
+        "duration_ms": round(duration_ms, 3),
+        "mode": "cprofile" if profile is not None else "stack",
+        "trace_id": trace_id,
+        "tenant": tenant,
+        "timeline": upstream_timeline(trace_id, started),
+    }
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if profile is not None:
+        profile.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        document["cprofile"] = out.getvalue()
+    else:
+        document["samples"] = sum(stacks.values())
+        document["sample_interval_ms"] = PROFILE_STACK_INTERVAL * 1000
+        document["stacks"] = [
+            f"{stack} {count}" for stack, count in stacks.most_common()
+        ]
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as f:
+        json.dump(document, f, default=str)
+    trim_ring()
+    return profile_id
+
+
+def upstream_timeline(trace_id, started):
+    """Finished spans of this trace (upstream calls, hierarchy build) relative to the request start."""
+    if not trace_id:
+        return []
+    timeline = []
+    for record in tracing.spans_for_trace(trace_id):
+        if record["start"] < started:
+            continue
+        timeline.append(
+            {
+                "name": record["name"],
+                "offset_ms": round((record["start"] - started) * 1000, 3),
+                "duration_ms": record["duration_ms"],
+                "attrs": record["attrs"],
+            }
+        )
+    timeline.sort(key=lambda s: s["offset_ms"])
+    return timeline
+
+
+def trim_ring():
+    """Delete the oldest profiles beyond PROFILE_MAX_FILES."""
+    with _ring_lock:
+        ids = sorted(
+            name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith(".json")
+        )
+        for profile_id in ids[: max(0, len(ids) - PROFILE_MAX_FILES)]:
+            for ext in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(PROFILE_DIR, profile_id + ext))
+                except OSError:
+                    pass
+
+
+def list_profiles(tenant=None):
+    """Summaries of the stored profiles, newest first; only tenant's when given."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if tenant is not None and document.get("tenant") != tenant:
+            continue
+        summaries.append(
+            {
+                key: document.get(key)
+                for key in (
+                    "id", "method", "path", "started", "duration_ms", "mode", "trace_id", "tenant",
+                )
+            }
+        )
+    return summaries
+
+
+def profile_file(profile_id, fmt="json", tenant=None):
+    """
+    Path of a stored profile file, or None. fmt: json, prof (cProfile only) or folded.
+    With tenant, profiles taken for another tenant are treated as missing.
+    """
+    if not PROFILE_ID_RE.match(profile_id or ""):
+        return None
+    if fmt == "folded":
+        fmt = "json"
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.{fmt}")
+    if fmt not in ("json", "prof") or not os.path.exists(path):
+        return None
+    if tenant is not None:
+        try:
+            with open(os.path.join(PROFILE_DIR, f"{profile_id}.json")) as f:
+                if json.load(f).get("tenant") != tenant:
+                    return None
+        except (OSError, ValueError):
+            return None
+    return path
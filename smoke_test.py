@@ -0,0 +1,233 @@
+"""
+Smoke Test - end-to-end check of the MCP write paths against fake_jira.py
+
+Starts fake_jira.py in a thread (a dataset without worklogs, so every worklog seen was
+written by this run) and drives the mcp_server.py services in-process through
+call_service: log, undo, close, bulk close with a failing ticket, Idempotency-Key replay
+(a write JIRA rejected with a 500 must not be replayed, a retry during a write slower
+than IDEMPOTENCY_LOCK_TIMEOUT must not take it over), and queued jobs (resubmitting a
+key with other arguments is a 422). The key, job and event stores go to a temporary
+directory, so the run leaves nothing behind.
+
+Exits with status 1 when a check fails.
+
+Usage:
+    python smoke_test.py
+    python smoke_test.py replay jobs      # only checks whose name contains a word
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+# Stores and the start time file are read at import: keep this run's state out of the repo
+SMOKE_DIR = tempfile.mkdtemp(prefix="ai-mini-agent-smoke-")
+os.environ["IDEMPOTENCY_DB"] = os.path.join(SMOKE_DIR, "idempotency.sqlite3")
+os.environ["JOBS_DB"] = os.path.join(SMOKE_DIR, "jobs.sqlite3")
+os.environ["EVENTS_DB"] = os.path.join(SMOKE_DIR, "events.sqlite3")
+os.environ["START_TIME_FILE"] = os.path.join(SMOKE_DIR, "start-time")
+os.environ.pop("TENANTS_FILE", None)
+# Short enough for a slow write to outlive it (the takeover check)
+os.environ["IDEMPOTENCY_LOCK_TIMEOUT"] = "2"
+
+import commit  # noqa: E402
+import fake_jira  # noqa: E402
+import idempotency  # noqa: E402
+import jobs  # noqa: E402
+import mcp_server  # noqa: E402
+
+SMOKE_JOB_TIMEOUT = float(os.environ.get("SMOKE_JOB_TIMEOUT", "30"))
+
+CHECKS = []
+
+
+def check(name):
+    """Register func(ctx) as a smoke check; it raises AssertionError on failure."""
+
+    def decorator(func):
+        CHECKS.append((name, func))
+        return func
+
+    return decorator
+
+
+def call(method, path, args=None, **options):
+    return mcp_server.call_service(method, path, args, **options)
+
+
+def worklog_count(key=None):
+    """Worklogs stored by the fake, for one ticket or all of them."""
+    with fake_jira._lock:
+        if key:
+            return len(fake_jira.STATE["worklogs"][key])
+        return sum(len(w) for w in fake_jira.STATE["worklogs"].values())
+
+
+def issue_status(key):
+    with fake_jira._lock:
+        return fake_jira.STATE["issues"][key]["status"]
+
+
+def open_tickets():
+    payload, status = call("GET", "/tickets", {"refresh": "1"})
+    assert status == 200, f"/tickets returned {status}: {payload}"
+    return mcp_server.open_ticket_keys(payload["tickets"])
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+# --- CHECKS ---
+@check("log and undo")
+def check_log_undo(ctx):
+    key = ctx["tickets"].pop()
+    before = worklog_count()
+    payload, status = call("POST", "/log", {"ticket": key, "hours": "30m", "comment": "smoke"})
+    assert status == 200, f"/log returned {status}: {payload}"
+    assert worklog_count(key) == 1, f"{key} has {worklog_count(key)} worklogs, expected 1"
+    payload, status = call("POST", "/undo_last_log", {})
+    assert status == 200 and payload.get("success"), f"/undo_last_log: {status} {payload}"
+    assert worklog_count() == before, f"{worklog_count()} worklogs after undo, expected {before}"
+
+
+@check("idempotent replay")
+def check_replay(ctx):
+    key = ctx["tickets"].pop()
+    idempotency_key = new_key()
+    args = {"ticket": key, "hours": "15m", "comment": "smoke replay"}
+    first = call("POST", "/log", args, idempotency_key=idempotency_key)
+    second = call("POST", "/log", args, idempotency_key=idempotency_key)
+    assert first[1] == 200, f"/log returned {first}"
+    assert second == first, f"replay returned {second}, first call {first}"
+    assert worklog_count(key) == 1, f"{key} has {worklog_count(key)} worklogs after a replay"
+    other = dict(args, hours="45m")
+    payload, status = call("POST", "/log", other, idempotency_key=idempotency_key)
+    assert status == 422, f"reused key with other args returned {status}: {payload}"
+    assert worklog_count(key) == 1, f"{key} has {worklog_count(key)} worklogs after a 422"
+
+
+@check("failed write is not replayed")
+def check_failed_replay(ctx):
+    key = ctx["tickets"].pop()
+    idempotency_key = new_key()
+    args = {"ticket": key, "hours": "15m", "comment": "smoke retry"}
+    fake_jira.CONFIG["error_rate"] = 1.0
+    try:
+        payload, status = call("POST", "/log", args, idempotency_key=idempotency_key)
+    finally:
+        fake_jira.CONFIG["error_rate"] = 0.0
+    assert status == 502, f"/log with JIRA failing returned {status}: {payload}"
+    assert worklog_count(key) == 0, f"{key} has a worklog although JIRA failed"
+    payload, status = call("POST", "/log", args, idempotency_key=idempotency_key)
+    assert status == 200, f"retry after the failure returned {status}: {payload}"
+    assert worklog_count(key) == 1, f"{key} has {worklog_count(key)} worklogs after the retry"
+
+
+@check("no takeover during a slow write")
+def check_slow_takeover(ctx):
+    key = ctx["tickets"].pop()
+    idempotency_key = new_key()
+    args = {"ticket": key, "hours": "15m", "comment": "smoke slow"}
+    delay = 2.5 * idempotency.IDEMPOTENCY_LOCK_TIMEOUT
+    results = []
+    fake_jira.CONFIG["latency_ms"] = delay * 1000
+    try:
+        first = threading.Thread(
+            target=lambda: results.append(call("POST", "/log", args, idempotency_key=idempotency_key))
+        )
+        first.start()
+        time.sleep(1.5 * idempotency.IDEMPOTENCY_LOCK_TIMEOUT)
+        payload, status = call("POST", "/log", args, idempotency_key=idempotency_key)
+    finally:
+        fake_jira.CONFIG["latency_ms"] = 0.0
+    first.join(delay + SMOKE_JOB_TIMEOUT)
+    assert status == 409, f"retry during the slow write returned {status}: {payload}"
+    assert results and results[0][1] == 200, f"slow write returned {results}"
+    assert worklog_count(key) == 1, f"{key} has {worklog_count(key)} worklogs, expected 1"
+
+
+@check("close")
+def check_close(ctx):
+    key = ctx["tickets"].pop()
+    payload, status = call("POST", "/close", {"ticket": key})
+    assert status == 200, f"/close returned {status}: {payload}"
+    assert issue_status(key) == "Done", f"{key} is {issue_status(key)} after /close"
+    payload, status = call("GET", "/tickets", {})
+    assert key not in mcp_server.open_ticket_keys(payload["tickets"]), f"{key} still listed open"
+
+
+@check("close batch with a failing ticket")
+def check_close_batch(ctx):
+    keys = [ctx["tickets"].pop(), ctx["tickets"].pop()]
+    missing = f"{keys[0].split('-')[0]}-99999"
+    payload, status = call("POST", "/close_batch", {"tickets": keys + [missing]})
+    assert status == 200, f"/close_batch returned {status}: {payload}"
+    assert payload["status"] == "partial", f"batch status {payload['status']}, expected partial"
+    assert (payload["closed"], payload["failed"]) == (2, 1), f"closed/failed: {payload}"
+    results = {r["ticket"]: r for r in payload["results"]}
+    assert results[missing]["error"], f"no error recorded for {missing}: {results[missing]}"
+    for key in keys:
+        assert issue_status(key) == "Done", f"{key} is {issue_status(key)} after the batch"
+
+
+@check("jobs")
+def check_jobs(ctx):
+    key = ctx["tickets"].pop()
+    idempotency_key = new_key()
+    args = {"ticket": key, "hours": "15m", "comment": "smoke job"}
+    queued, status = call("POST", "/log", args, idempotency_key=idempotency_key, respond_async=True)
+    assert status == 202, f"queued /log returned {status}: {queued}"
+    again, status = call("POST", "/log", args, idempotency_key=idempotency_key, respond_async=True)
+    assert status == 202 and again["job_id"] == queued["job_id"], f"resubmit gave {again}"
+    other = dict(args, hours="45m")
+    payload, status = call("POST", "/log", other, idempotency_key=idempotency_key, respond_async=True)
+    assert status == 422, f"reused job key with other args returned {status}: {payload}"
+    job = jobs.wait(queued["job_id"], SMOKE_JOB_TIMEOUT)
+    assert job["state"] == jobs.SUCCEEDED and job["status"] == 200, f"job ended as {job}"
+    assert job["attempts"] == 1, f"job ran {job['attempts']} times"
+    assert worklog_count(key) == 1, f"{key} has {worklog_count(key)} worklogs after the job"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end smoke test against fake JIRA")
+    parser.add_argument("filters", nargs="*", help="run only checks whose name contains one")
+    args = parser.parse_args(argv)
+    selected = [
+        (name, func) for name, func in CHECKS
+        if not args.filters or any(f.lower() in name for f in args.filters)
+    ]
+    if not selected:
+        parser.error(f"no check matches {' '.join(args.filters)}")
+
+    fake_jira.CONFIG["days"] = 0
+    fake_jira.reset_dataset()
+    base_url, server = fake_jira.start_in_thread()
+    commit.JIRA_BASE_URL = base_url
+    failures = 0
+    try:
+        # Each check takes fresh open tickets, so none sees another check's writes
+        ctx = {"tickets": open_tickets()}
+        if len(ctx["tickets"]) < 2 * len(CHECKS):
+            print(f"Only {len(ctx['tickets'])} open tickets in the fake dataset")
+            return 1
+        for name, func in selected:
+            try:
+                func(ctx)
+            except AssertionError as e:
+                failures += 1
+                print(f"FAIL  {name}: {e}")
+            else:
+                print(f"ok    {name}")
+    finally:
+        server.shutdown()
+    print(f"{len(selected) - failures}/{len(selected)} checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,90 @@
 # --- IMPORTS ---
+import os
 import streamlit as st
-import requests
 import openai
 import json
 import re
 import time
 from datetime import datetime, timedelta
 from configs import Configs
+from mcp_client import mcp_get, mcp_post, live_state, MCP_EVENTS
+import tracing
+from logging_setup import setup_logging
 from gradio_chatbot import (
     get_iso_date,
-    get_human_date,
     extract_command_ai,
-    get_open_tickets,
+    build_ticket_display_list,
     normalize_hours,
     call_mcp_server,
     format_log_command_response,
     format_close_command_response,
+    load_dashboard,
+    format_hours_label,
+    format_worklogs,
 )
 
+# Idempotent: Streamlit re-executes this script on every rerun
+setup_logging()
+
+
+# --- CACHED DATA LOADING ---
+# Streamlit reruns the whole script on every interaction. Upstream data is cached
+# per process with a TTL and cleared explicitly after log/undo/commands, so plain
+# reruns (widget changes, date navigation to a seen date) make no MCP calls.
+# With the /events subscription below, changes clear the caches as they happen, so
+# the TTL is only a safety net and defaults to 10 minutes.
+STREAMLIT_CACHE_TTL = int(
+    os.environ.get("STREAMLIT_CACHE_TTL", "600" if MCP_EVENTS else "60")
+)
+
+
+@st.cache_data(ttl=STREAMLIT_CACHE_TTL, show_spinner=False)
+def load_open_tickets():
+    # Errors propagate so they are not cached
+    hierarchy = mcp_get("/tickets").get("tickets", {})
+    return build_ticket_display_list(hierarchy)
+
+
+@st.cache_data(ttl=STREAMLIT_CACHE_TTL, show_spinner=False)
+def load_dashboard_for(date_iso):
+    # Hours label and List Logs share this cached /dashboard payload
+    return load_dashboard(datetime.strptime(date_iso, "%Y-%m-%d"))
+
+
+def invalidate_data_cache():
+    """Drop cached tickets/hours/worklogs after anything that may have changed them."""
+    load_open_tickets.clear()
+    load_dashboard_for.clear()
+
+
+def on_server_event(event_type, data):
+    # Runs on the subscriber thread; the next rerun refetches what changed.
+    # On (re)connect, events may have been missed: drop everything
+    if event_type == "connection":
+        invalidate_data_cache()
+    elif event_type in ("hours", "worklog"):
+        load_dashboard_for.clear()
+    elif event_type in ("ticket", "tickets"):
+        load_open_tickets.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def subscribe_to_server_events():
+    """One /events subscription per Streamlit process, shared by all sessions."""
+    live = live_state()
+    if live is not None:
+        live.add_listener(on_server_event)
+    return live
+
+
+subscribe_to_server_events()
+
 
 # --- HOURS LABEL HELPER ---
 def refresh_hours_label(selected_date):
     try:
-        resp = requests.get(
-            f"http://localhost:5000/hours",
-            params={"date": get_iso_date(selected_date)},
-        )
-        hours = resp.json().get("hours", 0.0)
-        if hasattr(selected_date, "date"):
-            date_obj = selected_date.date()
-        else:
-            date_obj = selected_date
-        human_date = get_human_date(date_obj)
-        return f"{human_date} — Hours: {hours} h"
+        hours = load_dashboard_for(get_iso_date(selected_date)).get("hours", 0.0)
+        return format_hours_label(selected_date, hours)
     except Exception:
         return "Hours: N/A"
 
@@ -53,17 +105,11 @@ if "confirm_undo" not in st.session_state:
 if "confirm_undo_all" not in st.session_state:
     st.session_state["confirm_undo_all"] = False
 
-# --- LOAD OPEN TICKETS (Gradio parity) ---
-try:
-    _, display_list, ticket_count = get_open_tickets()
-except Exception as e:
-    display_list = []
-    ticket_count = 0
-
 
+# --- LOAD OPEN TICKETS (Gradio parity) ---
 def refresh_ticket_list():
     try:
-        _, display_list, ticket_count = get_open_tickets()
+        display_list, ticket_count = load_open_tickets()
     except Exception as e:
         display_list = []
         ticket_count = 0
@@ -71,9 +117,9 @@ def refresh_ticket_list():
     st.session_state["ticket_count"] = ticket_count
 
 
-if "ticket_count" not in st.session_state:
-    st.session_state["ticket_count"] = 0
 refresh_ticket_list()
+# Set by any action that changed upstream data; triggers one rerun at the end
+data_changed = False
 
 
 # --- Two-column layout for Gradio parity ---
@@ -83,33 +129,6 @@ st.title("AI Mini Agent Chatbot (Sample Title)")
 left_col, right_col = st.columns([1, 3], gap="large")
 
 # --- Left column: Open tickets and info ---
-with left_col:
-    st.markdown(
-        f"#### Open Tickets ({ticket_count}) (🏢 Project > 🏷️ Epic > 🗂️ Main Task > 🔖 Ticket)"
-    )
-    ticket_labels = [label for label, key, _ in display_list]
-    selected_ticket_label = (
-        st.radio(
-            label="Select a ticket:",
-            options=ticket_labels,
-            index=0 if ticket_labels else None,
-            key="ticket_radio",
-        )
-        if ticket_labels
-        else None
-    )
-    selected_ticket_tuple = (None, "")
-    if selected_ticket_label:
-        for label, key, full_label in display_list:
-            if label == selected_ticket_label:
-                selected_ticket_tuple = (key, full_label)
-                break
-    st.session_state["selected_ticket_tuple"] = selected_ticket_tuple
-    if selected_ticket_tuple[1]:
-        st.markdown(
-            f"**Selected Ticket:**\n{selected_ticket_tuple[1]}", unsafe_allow_html=True
-        )
-
 with left_col:
     st.markdown(
         f"#### Open Tickets ({st.session_state['ticket_count']}) (🏢 Project > 🏷️ Epic > 🗂️ Main Task > 🔖 Ticket)"
@@ -184,16 +203,15 @@ with right_col:
                     st.warning("Please select a ticket, enter hours, and a comment.")
                 else:
                     try:
-                        resp = requests.post(
-                            f"http://localhost:5000/log",
-                            json={
+                        response = mcp_post(
+                            "/log",
+                            {
                                 "ticket": ticket_key,
                                 "hours": hours_input,
                                 "comment": comment,
                                 "close": "N",
                             },
                         )
-                        response = resp.json()
                         st.session_state["history"].append(
                             (
                                 f"Log {hours_input} for {ticket_key}: {comment}",
@@ -201,7 +219,8 @@ with right_col:
                             )
                         )
                         st.success("Hours logged!")
-                        refresh_ticket_list()
+                        invalidate_data_cache()
+                        data_changed = True
                     except Exception as e:
                         st.session_state["history"].append(
                             (
@@ -216,8 +235,7 @@ with right_col:
         with undo_col:
             if st.button("Undo Last Hour"):
                 try:
-                    resp = requests.post("http://localhost:5000/undo_last_log")
-                    result = resp.json()
+                    result = mcp_post("/undo_last_log")
                     msg = (
                         result.get("message", "Last hour deleted.")
                         if result.get("success")
@@ -225,7 +243,8 @@ with right_col:
                     )
                     st.session_state["history"].append(("Undo last hour", msg))
                     st.success(msg)
-                    refresh_ticket_list()
+                    invalidate_data_cache()
+                    data_changed = True
                 except Exception as e:
                     st.session_state["history"].append(
                         ("Undo last hour", f"Error: {str(e)}")
@@ -234,8 +253,7 @@ with right_col:
         with undo_all_col:
             if st.button("Undo All Hours"):
                 try:
-                    resp = requests.post("http://localhost:5000/undo_all_logs_today")
-                    result = resp.json()
+                    result = mcp_post("/undo_all_logs")
                     msg = (
                         result.get("message", "All today's hours deleted.")
                         if result.get("success")
@@ -245,7 +263,8 @@ with right_col:
                         ("Undo all hours for today", msg)
                     )
                     st.success(msg)
-                    refresh_ticket_list()
+                    invalidate_data_cache()
+                    data_changed = True
                 except Exception as e:
                     st.session_state["history"].append(
                         ("Undo all hours for today", f"Error: {str(e)}")
@@ -254,29 +273,12 @@ with right_col:
         with logs_col:
             if st.button("List Logs"):
                 try:
-                    resp = requests.get(
-                        f"http://localhost:5000/worklogs",
-                        params={"date": get_iso_date(st.session_state["date_state"])},
+                    logs_text = format_worklogs(
+                        load_dashboard_for(
+                            get_iso_date(st.session_state["date_state"])
+                        ).get("worklogs", []),
+                        Configs.WORKLOG_API_SOURCE,
                     )
-                    logs = resp.json().get("worklogs", [])
-                    if not logs:
-                        logs_text = "No logs for this date."
-                    else:
-                        lines = []
-                        for log in logs:
-                            started_raw = log.get("started", "")
-                            try:
-                                dt = datetime.strptime(
-                                    started_raw[:19], "%Y-%m-%dT%H:%M:%S"
-                                )
-                                started_fmt = dt.strftime("%Y-%m-%d %H:%M")
-                            except Exception:
-                                started_fmt = started_raw
-                            lines.append(
-                                f"**{log['issue_key']} ({log['time_spent']})** *{log['summary']}*\n"
-                                f"{log['comment']}  {started_fmt}"
-                            )
-                        logs_text = "\n\n".join(lines)
                     st.session_state["history"].append(
                         (
                             f"List logs for {get_iso_date(st.session_state['date_state'])}",
@@ -311,9 +313,16 @@ with right_col:
                 and ticket_key not in user_input
             ):
                 merged_input = f"{ticket_key}\n{user_input}".strip()
-            history, state, *_ = call_mcp_server(
-                merged_input, st.session_state["history"]
-            )
+            with tracing.span("ui.chat_submit", ui="streamlit"):
+                history, state, *_ = call_mcp_server(
+                    merged_input, st.session_state["history"]
+                )
             st.session_state["history"] = history
-        refresh_ticket_list()
-        st.experimental_rerun()
+            # Any command may have logged, closed or deleted something
+            invalidate_data_cache()
+            data_changed = True
+
+# Rerun once so the ticket list and hours label above reflect the change;
+# plain reruns are served from cache and do not loop
+if data_changed:
+    st.rerun()
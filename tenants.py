@@ -0,0 +1,204 @@
+"""
+Tenants - per-request identity for a multi-user MCP server
+
+Without TENANTS_FILE the server is single-user: every request acts with the JIRA/Tempo
+credentials from Configs (.env), as before. With TENANTS_FILE, each HTTP request must send
+`Authorization: Bearer <token>`; the token selects a tenant whose credentials, connection
+pool, caches and rate limit are used for that request.
+
+TENANTS_FILE (JSON):
+    {
+      "tenants": [
+        {"name": "alice", "token": "s3cret", "jira_user": "alice@example.com",
+         "jira_api_token": "...", "tempo_api_token": "...", "tempo_user_key": "...",
+         "rate_limit": 5, "burst": 20},
+        {"name": "bob", "token_sha256": "<hex digest of bob's token>", ...},
+        {"name": "ops", "token": "...", "admin": true}
+      ]
+    }
+
+Server-wide operator data (/metrics, /debug/traces, every tenant's /debug/profiles) is
+only served to tenants marked "admin"; other tenants see just their own profiles.
+
+The current tenant lives in a contextvar (set by call_service), so commit.py picks up the
+right credentials without threading them through every function; thread pools that copy
+the context (prefetch, team searches) inherit it. HTTP connection pools exist only for
+recently active tenants (at most TENANT_MAX_SESSIONS, least recently used closed first),
+so memory grows with concurrent users rather than with the size of the team.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TENANTS_FILE = os.environ.get("TENANTS_FILE")
+TENANT_POOL_SIZE = int(os.environ.get("TENANT_POOL_SIZE", "10"))  # connections per tenant
+TENANT_MAX_SESSIONS = int(os.environ.get("TENANT_MAX_SESSIONS", "64"))
+TENANT_RATE_LIMIT = float(os.environ.get("TENANT_RATE_LIMIT", "10"))  # requests/second
+TENANT_BURST = int(os.environ.get("TENANT_BURST", "30"))
+
+_current_tenant = ContextVar("current_tenant", default=None)
+
+
+class TokenBucket:
+    """Rate limiter: `rate` tokens per second, up to `burst` banked."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token. Returns 0 on success, else the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class Tenant:
+    """One user of the server: credentials and rate limiter (sessions are pooled separately)."""
+
+    def __init__(self, name, jira_user, jira_api_token, tempo_api_token=None,
+                 tempo_user_key=None, rate_limit=None, burst=None, admin=False):
+        self.name = name
+        self.admin = admin
+        self.jira_auth = (jira_user, jira_api_token)
+        self.tempo_api_token = tempo_api_token
+        self.tempo_user_key = tempo_user_key
+        self.limiter = TokenBucket(
+            TENANT_RATE_LIMIT if rate_limit is None else float(rate_limit),
+            TENANT_BURST if burst is None else int(burst),
+        )
+
+
+# --- REGISTRY ---
+_by_token = {}
+_by_digest = {}
+_by_name = {}
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def load_tenants(path=TENANTS_FILE):
+    """Load (or reload) the tenants file. Returns the number of tenants."""
+    with open(path) as f:
+        entries = json.load(f).get("tenants", [])
+    by_token, by_digest, by_name = {}, {}, {}
+    for entry in entries:
+        tenant = Tenant(
+            entry["name"],
+            entry.get("jira_user"),
+            entry.get("jira_api_token"),
+            entry.get("tempo_api_token"),
+            entry.get("tempo_user_key"),
+            entry.get("rate_limit"),
+            entry.get("burst"),
+            bool(entry.get("admin", False)),
+        )
+        by_name[tenant.name] = tenant
+        if entry.get("token"):
+            by_token[entry["token"]] = tenant
+        if entry.get("token_sha256"):
+            by_digest[entry["token_sha256"].lower()] = tenant
+    _by_token.clear()
+    _by_token.update(by_token)
+    _by_digest.clear()
+    _by_digest.update(by_digest)
+    _by_name.clear()
+    _by_name.update(by_name)
+    return len(entries)
+
+
+def enabled():
+    """True when the server runs in multi-tenant mode (TENANTS_FILE set)."""
+    return bool(TENANTS_FILE)
+
+
+def tenant_for_token(token):
+    """The Tenant for a bearer token, or None."""
+    if not token:
+        return None
+    for known, tenant in _by_token.items():
+        if hmac.compare_digest(known, token):
+            return tenant
+    return _by_digest.get(hashlib.sha256(token.encode()).hexdigest())
+
+
+def tenant_by_name(name):
+    """The Tenant called name, or None (used to run queued jobs as their submitter)."""
+    return _by_name.get(name)
+
+
+def bearer_token(headers):
+    value = headers.get("Authorization", "")
+    return value[7:].strip() if value[:7].lower() == "bearer " else None
+
+
+# --- CURRENT TENANT ---
+@contextmanager
+def activate(tenant):
+    """Make tenant current for the block (None = the single-user Configs identity)."""
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def current_tenant():
+    return _current_tenant.get()
+
+
+def tenant_name():
+    """Name of the current tenant, "default" in single-user mode; use it in cache keys."""
+    tenant = _current_tenant.get()
+    return tenant.name if tenant is not None else "default"
+
+
+def session():
+    """
+    Keep-alive requests.Session of the current tenant (TENANT_POOL_SIZE connections),
+    created on demand; the least recently used session is closed beyond TENANT_MAX_SESSIONS.
+    """
+    name = tenant_name()
+    with _sessions_lock:
+        current = _sessions.get(name)
+        if current is not None:
+            _sessions.move_to_end(name)
+            return current
+        current = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TENANT_POOL_SIZE)
+        current.mount("https://", adapter)
+        current.mount("http://", adapter)
+        _sessions[name] = current
+        evicted = []
+        while len(_sessions) > TENANT_MAX_SESSIONS:
+            evicted.append(_sessions.popitem(last=False)[1])
+    for old in evicted:
+        old.close()
+    return current
+
+
+def active_sessions():
+    with _sessions_lock:
+        return len(_sessions)
+
+
+if TENANTS_FILE:
+    load_tenants()
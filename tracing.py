@@ -0,0 +1,236 @@
+"""
+Tracing - lightweight request tracing from the chat UIs through the MCP server to JIRA
+
+Spans are timed stages of one interaction (UI handler -> OpenAI -> MCP call -> service ->
+JIRA/Tempo request). The current span lives in a contextvar, so nested spans (including
+code run through asyncio.to_thread) pick up their parent automatically. Across the HTTP
+hop the context travels in a W3C `traceparent` header (see mcp_client.py / mcp_server.py).
+
+Finished spans go to an in-memory ring buffer (TRACE_BUFFER_SIZE) and, if TRACE_FILE is
+set, are appended to that JSONL file. Point all processes at the same TRACE_FILE to see
+UI and server spans of one trace together. Browse them at GET /debug/traces.
+
+Usage:
+    from tracing import span
+    with span("jira.search", endpoint="search") as s:
+        ...
+        s.set("status", 200)
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "1").lower() in ("1", "true", "yes")
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", "2000"))
+TRACE_FILE = os.environ.get("TRACE_FILE")
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span = ContextVar("current_span", default=None)
+_finished = deque(maxlen=TRACE_BUFFER_SIZE)
+_file_lock = threading.Lock()
+
+
+class Span:
+    """One timed stage. Created by start_span()/span(); exported when end() is called."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end_time", "attrs")
+
+    def __init__(self, name, trace_id, parent_id, attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.end_time = None
+        self.attrs = attrs
+
+    def set(self, key, value):
+        self.attrs[key] = value
+
+    def end(self, error=None):
+        if self.end_time is not None:
+            return
+        self.end_time = time.time()
+        if error is not None:
+            self.attrs["error"] = f"{type(error).__name__}: {error}"[:300]
+        export(self.to_dict())
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((self.end_time - self.start) * 1000, 3),
+            "attrs": self.attrs,
+            "pid": os.getpid(),
+        }
+
+
+class NoopSpan:
+    """Stand-in returned when tracing is disabled."""
+
+    def set(self, key, value):
+        pass
+
+    def end(self, error=None):
+        pass
+
+    def traceparent(self):
+        return None
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def parse_traceparent(header):
+    """Return (trace_id, parent_span_id) from a W3C traceparent header, or None."""
+    match = TRACEPARENT_RE.match((header or "").strip().lower())
+    return match.groups() if match else None
+
+
+def start_span(name, parent=None, traceparent=None, **attrs):
+    """
+    Start a span without making it current (end it with span.end()).
+    Parent: the given span, else the traceparent header, else the current span;
+    with none of them a new trace is started.
+    """
+    if not TRACING_ENABLED:
+        return NOOP_SPAN
+    remote = parse_traceparent(traceparent) if traceparent else None
+    if not isinstance(parent, Span) and not remote:
+        parent = _current_span.get()
+    if isinstance(parent, Span):
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    elif remote:
+        trace_id, parent_id = remote
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+    return Span(name, trace_id, parent_id, attrs)
+
+
+@contextmanager
+def activate(active_span):
+    """Make an existing span current for the block (it is not ended on exit)."""
+    token = _current_span.set(active_span)
+    try:
+        yield active_span
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name, traceparent=None, **attrs):
+    """Run the block in a new child span of the current one; exceptions are recorded."""
+    current = start_span(name, traceparent=traceparent, **attrs)
+    if current is NOOP_SPAN:
+        yield current
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def call_in_span(parent, name, func, *args, **kwargs):
+    """
+    Call func inside a child span of parent. For asyncio.to_thread from async generators,
+    which cannot keep a contextvar set across their yields.
+    """
+    with activate(parent):
+        with span(name):
+            return func(*args, **kwargs)
+
+
+def current_span():
+    """The current Span, or None outside any span."""
+    return _current_span.get()
+
+
+def traceparent():
+    """traceparent header value for the current span, or None."""
+    current = _current_span.get()
+    return current.traceparent() if current is not None else None
+
+
+def export(record):
+    _finished.append(record)
+    if TRACE_FILE:
+        line = json.dumps(record, default=str) + "\n"
+        with _file_lock:
+            with open(TRACE_FILE, "a") as f:
+                f.write(line)
+
+
+def spans_for_trace(trace_id):
+    """Finished spans of one trace from this process's buffer."""
+    return [record for record in list(_finished) if record["trace_id"] == trace_id]
+
+
+def recent_spans():
+    """Finished spans from TRACE_FILE (all processes) if set, else this process's buffer."""
+    if TRACE_FILE and os.path.exists(TRACE_FILE):
+        with _file_lock:
+            with open(TRACE_FILE) as f:
+                lines = deque(f, maxlen=TRACE_BUFFER_SIZE)
+        spans = []
+        for line in lines:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue
+        return spans
+    return list(_finished)
+
+
+def get_traces(limit=20, trace_id=None):
+    """
+    Group recent spans into traces, most recent first. Each trace lists its spans in start
+    order with offset_ms (from the trace start) and depth for a waterfall view.
+    """
+    by_trace = {}
+    for record in recent_spans():
+        if trace_id and record["trace_id"] != trace_id:
+            continue
+        by_trace.setdefault(record["trace_id"], []).append(dict(record))
+    traces = []
+    for tid, spans in by_trace.items():
+        spans.sort(key=lambda s: s["start"])
+        start = spans[0]["start"]
+        end = max(s["start"] + s["duration_ms"] / 1000 for s in spans)
+        ids = {s["span_id"]: s for s in spans}
+        for s in spans:
+            depth, parent = 0, ids.get(s["parent_id"])
+            while parent is not None and depth < 50:
+                depth, parent = depth + 1, ids.get(parent["parent_id"])
+            s["depth"] = depth
+            s["offset_ms"] = round((s["start"] - start) * 1000, 3)
+        roots = [s for s in spans if s["parent_id"] not in ids]
+        traces.append(
+            {
+                "trace_id": tid,
+                "root": roots[0]["name"] if roots else spans[0]["name"],
+                "start": start,
+                "duration_ms": round((end - start) * 1000, 3),
+                "span_count": len(spans),
+                "spans": spans,
+            }
+        )
+    traces.sort(key=lambda t: t["start"], reverse=True)
+    return traces[:limit]
@@ -1,5 +1,9 @@
-
 # --- IMPORTS ---
+import contextvars
+import queue
+import threading
+import time
+from collections import OrderedDict
 from configs import Configs
 
 
@@ -14,3 +18,103 @@ class Utils:
         print(f"Retell API Key: {Configs.RETELL_API_KEY}")
 
     # Add more helper methods as needed
+
+
+ # --- TTL CACHE CLASS ---
+class TTLCache:
+    """
+    Thread-safe in-memory cache whose entries expire after a time-to-live (seconds).
+    Usage: cache = TTLCache(ttl=30); cache.set(key, value); cache.get(key)
+    Pass ttl=float("inf") to set() for entries that never expire.
+    The least recently used entry is evicted once maxsize is reached.
+    """
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def keys(self):
+        """Return the keys of all entries that have not expired yet."""
+        now = time.monotonic()
+        with self._lock:
+            return [key for key, (_, expires_at) in self._data.items() if expires_at > now]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+ # --- PREFETCH ---
+_DONE = object()
+
+
+def prefetch(iterable, depth=1):
+    """
+    Iterate `iterable` in a background thread, keeping up to `depth` items ready, so the
+    next item (e.g. the next API page) is fetched while the caller handles the current one.
+    The producer runs in a copy of the caller's context (trace spans nest as usual);
+    its exceptions are re-raised in the caller. Closing the generator stops the producer.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(produce,), name="prefetch", daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()